@@ -0,0 +1,47 @@
+"""Compare dictionary loading times with the different loaders.
+
+Usage: python benchmarks/dictionary_loading.py [--size N] [--count N]
+"""
+
+import argparse
+import os
+import tempfile
+
+from plover.dictionary.loading_manager import DictionaryLoadingManager
+
+from utils import Timer, random_entries, setup_plover, write_json_dictionary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--size", type=int, default=50000, help="entries per dictionary"
+    )
+    parser.add_argument("--count", type=int, default=15, help="number of dictionaries")
+    args = parser.parse_args()
+    setup_plover()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filenames = []
+        for n in range(args.count):
+            filename = os.path.join(tmp_dir, "dict%u.json" % n)
+            write_json_dictionary(filename, random_entries(args.size, seed=n))
+            filenames.append(filename)
+        print("%-10s %8s %10s" % ("loader", "workers", "load"))
+        for loader, workers in (
+            ("threads", 1),
+            ("threads", 0),
+            ("processes", 0),
+        ):
+            manager = DictionaryLoadingManager(lambda filename, d: None)
+            manager.loader = loader
+            manager.workers = workers
+            if loader == "processes":
+                # Don't count the workers startup.
+                manager._get_executors()[1].submit(int).result()
+            with Timer() as timer:
+                manager.load(filenames)
+            print("%-10s %8s %9.3fs" % (loader, workers or "auto", timer.elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Compare lookups in a dictionary collection, with and without merged index.
+
+Usage: python benchmarks/dictionary_lookup.py [--size N] [--count N]
+"""
+
+import argparse
+import random
+
+from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
+
+from utils import Timer, random_entries, setup_plover
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--size", type=int, default=20000, help="entries per dictionary"
+    )
+    parser.add_argument("--count", type=int, default=15, help="number of dictionaries")
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+    setup_plover()
+    dicts = []
+    for n in range(args.count):
+        d = StenoDictionary()
+        d.update(
+            (tuple(steno.split("/")), translation)
+            for steno, translation in random_entries(args.size, seed=n).items()
+        )
+        dicts.append(d)
+    rnd = random.Random(0)
+    keys = [rnd.choice(list(rnd.choice(dicts))) for __ in range(1000)]
+    # Most lookups done by the translator are misses.
+    keys += [key + ("-Z",) for key in keys] * 3
+    keys = keys * (args.lookups // len(keys))
+    print("%-8s %10s %10s" % ("index", "build", "lookups"))
+    for merged_index in (False, True):
+        dc = StenoDictionaryCollection(dicts, merged_index=merged_index)
+        with Timer() as build:
+            dc.lookup(())
+        with Timer() as timer:
+            for key in keys:
+                dc.lookup(key)
+        print(
+            "%-8s %9.3fs %9.3fs"
+            % ("merged" if merged_index else "none", build.elapsed, timer.elapsed)
+        )
+
+
+if __name__ == "__main__":
+    main()
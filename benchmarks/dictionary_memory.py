@@ -0,0 +1,69 @@
+"""Compare the memory used by the default and compact dictionary storages.
+
+Usage: python benchmarks/dictionary_memory.py [--size N] [DICTIONARY...]
+
+If no dictionary is given, a synthetic JSON dictionary is generated.
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+
+from plover.dictionary.base import load_dictionary
+
+from utils import Timer, random_entries, setup_plover, write_json_dictionary
+
+
+def measure(filename, compact):
+    # Note: timing is done without tracing, as it slows down allocations.
+    with Timer() as timer:
+        d = load_dictionary(filename, threaded_save=False, compact=compact)
+        # Make sure reverse indexes are built.
+        d.reverse_lookup("")
+    del d
+    gc.collect()
+    tracemalloc.start()
+    d = load_dictionary(filename, threaded_save=False, compact=compact)
+    d.reverse_lookup("")
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(d), size, peak, timer.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("dictionaries", nargs="*")
+    args = parser.parse_args()
+    setup_plover()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dictionaries = args.dictionaries
+        if not dictionaries:
+            filename = os.path.join(tmp_dir, "synthetic.json")
+            write_json_dictionary(filename, random_entries(args.size))
+            dictionaries = [filename]
+        print(
+            "%-30s %-8s %8s %10s %10s %8s"
+            % ("dictionary", "storage", "entries", "size", "peak", "load")
+        )
+        for filename in dictionaries:
+            for compact in (False, True):
+                entries, size, peak, elapsed = measure(filename, compact)
+                print(
+                    "%-30s %-8s %8u %8.1fMB %8.1fMB %7.2fs"
+                    % (
+                        os.path.basename(filename)[-30:],
+                        "compact" if compact else "default",
+                        entries,
+                        size / 1e6,
+                        peak / 1e6,
+                        elapsed,
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
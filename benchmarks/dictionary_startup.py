@@ -0,0 +1,54 @@
+"""Compare dictionary loading times, with a cold and a warm cache.
+
+Usage: python benchmarks/dictionary_startup.py [--size N] [DICTIONARY...]
+
+If no dictionary is given, a synthetic JSON dictionary is generated.
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+
+from plover.dictionary.base import load_dictionary
+
+from utils import Timer, random_entries, setup_plover, write_json_dictionary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("dictionaries", nargs="*")
+    args = parser.parse_args()
+    setup_plover()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_dir = os.path.join(tmp_dir, "cache")
+        dictionaries = args.dictionaries
+        if not dictionaries:
+            filename = os.path.join(tmp_dir, "synthetic.json")
+            write_json_dictionary(filename, random_entries(args.size))
+            dictionaries = [filename]
+        print("%-30s %8s %10s %10s" % ("dictionary", "entries", "cold", "warm"))
+        for filename in dictionaries:
+            timings = []
+            for __ in range(2):
+                with Timer() as timer:
+                    d = load_dictionary(
+                        filename,
+                        threaded_save=False,
+                        reverse_indexes="lazy",
+                        cache_dir=cache_dir,
+                    )
+                timings.append(timer.elapsed)
+                # Wait for the cache to be written.
+                for thread in threading.enumerate():
+                    if thread.name == "DictionaryCacheWriter":
+                        thread.join()
+            print(
+                "%-30s %8u %9.3fs %9.3fs"
+                % (os.path.basename(filename)[-30:], len(d), *timings)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compare loading times of an RTF/CRE dictionary and the equivalent JSON one.
+
+Usage: python benchmarks/rtf_loading.py [--size N]
+"""
+
+import argparse
+import os
+import tempfile
+
+from plover.dictionary.json_dict import JsonDictionary
+from plover.dictionary.rtfcre_dict import RtfDictionary
+from plover.dictionary.rtfcre_parse import parse_rtfcre
+
+from utils import Timer, random_entries, setup_plover, write_json_dictionary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=200000)
+    args = parser.parse_args()
+    setup_plover()
+    entries = random_entries(args.size)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_filename = os.path.join(tmp_dir, "dict.json")
+        write_json_dictionary(json_filename, entries)
+        rtf_filename = os.path.join(tmp_dir, "dict.rtf")
+        d = RtfDictionary.create(rtf_filename)
+        d.update((tuple(k.split("/")), v) for k, v in entries.items())
+        d.save()
+        with open(rtf_filename, "rb") as fp:
+            text = fp.read().decode("cp1252")
+        print("%-10s %10s" % ("format", "load"))
+        for name, load in (
+            ("json", lambda: JsonDictionary.load(json_filename)),
+            ("rtf", lambda: RtfDictionary.load(rtf_filename)),
+            ("rtf parse", lambda: sum(1 for __ in parse_rtfcre(text))),
+        ):
+            with Timer() as timer:
+                load()
+            print("%-10s %9.3fs" % (name, timer.elapsed))
+
+
+if __name__ == "__main__":
+    main()
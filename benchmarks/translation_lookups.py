@@ -0,0 +1,75 @@
+"""Count the dictionary lookups done per stroke by the translator.
+
+Usage: python benchmarks/translation_lookups.py [--size N] [--strokes N]
+
+The translator is fed the outlines of random entries (with a few
+misstrokes), with and without the outlines prefixes pruning (see
+`StenoDictionaryCollection.has_longer_outlines`).
+"""
+
+import argparse
+
+from plover import system
+from plover.steno import Stroke
+from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
+from plover.translation import Translator
+
+from utils import Timer, random_entries, random_writing, setup_plover
+
+
+class CountingCollection(StenoDictionaryCollection):
+    def __init__(self, dicts, pruning=True):
+        super().__init__(dicts)
+        self.pruning = pruning
+        self.lookups = 0
+
+    def lookup(self, key):
+        self.lookups += 1
+        return super().lookup(key)
+
+    def has_longer_outlines(self, key):
+        return not self.pruning or super().has_longer_outlines(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--strokes", type=int, default=100000)
+    args = parser.parse_args()
+    setup_plover()
+    d = StenoDictionary()
+    d.update(
+        (tuple(steno.split("/")), translation)
+        for steno, translation in random_entries(args.size).items()
+    )
+    # Make sure the suffix keys are mapped.
+    for key in system.SUFFIX_KEYS:
+        d[(Stroke(key).rtfcre,)] = "{^%s}" % key.strip("-").lower()
+    strokes = random_writing(d, args.strokes)
+    print("%-8s %14s %10s" % ("pruning", "lookups/stroke", "time"))
+    outputs = []
+    for pruning in (False, True):
+        dc = CountingCollection([d], pruning=pruning)
+        translator = Translator()
+        translator.set_dictionary(dc)
+        translator.set_min_undo_length(10)
+        output = []
+        translator.add_listener(
+            lambda undo, do, prev: output.append(
+                ([t.english for t in undo], [t.english for t in do])
+            )
+        )
+        # Build the prefixes set.
+        dc.has_longer_outlines(())
+        with Timer() as timer:
+            for stroke in strokes:
+                translator.translate(stroke)
+        print(
+            "%-8s %14.2f %9.3fs" % (pruning, dc.lookups / len(strokes), timer.elapsed)
+        )
+        outputs.append(output)
+    assert outputs[0] == outputs[1], "output mismatch"
+
+
+if __name__ == "__main__":
+    main()
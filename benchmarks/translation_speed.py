@@ -0,0 +1,61 @@
+"""Measure the translator throughput, in strokes per second.
+
+Usage: python benchmarks/translation_speed.py [--size N] [--strokes N]
+
+The translator is measured alone, with formatting (and no output), and
+compared to `translate_stream` (with formatting to text).
+"""
+
+import argparse
+
+from plover import system
+from plover.formatting import Formatter, translations_to_text
+from plover.steno import Stroke
+from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
+from plover.translation import Translator, translate_stream
+
+from utils import Timer, random_entries, random_writing, setup_plover
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--strokes", type=int, default=200000)
+    args = parser.parse_args()
+    setup_plover()
+    d = StenoDictionary()
+    d.update(
+        (tuple(steno.split("/")), translation)
+        for steno, translation in random_entries(args.size).items()
+    )
+    for key in system.SUFFIX_KEYS:
+        d[(Stroke(key).rtfcre,)] = "{^%s}" % key.strip("-").lower()
+    strokes = random_writing(d, args.strokes)
+    dc = StenoDictionaryCollection([d])
+
+    def translate(formatting):
+        translator = Translator()
+        translator.set_dictionary(dc)
+        translator.set_min_undo_length(100)
+        if formatting:
+            translator.add_listener(Formatter().format)
+        for stroke in strokes:
+            translator.translate(stroke)
+
+    def stream():
+        for __ in translations_to_text(translate_stream(strokes, dc)):
+            pass
+
+    print("%-12s %10s" % ("mode", "strokes/s"))
+    for name, run in (
+        ("translator", lambda: translate(False)),
+        ("formatting", lambda: translate(True)),
+        ("stream", stream),
+    ):
+        with Timer() as timer:
+            run()
+        print("%-12s %10.0f" % (name, len(strokes) / timer.elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Helpers shared by the benchmark scripts."""
+
+import json
+import logging
+import random
+import time
+
+from plover import log, system
+from plover.config import DEFAULT_SYSTEM_NAME
+from plover.registry import registry
+from plover.steno import Stroke
+
+
+def setup_plover():
+    # Don't clutter the output with plugins loading errors.
+    log.set_level(logging.CRITICAL)
+    registry.update()
+    system.setup(DEFAULT_SYSTEM_NAME)
+
+
+def random_stroke(rnd):
+    keys = [k for k in system.KEYS if rnd.random() < 0.15]
+    return Stroke.from_keys(keys or [rnd.choice(system.KEYS)]).rtfcre
+
+
+def random_word(rnd):
+    return "".join(
+        rnd.choice("abcdefghijklmnopqrstuvwxyz") for __ in range(rnd.randint(2, 10))
+    )
+
+
+def random_entries(size, seed=0):
+    """Generate a synthetic dictionary of (about) <size> entries.
+
+    Outlines are 1 to 4 strokes long, and translations are a mix of
+    plain words (often with several outlines for the same word),
+    capitalized words, and affixes.
+    """
+    rnd = random.Random(seed)
+    words = [random_word(rnd) for __ in range(max(1, size // 2))]
+    entries = {}
+    while len(entries) < size:
+        steno = "/".join(
+            random_stroke(rnd) for __ in range(rnd.choice((1, 1, 1, 2, 2, 3, 4)))
+        )
+        word = rnd.choice(words)
+        kind = rnd.random()
+        if kind < 0.1:
+            word = word.capitalize()
+        elif kind < 0.15:
+            word = "{^%s}" % word
+        elif kind < 0.2:
+            word = "{%s^}" % word
+        entries[steno] = word
+    return entries
+
+
+def random_writing(d, count, seed=0):
+    """Generate a stream of (about) <count> strokes, writing the outlines
+    of random entries of dictionary <d>, with a few misstrokes.
+    """
+    rnd = random.Random(seed)
+    outlines = list(d)
+    strokes = []
+    while len(strokes) < count:
+        if rnd.random() < 0.05:
+            strokes.append(Stroke(random_stroke(rnd)))
+        else:
+            strokes.extend(map(Stroke, rnd.choice(outlines)))
+    return strokes
+
+
+def write_json_dictionary(filename, entries):
+    with open(filename, "w", encoding="utf-8") as fp:
+        json.dump(entries, fp, ensure_ascii=False, indent=0)
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed = time.perf_counter() - self.start
@@ -20,6 +20,7 @@ from plover import log
 APPEARANCE_CONFIG_SECTION = "Appearance"
 MACHINE_CONFIG_SECTION = "Machine Configuration"
 
+DICTIONARIES_CONFIG_SECTION = "Dictionaries"
 LEGACY_DICTIONARY_CONFIG_SECTION = "Dictionary Configuration"
 
 LOGGING_CONFIG_SECTION = "Logging Configuration"
@@ -469,6 +470,30 @@ class Config:
             ),
             system_keymap_option(),
             dictionaries_option(),
+            # Dictionaries.
+            boolean_option("compact_dictionaries", False, DICTIONARIES_CONFIG_SECTION),
+            boolean_option(
+                "merged_dictionary_index", False, DICTIONARIES_CONFIG_SECTION
+            ),
+            boolean_option("dictionaries_cache", False, DICTIONARIES_CONFIG_SECTION),
+            boolean_option("dictionaries_journal", False, DICTIONARIES_CONFIG_SECTION),
+            # Delay before saving changes to a dictionary, in milliseconds.
+            int_option(
+                "dictionaries_save_delay", 500, 0, 60000, DICTIONARIES_CONFIG_SECTION
+            ),
+            choice_option(
+                "dictionaries_loader",
+                ("threads", "processes"),
+                DICTIONARIES_CONFIG_SECTION,
+            ),
+            int_option(
+                "dictionaries_loader_workers", 0, 0, 64, DICTIONARIES_CONFIG_SECTION
+            ),
+            choice_option(
+                "reverse_indexes",
+                ("eager", "lazy", "background"),
+                DICTIONARIES_CONFIG_SECTION,
+            ),
         ]
     )
 
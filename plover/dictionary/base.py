@@ -9,9 +9,14 @@
 
 from os.path import splitext
 import functools
+import marshal
 import threading
 
+from plover.dictionary.cache import is_cacheable, load_cached_dictionary
+from plover.dictionary.compact import CompactStenoDictionary, compact_dictionary_class
+from plover.dictionary.journal import DictionaryJournal, has_journal
 from plover.registry import registry
+from plover.steno_dictionary import has_standard_storage
 
 
 def _get_dictionary_class(filename):
@@ -31,46 +36,180 @@ def _get_dictionary_class(filename):
     return dict_module
 
 
-def _locked(fn):
-    lock = threading.Lock()
-
-    @functools.wraps(fn)
-    def wrapper(*args, **kwargs):
-        with lock:
-            fn(*args, **kwargs)
-
-    return wrapper
-
-
-def _threaded(fn):
-    @functools.wraps(fn)
-    def wrapper(*args, **kwargs):
-        t = threading.Thread(target=fn, args=args, kwargs=kwargs)
-        t.start()
-
-    return wrapper
+class _SaveScheduler:
+    """Save a dictionary in the background, coalescing save requests.
 
+    A save request schedules a save after <delay> seconds; further
+    requests made in the meantime (or while the save is in progress)
+    are coalesced, so the latest state is always written, but once.
+    """
 
-def create_dictionary(resource, threaded_save=True):
+    def __init__(self, save, delay=0):
+        self._save = save
+        self.delay = delay
+        # Protect `_dirty` and `_timer`.
+        self._lock = threading.Lock()
+        # Serialize saves.
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._timer = None
+
+    def __call__(self):
+        with self._lock:
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self._run)
+                self._timer.start()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self):
+        """Save right away, if there are pending changes."""
+        with self._save_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+            try:
+                self._save()
+            except BaseException:
+                with self._lock:
+                    self._dirty = True
+                raise
+
+
+def _schedule_saves(d, delay=0):
+    scheduler = _SaveScheduler(d.save, delay)
+    d.save = scheduler
+    d.flush = scheduler.flush
+
+
+def set_save_delay(d, delay):
+    """Change the delay of <d> background saves, if enabled (see `load_dictionary`)."""
+    if isinstance(d.save, _SaveScheduler):
+        d.save.delay = delay
+
+
+def create_dictionary(resource, threaded_save=True, compact=False, save_delay=0):
     """Create a new dictionary.
 
     The format is inferred from the extension.
 
+    If <compact> is True, use compact storage (see `plover.dictionary.compact`).
+
+    If <threaded_save> is True, saves are done in the background, after
+    <save_delay> seconds, with multiple saves in that window coalesced.
+
     Note: the file is not created! The resulting dictionary save
     method must be called to finalize the creation on disk.
     """
-    d = _get_dictionary_class(resource).create(resource)
+    dict_class = _get_dictionary_class(resource)
+    if compact:
+        dict_class = compact_dictionary_class(dict_class)
+    d = dict_class.create(resource)
     if threaded_save:
-        d.save = _threaded(_locked(d.save))
+        _schedule_saves(d, save_delay)
     return d
 
 
-def load_dictionary(resource, threaded_save=True):
+REVERSE_INDEXES_MODES = ("eager", "lazy", "background")
+
+
+def load_dictionary(
+    resource,
+    threaded_save=True,
+    compact=False,
+    reverse_indexes="eager",
+    cache_dir=None,
+    progress=None,
+    parser=None,
+    journal=False,
+    save_delay=0,
+):
     """Load a dictionary from a file.
 
     The format is inferred from the extension.
+
+    If <threaded_save> is True, saves are done in the background, after
+    <save_delay> seconds, with multiple saves in that window coalesced
+    (`flush` can be used to force pending saves).
+
+    If <compact> is True, use compact storage (see `plover.dictionary.compact`).
+
+    <reverse_indexes> controls when the reverse lookup indexes are built:
+    - "eager": right away, before returning.
+    - "lazy": on first use.
+    - "background": in a separate thread.
+    Note: only applies to the default storage, other storages (e.g.
+    compact storage) do not use those indexes.
+
+    If <cache_dir> is not None, it is used to cache the dictionary
+    contents for faster loading (see `plover.dictionary.cache`).
+
+    <progress> is an optional callback for reporting the loading
+    progress, see `StenoDictionary.load`.
+
+    <parser> is an optional function used instead of parsing the file
+    directly, for the formats supporting it: it's called with the
+    resource, and must return the result of `serialize_dictionary`
+    (e.g. called from another process).
+
+    If <journal> is True, saving a writable dictionary only appends
+    the changes to a journal (see `plover.dictionary.journal`).
     """
-    d = _get_dictionary_class(resource).load(resource)
+    assert reverse_indexes in REVERSE_INDEXES_MODES
+    dict_class = _get_dictionary_class(resource)
+    load_class = compact_dictionary_class(dict_class) if compact else dict_class
+    if not is_cacheable(dict_class):
+        d = load_class.load(resource)
+    else:
+        if parser is None:
+            load = functools.partial(load_class.load, resource, progress=progress)
+        else:
+            load = functools.partial(_load_serialized, load_class, resource, parser)
+        if cache_dir is None:
+            d = load()
+        else:
+            d = load_cached_dictionary(
+                cache_dir, resource, dict_class, load_class, load=load
+            )
+    if not d.readonly and (journal or has_journal(resource)):
+        d.journal = DictionaryJournal(d)
+        if journal:
+            d.save = d.journal.save
+        else:
+            # Journaling was disabled since: fold the leftover journal.
+            d.journal.close()
+            d.journal = None
+    if has_standard_storage(type(d)) and not isinstance(d, CompactStenoDictionary):
+        if reverse_indexes == "eager":
+            d.build_reverse_indexes()
+        elif reverse_indexes == "background":
+            threading.Thread(target=d.build_reverse_indexes, daemon=True).start()
     if not d.readonly and threaded_save:
-        d.save = _threaded(_locked(d.save))
+        _schedule_saves(d, save_delay)
+    return d
+
+
+def serialize_dictionary(resource):
+    """Load a dictionary, and return it in a compact serialized form.
+
+    The result (timestamp and marshalled entries) is cheap to transfer
+    between processes, see the <parser> argument of `load_dictionary`.
+    """
+    d = _get_dictionary_class(resource).load(resource)
+    return d.timestamp, marshal.dumps(dict(d.items()))
+
+
+def _load_serialized(load_class, resource, parser):
+    timestamp, data = parser(resource)
+    d = load_class.load(resource, entries=marshal.loads(data))
+    # Use the timestamp from before parsing the file.
+    d.timestamp = timestamp
     return d
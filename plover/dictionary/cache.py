@@ -0,0 +1,131 @@
+"""Persistent cache of loaded dictionaries.
+
+Parsing a big dictionary (and normalizing its steno) can take a while,
+so the resulting entries are saved in a binary format that is much
+faster to load (`marshal`), and used on the next load if the dictionary
+file has not changed since: same path, modification time, and size, and
+same steno system (as the normalized steno depends on it).
+
+"""
+
+import functools
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+import threading
+
+from plover import log, system
+from plover.oslayer.config import CONFIG_DIR
+from plover.resource import resource_filename
+from plover.steno_dictionary import has_standard_storage, has_standard_load
+
+
+CACHE_DIR = os.path.join(CONFIG_DIR, "dictionaries_cache")
+
+# Must be bumped on incompatible format changes.
+CACHE_VERSION = 1
+
+
+def is_cacheable(dict_class):
+    """Check if the contents of <dict_class> instances can be cached."""
+    return has_standard_storage(dict_class) and has_standard_load(dict_class)
+
+
+def cache_filename(cache_dir, filename):
+    path = os.path.abspath(filename).encode("utf-8", "surrogatepass")
+    return os.path.join(cache_dir, hashlib.sha1(path).hexdigest() + ".cache")
+
+
+def _system_digest():
+    """Digest of the steno system settings used for normalizing steno."""
+    settings = (
+        system.NAME,
+        getattr(system, "KEYS", None),
+        sorted(getattr(system, "IMPLICIT_HYPHEN_KEYS", ())),
+        getattr(system, "NUMBER_KEY", None),
+        sorted(getattr(system, "NUMBERS", {}).items()),
+        getattr(system, "FERAL_NUMBER_KEY", None),
+        getattr(system, "UNDO_STROKE_STENO", None),
+    )
+    return hashlib.sha1(repr(settings).encode("utf-8")).hexdigest()
+
+
+def _cache_key(dict_class, filename):
+    stat = os.stat(filename)
+    return (
+        CACHE_VERSION,
+        # The `marshal` format is specific to the Python version.
+        sys.implementation.cache_tag,
+        "%s.%s" % (dict_class.__module__, dict_class.__qualname__),
+        system.NAME,
+        _system_digest(),
+        os.path.abspath(filename),
+        stat.st_mtime_ns,
+        stat.st_size,
+    )
+
+
+def _read_cache(cache_file, key):
+    try:
+        # Note: `marshal.loads` is a lot faster than `marshal.load`.
+        with open(cache_file, "rb") as fp:
+            cache_key, entries = marshal.loads(fp.read())
+    except FileNotFoundError:
+        return None
+    except Exception:
+        log.debug("reading dictionary cache %s failed", cache_file, exc_info=True)
+        return None
+    if cache_key != key:
+        return None
+    return entries
+
+
+def _write_cache(cache_file, key, entries):
+    try:
+        cache_dir = os.path.dirname(cache_file)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_file = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                marshal.dump((key, entries), fp)
+            os.replace(temp_file, cache_file)
+        except:
+            os.unlink(temp_file)
+            raise
+    except Exception:
+        log.warning("writing dictionary cache %s failed", cache_file, exc_info=True)
+
+
+def load_cached_dictionary(cache_dir, resource, dict_class, load_class=None, load=None):
+    """Load a dictionary, using the cache in <cache_dir> when possible.
+
+    <dict_class> is the dictionary format class (used to validate the
+    cache), and <load_class> the class to actually instantiate (e.g. its
+    compact variant), defaulting to <dict_class>.
+
+    On a cache miss, the dictionary is loaded normally, with <load> if
+    not None, and the cache is updated in the background.
+    """
+    if load_class is None:
+        load_class = dict_class
+    if load is None:
+        load = functools.partial(load_class.load, resource)
+    filename = resource_filename(resource)
+    key = _cache_key(dict_class, filename)
+    cache_file = cache_filename(cache_dir, filename)
+    entries = _read_cache(cache_file, key)
+    if entries is not None:
+        return load_class.load(resource, entries=entries)
+    d = load()
+    # Note: take a snapshot now, as the dictionary can be modified
+    # by the caller while the cache is being written.
+    entries = dict(d.items())
+    threading.Thread(
+        target=_write_cache,
+        args=(cache_file, key, entries),
+        name="DictionaryCacheWriter",
+        daemon=True,
+    ).start()
+    return d
@@ -0,0 +1,481 @@
+"""Memory efficient storage for steno dictionaries.
+
+The default `StenoDictionary` storage keeps a Python dictionary of tuple
+keys, plus a reverse and a case-insensitive reverse dictionary, each with
+one list per distinct translation: fast and simple, but costly for big
+dictionaries.
+
+`CompactStenoDictionary` implements the same API on top of flat arrays:
+
+- stroke strings are interned, outlines are stored as packed arrays of
+  stroke indexes
+- translations are stored once, UTF-8 encoded, in a shared pool
+  referenced by offset
+- the forward, reverse and case-insensitive reverse indexes are open
+  addressing hash tables stored in integer arrays
+
+"""
+
+from array import array
+from collections.abc import Mapping
+from zlib import crc32
+
+from plover.steno_dictionary import StenoDictionary, has_standard_storage
+
+
+# Marker for an empty index slot / link.
+_EMPTY = -1
+# Marker for a deleted outline slot.
+_DELETED = -2
+
+_MIN_SLOTS = 8
+
+# Only compact storage when there are at least that many deleted entries.
+_MIN_DEAD_ENTRIES = 1024
+
+
+def _new_slots(count=0):
+    """Create an empty hash table for <count> items (load factor <= 1/3)."""
+    size = _MIN_SLOTS
+    while size < count * 3:
+        size *= 2
+    return array("i", [_EMPTY]) * size
+
+
+def _encode(text):
+    return text.encode("utf-8", "surrogatepass")
+
+
+def _decode(data):
+    return data.decode("utf-8", "surrogatepass")
+
+
+class _ReverseView(Mapping):
+    """Read only `reverse` mapping of a compact dictionary."""
+
+    def __init__(self, d):
+        self._dictionary = d
+
+    def __getitem__(self, value):
+        d = self._dictionary
+        translation, __ = d._find_text(_encode(value))
+        if translation == _EMPTY or not d._text_refcount[translation]:
+            raise KeyError(value)
+        keys = []
+        entry = d._text_first_entry[translation]
+        while entry != _EMPTY:
+            keys.append(d._outline(entry))
+            entry = d._entry_next[entry]
+        # Newest entries are linked first.
+        keys.reverse()
+        return keys
+
+    def __iter__(self):
+        d = self._dictionary
+        for translation, refcount in enumerate(d._text_refcount):
+            if refcount:
+                yield d._text(translation)
+
+    def __len__(self):
+        return sum(1 for refcount in self._dictionary._text_refcount if refcount)
+
+
+class _CaseReverseView(Mapping):
+    """Read only `casereverse` mapping of a compact dictionary."""
+
+    def __init__(self, d):
+        self._dictionary = d
+
+    def _values(self, translation):
+        d = self._dictionary
+        values = []
+        while translation != _EMPTY:
+            # Like with the default storage, a value
+            # is listed once per entry using it.
+            values.extend([d._text(translation)] * d._text_refcount[translation])
+            translation = d._text_next_lower[translation]
+        return values
+
+    def __getitem__(self, value):
+        translation, __ = self._dictionary._find_lower(_encode(value))
+        values = self._values(translation)
+        if not values:
+            raise KeyError(value)
+        return values
+
+    def __iter__(self):
+        d = self._dictionary
+        for translation in d._lower_slots:
+            if translation != _EMPTY and self._values(translation):
+                yield d._text(translation).lower()
+
+    def __len__(self):
+        return sum(1 for __ in self)
+
+
+class CompactStenoDictionary(StenoDictionary):
+    """A memory efficient steno dictionary.
+
+    Note: the `reverse` and `casereverse` attributes are read only
+    views of the compact indexes.
+
+    """
+
+    # See `plover.steno_dictionary.has_standard_storage`.
+    _STANDARD_STORAGE = True
+
+    def __init__(self):
+        super().__init__()
+        self._init_storage()
+
+    def _init_storage(self):
+        # Interned strokes.
+        self._strokes = []
+        self._stroke_index = {}
+        # Entries: outline (as a slice of the outline pool), and translation.
+        self._outline_offsets = array("I")
+        # Note: a length of zero is used for deleted entries.
+        self._outline_lengths = array("H")
+        self._outline_pool = array("I")
+        self._entry_translation = array("i")
+        # Next entry with the same translation.
+        self._entry_next = array("i")
+        # Outline -> entry index.
+        self._outline_slots = _new_slots()
+        self._outline_slots_used = 0
+        self._len = 0
+        self._dead = 0
+        self._longest_key = 0
+        # Translations: text (as a slice of the text pool), reference count,
+        # first entry using it, and next translation with the same lowercase
+        # form.
+        self._text_pool = bytearray()
+        self._text_offsets = array("I", [0])
+        self._text_refcount = array("I")
+        self._text_first_entry = array("i")
+        self._text_next_lower = array("i")
+        # Translation text -> translation index.
+        self._text_slots = _new_slots()
+        # Lowercase translation text -> first translation index.
+        self._lower_slots = _new_slots()
+        self._lower_count = 0
+
+    # Strokes / outlines.
+
+    def _intern_stroke(self, stroke):
+        index = self._stroke_index.get(stroke)
+        if index is None:
+            index = self._stroke_index[stroke] = len(self._strokes)
+            self._strokes.append(stroke)
+        return index
+
+    def _outline(self, entry):
+        offset = self._outline_offsets[entry]
+        strokes = self._strokes
+        return tuple(
+            strokes[n]
+            for n in self._outline_pool[offset : offset + self._outline_lengths[entry]]
+        )
+
+    def _find_entry(self, ids, hash_value):
+        """Return (entry, slot) for the given outline, entry is
+        `_EMPTY` if the outline is not present, and slot is the
+        slot of the entry, or the first free slot."""
+        slots = self._outline_slots
+        mask = len(slots) - 1
+        lengths = self._outline_lengths
+        offsets = self._outline_offsets
+        pool = self._outline_pool
+        length = len(ids)
+        free_slot = None
+        slot = hash_value & mask
+        while True:
+            entry = slots[slot]
+            if entry == _EMPTY:
+                return _EMPTY, slot if free_slot is None else free_slot
+            if entry == _DELETED:
+                if free_slot is None:
+                    free_slot = slot
+            elif lengths[entry] == length:
+                offset = offsets[entry]
+                if pool[offset : offset + length] == ids:
+                    return entry, slot
+            slot = (slot + 1) & mask
+
+    def _lookup_entry(self, key):
+        """Return (entry, slot) for the given key, see `_find_entry`."""
+        stroke_index = self._stroke_index
+        try:
+            ids = [stroke_index[stroke] for stroke in key]
+        except (KeyError, TypeError):
+            return _EMPTY, None
+        return self._find_entry(array("I", ids), hash(tuple(ids)))
+
+    def _resize_outline_slots(self):
+        slots = _new_slots(self._len)
+        mask = len(slots) - 1
+        offsets = self._outline_offsets
+        lengths = self._outline_lengths
+        pool = self._outline_pool
+        for entry, translation in enumerate(self._entry_translation):
+            if translation == _EMPTY:
+                continue
+            length = lengths[entry]
+            offset = offsets[entry]
+            slot = hash(tuple(pool[offset : offset + length])) & mask
+            while slots[slot] != _EMPTY:
+                slot = (slot + 1) & mask
+            slots[slot] = entry
+        self._outline_slots = slots
+        self._outline_slots_used = self._len
+
+    # Translations.
+
+    def _text(self, translation):
+        offsets = self._text_offsets
+        return _decode(self._text_pool[offsets[translation] : offsets[translation + 1]])
+
+    def _find_text(self, data):
+        slots = self._text_slots
+        mask = len(slots) - 1
+        offsets = self._text_offsets
+        pool = self._text_pool
+        slot = crc32(data) & mask
+        while True:
+            translation = slots[slot]
+            if translation == _EMPTY:
+                return _EMPTY, slot
+            if pool[offsets[translation] : offsets[translation + 1]] == data:
+                return translation, slot
+            slot = (slot + 1) & mask
+
+    def _find_lower(self, data):
+        slots = self._lower_slots
+        mask = len(slots) - 1
+        slot = crc32(data) & mask
+        while True:
+            translation = slots[slot]
+            if translation == _EMPTY:
+                return _EMPTY, slot
+            if _encode(self._text(translation).lower()) == data:
+                return translation, slot
+            slot = (slot + 1) & mask
+
+    def _resize_text_slots(self):
+        count = len(self._text_refcount)
+        self._text_slots = _new_slots(count)
+        for translation in range(count):
+            __, slot = self._find_text(_encode(self._text(translation)))
+            self._text_slots[slot] = translation
+
+    def _resize_lower_slots(self):
+        old_slots = self._lower_slots
+        self._lower_slots = _new_slots(self._lower_count)
+        for translation in old_slots:
+            if translation == _EMPTY:
+                continue
+            __, slot = self._find_lower(_encode(self._text(translation).lower()))
+            self._lower_slots[slot] = translation
+
+    def _intern_text(self, text):
+        data = _encode(text)
+        translation, slot = self._find_text(data)
+        if translation != _EMPTY:
+            return translation
+        translation = len(self._text_refcount)
+        self._text_pool += data
+        self._text_offsets.append(len(self._text_pool))
+        self._text_refcount.append(0)
+        self._text_first_entry.append(_EMPTY)
+        self._text_slots[slot] = translation
+        if (translation + 1) * 3 >= len(self._text_slots) * 2:
+            self._resize_text_slots()
+        # Case-insensitive index.
+        head, slot = self._find_lower(_encode(text.lower()))
+        self._text_next_lower.append(head)
+        self._lower_slots[slot] = translation
+        if head == _EMPTY:
+            self._lower_count += 1
+            if self._lower_count * 3 >= len(self._lower_slots) * 2:
+                self._resize_lower_slots()
+        return translation
+
+    def _link(self, entry, translation):
+        self._entry_translation[entry] = translation
+        self._entry_next[entry] = self._text_first_entry[translation]
+        self._text_first_entry[translation] = entry
+        self._text_refcount[translation] += 1
+
+    def _unlink(self, entry):
+        translation = self._entry_translation[entry]
+        entry_next = self._entry_next
+        first_entry = self._text_first_entry
+        if first_entry[translation] == entry:
+            first_entry[translation] = entry_next[entry]
+        else:
+            previous = first_entry[translation]
+            while entry_next[previous] != entry:
+                previous = entry_next[previous]
+            entry_next[previous] = entry_next[entry]
+        entry_next[entry] = _EMPTY
+        self._entry_translation[entry] = _EMPTY
+        self._text_refcount[translation] -= 1
+
+    # Storage API.
+
+    def _set(self, key, value):
+        ids = [self._intern_stroke(stroke) for stroke in key]
+        hash_value = hash(tuple(ids))
+        ids = array("I", ids)
+        entry, slot = self._find_entry(ids, hash_value)
+        if entry != _EMPTY:
+            # Like with the default storage, an updated
+            # entry is moved to the end of the dictionary.
+            self._remove(entry, slot)
+        translation = self._intern_text(value)
+        entry = len(self._entry_translation)
+        self._outline_offsets.append(len(self._outline_pool))
+        self._outline_lengths.append(len(ids))
+        self._outline_pool.extend(ids)
+        self._entry_translation.append(_EMPTY)
+        self._entry_next.append(_EMPTY)
+        self._link(entry, translation)
+        if self._outline_slots[slot] == _EMPTY:
+            self._outline_slots_used += 1
+        self._outline_slots[slot] = entry
+        self._len += 1
+        if len(ids) > self._longest_key:
+            self._longest_key = len(ids)
+        if self._dead >= max(_MIN_DEAD_ENTRIES, self._len):
+            self._compact()
+        elif self._outline_slots_used * 3 >= len(self._outline_slots) * 2:
+            self._resize_outline_slots()
+
+    def _remove(self, entry, slot):
+        self._unlink(entry)
+        self._outline_slots[slot] = _DELETED
+        key_len = self._outline_lengths[entry]
+        self._outline_lengths[entry] = 0
+        self._len -= 1
+        self._dead += 1
+        if key_len == self._longest_key:
+            self._longest_key = max(self._outline_lengths, default=0)
+
+    def _compact(self):
+        entries = list(self.items())
+        self._init_storage()
+        for key, value in entries:
+            self._set(key, value)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for entry, translation in enumerate(self._entry_translation):
+            if translation != _EMPTY:
+                yield self._outline(entry)
+
+    def __getitem__(self, key):
+        entry, __ = self._lookup_entry(key)
+        if entry == _EMPTY:
+            raise KeyError(key)
+        return self._text(self._entry_translation[entry])
+
+    def get(self, key, fallback=None):
+        entry, __ = self._lookup_entry(key)
+        if entry == _EMPTY:
+            return fallback
+        return self._text(self._entry_translation[entry])
+
+    def items(self):
+        for entry, translation in enumerate(self._entry_translation):
+            if translation != _EMPTY:
+                yield self._outline(entry), self._text(translation)
+
+    def clear(self):
+        assert not self.readonly
+        with self._changing():
+            self._init_storage()
+
+    def update(self, *args, **kwargs):
+        assert not self.readonly
+        iterable_list = [
+            a.items() if isinstance(a, (dict, StenoDictionary)) else a for a in args
+        ]
+        if kwargs:
+            iterable_list.append(kwargs.items())
+        with self._changing():
+            for iterable in iterable_list:
+                for key, value in iterable:
+                    self._set(key, value)
+
+    def __setitem__(self, key, value):
+        assert not self.readonly
+        with self._changing(key):
+            self._set(key, value)
+
+    def __delitem__(self, key):
+        assert not self.readonly
+        entry, slot = self._lookup_entry(key)
+        if entry == _EMPTY:
+            raise KeyError(key)
+        with self._changing(key):
+            self._remove(entry, slot)
+            if self._dead >= max(_MIN_DEAD_ENTRIES, self._len):
+                self._compact()
+
+    @property
+    def reverse(self):
+        return _ReverseView(self)
+
+    @property
+    def casereverse(self):
+        return _CaseReverseView(self)
+
+    def build_reverse_indexes(self):
+        """Nothing to do: the compact indexes are always up to date."""
+
+    def reverse_lookup(self, value):
+        translation, __ = self._find_text(_encode(value))
+        keys = set()
+        if translation == _EMPTY:
+            return keys
+        entry = self._text_first_entry[translation]
+        while entry != _EMPTY:
+            keys.add(self._outline(entry))
+            entry = self._entry_next[entry]
+        return keys
+
+    def casereverse_lookup(self, value):
+        translation, __ = self._find_lower(_encode(value))
+        values = set()
+        while translation != _EMPTY:
+            if self._text_refcount[translation]:
+                values.add(self._text(translation))
+            translation = self._text_next_lower[translation]
+        return values
+
+
+_compact_classes = {}
+
+
+def compact_dictionary_class(dict_class):
+    """Return a variant of <dict_class> using compact storage.
+
+    If <dict_class> implements its own storage, it is returned unchanged.
+    """
+    if issubclass(dict_class, CompactStenoDictionary):
+        return dict_class
+    compact_class = _compact_classes.get(dict_class)
+    if compact_class is not None:
+        return compact_class
+    if not has_standard_storage(dict_class):
+        compact_class = dict_class
+    else:
+        compact_class = type(
+            "Compact" + dict_class.__name__,
+            (CompactStenoDictionary, dict_class),
+            {"__module__": dict_class.__module__},
+        )
+    _compact_classes[dict_class] = compact_class
+    return compact_class
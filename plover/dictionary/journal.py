@@ -0,0 +1,174 @@
+"""Append-only journal of dictionary changes.
+
+Saving a dictionary normally rewrites the whole file, which is costly
+for big dictionaries. With a journal, a save only appends the entries
+changed since the previous save to a journal file next to the dictionary
+(`<dictionary>.journal`, one JSON record per line). The journal is folded
+into the dictionary file (with a full save) once it grows too big, or on
+quit, and replayed on the next load if that did not happen (e.g. after
+a crash).
+
+"""
+
+import json
+import os
+import threading
+
+from plover import log
+from plover.resource import resource_filename
+
+
+# Must be bumped on incompatible format changes.
+JOURNAL_VERSION = 1
+
+# Fold the journal into the dictionary after that many records.
+COMPACTION_THRESHOLD = 1000
+
+
+def journal_filename(filename):
+    return filename + ".journal"
+
+
+def has_journal(resource):
+    return os.path.exists(journal_filename(resource_filename(resource)))
+
+
+class DictionaryJournal:
+    """Journal of the changes to a writable dictionary.
+
+    On creation, the existing journal (if any) is replayed, and
+    the journal starts tracking changes to the dictionary.
+    """
+
+    def __init__(self, d):
+        assert not d.readonly
+        self._dictionary = d
+        # Full save.
+        self._save = d.save
+        self.filename = journal_filename(resource_filename(d.path))
+        # Serialize saves.
+        self._lock = threading.Lock()
+        # Changes since the last save: keys (as an ordered set),
+        # or all entries (e.g. after a call to `update`).
+        self._pending_lock = threading.Lock()
+        self._pending = {}
+        self._all_changed = False
+        # Number of records in the journal file.
+        self._records = 0
+        self._replay()
+        d._observers.add(self)
+
+    def _replay(self):
+        try:
+            fp = open(self.filename, encoding="utf-8")
+        except FileNotFoundError:
+            return
+        d = self._dictionary
+        with fp:
+            try:
+                header = json.loads(fp.readline())
+                if header["version"] != JOURNAL_VERSION:
+                    raise ValueError("unsupported version: %r" % header["version"])
+            except (KeyError, TypeError, ValueError) as e:
+                log.error(
+                    "ignoring invalid dictionary journal %s: %s", self.filename, e
+                )
+                return
+            if header["timestamp"] != d.timestamp:
+                log.warning(
+                    "dictionary %s was modified since its journal was written",
+                    d.path,
+                )
+            for line in fp:
+                try:
+                    steno, translation = json.loads(line)
+                except ValueError:
+                    # Truncated record, written during a crash.
+                    break
+                key = tuple(steno.split("/"))
+                if translation is not None:
+                    d[key] = translation
+                elif key in d:
+                    del d[key]
+                self._records += 1
+        log.info("replayed %u journal records for %s", self._records, d.path)
+
+    def _dictionary_changing(self, d, key):
+        pass
+
+    def _dictionary_changed(self, d, key):
+        with self._pending_lock:
+            if key is None:
+                self._all_changed = True
+            else:
+                self._pending[key] = None
+
+    def _dictionary_enabled_changed(self, d):
+        pass
+
+    def _take_pending(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            all_changed, self._all_changed = self._all_changed, False
+        return pending, all_changed
+
+    def _restore_pending(self, pending, all_changed):
+        with self._pending_lock:
+            self._pending = {**pending, **self._pending}
+            self._all_changed |= all_changed
+
+    def save(self):
+        """Save the changes since the previous save to the journal.
+
+        The journal is compacted (see `compact`) if it grew too big.
+        """
+        with self._lock:
+            pending, all_changed = self._take_pending()
+            try:
+                if all_changed or self._records + len(pending) > COMPACTION_THRESHOLD:
+                    self._compact()
+                elif pending:
+                    self._append(pending)
+            except BaseException:
+                self._restore_pending(pending, all_changed)
+                raise
+
+    def compact(self):
+        """Fold the journal into the dictionary file, if needed."""
+        with self._lock:
+            pending, all_changed = self._take_pending()
+            if not (self._records or pending or all_changed):
+                return
+            try:
+                self._compact()
+            except BaseException:
+                self._restore_pending(pending, all_changed)
+                raise
+
+    def close(self):
+        """Compact the journal, and stop tracking changes."""
+        self.compact()
+        self._dictionary._observers.discard(self)
+
+    def _compact(self):
+        self._save()
+        try:
+            os.unlink(self.filename)
+        except FileNotFoundError:
+            pass
+        self._records = 0
+
+    def _append(self, pending):
+        d = self._dictionary
+        lines = []
+        if not self._records:
+            header = {"version": JOURNAL_VERSION, "timestamp": d.timestamp}
+            lines.append(json.dumps(header))
+        for key in pending:
+            lines.append(json.dumps(["/".join(key), d.get(key)], ensure_ascii=False))
+        mode = "a" if self._records else "w"
+        with open(self.filename, mode, encoding="utf-8", newline="\n") as fp:
+            fp.write("\n".join(lines) + "\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+        self._records += len(pending)
@@ -3,32 +3,192 @@
 
 """Parsing a json formatted dictionary."""
 
+import codecs
+import itertools
+import os
+import re
+
 try:
     import simplejson as json
 except ImportError:
     import json
+from json.decoder import JSONDecodeError, JSONDecoder, scanstring
 
 from plover.dictionary.helpers import StenoNormalizer
 from plover.steno_dictionary import StenoDictionary
 from plover.steno import steno_to_sort_key
 
 
+# Size of the chunks read when streaming a dictionary.
+_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Fast path: an entry with no escape sequences, followed by a delimiter.
+_SIMPLE_ENTRY = re.compile(
+    r'[ \t\n\r]*"([^"\\\x00-\x1f]*)"[ \t\n\r]*:'
+    r'[ \t\n\r]*"([^"\\\x00-\x1f]*)"[ \t\n\r]*([,}])'
+)
+
+# Parser states.
+_START, _KEY_OR_END, _KEY, _COLON, _VALUE, _SEPARATOR, _END = range(7)
+
+
+class _NeedMoreData(Exception):
+    pass
+
+
+def _iter_object(chunks):
+    """Parse a JSON object, streamed as a sequence of text <chunks>.
+
+    The object's entries are yielded as they are parsed, so the whole
+    document is never held in memory.
+    """
+    scan_value = JSONDecoder().scan_once
+    match_simple_entry = _SIMPLE_ENTRY.match
+    buffer = ""
+    pos = 0
+    eof = False
+    chunks = iter(chunks)
+    state = _START
+    key = None
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        try:
+            if pos == len(buffer):
+                if not eof:
+                    raise _NeedMoreData()
+                if state == _END:
+                    return
+                raise JSONDecodeError("Unexpected end of data", buffer, pos)
+            char = buffer[pos]
+            if state == _END:
+                raise JSONDecodeError("Extra data", buffer, pos)
+            if state == _START:
+                if char != "{":
+                    raise JSONDecodeError("Expecting object", buffer, pos)
+                pos += 1
+                state = _KEY_OR_END
+            elif state in (_KEY_OR_END, _KEY) and char == '"':
+                match = match_simple_entry(buffer, pos)
+                if match is None:
+                    key, pos = scanstring(buffer, pos + 1)
+                    state = _COLON
+                    continue
+                state = _KEY
+                while match is not None:
+                    key, value, delimiter = match.groups()
+                    pos = match.end()
+                    yield key, value
+                    if delimiter == "}":
+                        state = _END
+                        break
+                    match = match_simple_entry(buffer, pos)
+            elif state == _KEY_OR_END and char == "}":
+                pos += 1
+                state = _END
+            elif state == _COLON and char == ":":
+                pos += 1
+                state = _VALUE
+            elif state == _VALUE:
+                try:
+                    value, end = scan_value(buffer, pos)
+                except StopIteration as e:
+                    raise JSONDecodeError("Expecting value", buffer, e.value) from None
+                # Make sure the value (e.g. a number) was not truncated:
+                # it must be followed by a delimiter.
+                delimiter = _WHITESPACE.match(buffer, end).end()
+                if not eof and buffer[delimiter : delimiter + 1] not in (",", "}"):
+                    raise _NeedMoreData()
+                pos = end
+                state = _SEPARATOR
+                yield key, value
+            elif state == _SEPARATOR and char in ",}":
+                pos += 1
+                state = _KEY if char == "," else _END
+            elif state == _COLON:
+                raise JSONDecodeError("Expecting ':' delimiter", buffer, pos)
+            elif state == _SEPARATOR:
+                raise JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+            else:
+                raise JSONDecodeError(
+                    "Expecting property name enclosed in double quotes", buffer, pos
+                )
+        except (_NeedMoreData, JSONDecodeError):
+            # Note: an error may just be caused by a truncated
+            # token, only report it when there's no more data.
+            if eof:
+                raise
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+            else:
+                buffer = buffer[pos:] + chunk
+                pos = 0
+
+
+def _read_chunks(fp, encoding, progress):
+    """Read and decode <fp> contents, chunk by chunk."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    size = os.fstat(fp.fileno()).st_size
+    done = 0
+    while True:
+        data = fp.read(_CHUNK_SIZE)
+        text = decoder.decode(data, final=not data)
+        if text:
+            yield text
+        if not data:
+            break
+        done += len(data)
+        if size:
+            progress(min(done / size, 1.0))
+
+
+def _check_translation(key, value):
+    # Note: must be checked on load, as other errors would only
+    # happen later (e.g. when building the reverse indexes).
+    if not isinstance(value, str):
+        raise ValueError("invalid translation for %r: %r" % (key, value))
+    return value
+
+
 class JsonDictionary(StenoDictionary):
     def _load(self, filename):
-        with open(filename, "rb") as fp:
-            contents = fp.read()
         for encoding in ("utf-8", "latin-1"):
             try:
-                contents = contents.decode(encoding)
+                with open(filename, "rb") as fp:
+                    self._load_entries(filename, fp, encoding)
             except UnicodeDecodeError:
+                # Drop the entries loaded before the error (e.g. with
+                # compact storage, which inserts them as they are parsed).
+                self.clear()
                 continue
             else:
                 break
         else:
             raise ValueError("'%s' encoding could not be determined" % (filename,))
-        d = dict(json.loads(contents))
-        with StenoNormalizer(filename) as normalize_steno:
-            self.update((normalize_steno(x[0]), x[1]) for x in d.items())
+
+    def _load_entries(self, filename, fp, encoding):
+        chunks = _read_chunks(fp, encoding, self._report_progress)
+        first_chunk = next(chunks, "")
+        if first_chunk[_WHITESPACE.match(first_chunk).end() :][:1] == "{":
+            # Stream the entries straight into the dictionary.
+            entries = _iter_object(itertools.chain((first_chunk,), chunks))
+        else:
+            # Not an object: let `json` handle / report the error.
+            entries = dict(json.loads(first_chunk + "".join(chunks))).items()
+        try:
+            with StenoNormalizer(filename) as normalize_steno:
+                self.update(
+                    (normalize_steno(key), _check_translation(key, value))
+                    for key, value in entries
+                )
+        except JSONDecodeError:
+            # The error position is relative to the streaming buffer:
+            # parse the whole document so the actual position is reported.
+            fp.seek(0)
+            json.loads(fp.read().decode(encoding))
+            raise
 
     def _save(self, filename):
         mappings = [("/".join(k), v) for k, v in self.items()]
@@ -3,24 +3,67 @@
 
 """Centralized place for dictionary loading operation."""
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import logging
+import multiprocessing
 import threading
 import time
 
-from plover.dictionary.base import load_dictionary
+from plover.dictionary.base import (
+    load_dictionary,
+    serialize_dictionary,
+    set_save_delay,
+)
+from plover.registry import registry
 from plover.resource import resource_timestamp
-from plover import log
+from plover import log, system
+
+
+LOADERS = ("threads", "processes")
+
+
+def _init_process_worker(system_name):
+    # Plugins loading errors are already reported by the main process.
+    logging.disable(logging.ERROR)
+    try:
+        registry.update()
+    finally:
+        logging.disable(logging.NOTSET)
+    system.setup(system_name)
 
 
 class DictionaryLoadingManager:
-    def __init__(self, state_change_callback):
+    def __init__(self, state_change_callback, progress_callback=None):
         """
         Parameters:
         state_change_callback -- A function that will be called when any dictionary is loaded
             with two parameters: the filename and the loaded StenoDictionary object
             (or an instance of ErroredDictionary if the load fails).
+        progress_callback -- If not None, a function that will be called to report
+            the loading progress, for formats supporting it, with two parameters:
+            the filename and the progress (between 0 and 1).
         """
         self._state_change_callback = state_change_callback
+        self._progress_callback = progress_callback
         self.dictionaries = {}
+        # Use compact storage for newly loaded dictionaries.
+        self.compact = False
+        # When to build the reverse lookup indexes of newly loaded
+        # dictionaries (see `plover.dictionary.base.load_dictionary`).
+        self.reverse_indexes = "eager"
+        # Directory used to cache loaded dictionaries, or None.
+        self.cache_dir = None
+        # Journal changes to writable dictionaries, instead
+        # of rewriting the whole file on each save.
+        self.journal = False
+        self._save_delay = 0
+        # How to load dictionaries: with a pool of threads, or of
+        # processes (parsing supported formats in parallel).
+        self.loader = "threads"
+        # Maximum number of workers in the pool (0: automatic).
+        self.workers = 0
+        self._executors = None
+        self._executors_params = None
 
     def __len__(self):
         return len(self.dictionaries)
@@ -31,20 +74,100 @@ class DictionaryLoadingManager:
     def __contains__(self, filename):
         return filename in self.dictionaries
 
+    @property
+    def save_delay(self):
+        """Delay before saving changes (in seconds), so
+        multiple changes in that window are coalesced."""
+        return self._save_delay
+
+    @save_delay.setter
+    def save_delay(self, delay):
+        # Note: no need to reload, update the loaded dictionaries.
+        self._save_delay = delay
+        for op in self.dictionaries.values():
+            op.set_save_delay(delay)
+
+    # Settings passed to each loading operation: dictionaries
+    # loaded with different ones must be reloaded.
+    _LOADING_SETTINGS = (
+        "compact",
+        "reverse_indexes",
+        "cache_dir",
+        "journal",
+    )
+
+    def _is_outdated(self, op):
+        return (
+            any(
+                getattr(op, setting) != getattr(self, setting)
+                for setting in self._LOADING_SETTINGS
+            )
+            or op.needs_reloading()
+        )
+
+    def _get_executors(self):
+        """Return the thread pool for loading operations, and the process pool
+        for parsing (or None)."""
+        params = (self.loader, self.workers, system.NAME)
+        if params == self._executors_params:
+            return self._executors
+        assert self.loader in LOADERS
+        self.close()
+        workers = self.workers or None
+        thread_pool = ThreadPoolExecutor(workers, thread_name_prefix="DictionaryLoader")
+        if self.loader == "processes":
+            # Note: don't fork, this is a multi-threaded process.
+            process_pool = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+                initargs=(system.NAME,),
+            )
+        else:
+            process_pool = None
+        self._executors = thread_pool, process_pool
+        self._executors_params = params
+        return self._executors
+
+    def close(self):
+        """Shut down the loading workers (new ones are started if needed)."""
+        if self._executors is None:
+            return
+        for executor in self._executors:
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._executors = None
+        self._executors_params = None
+
     def start_loading(self, filename):
         op = self.dictionaries.get(filename)
-        if op is not None and not op.needs_reloading():
-            return op
+        if op is not None:
+            if not self._is_outdated(op):
+                return op
+            op.unload()
         log.info(
             "%s dictionary: %s", "loading" if op is None else "reloading", filename
         )
-        op = DictionaryLoadingOperation(filename, self._state_change_callback)
+        thread_pool, process_pool = self._get_executors()
+        op = DictionaryLoadingOperation(
+            filename,
+            self._state_change_callback,
+            progress_callback=self._progress_callback,
+            compact=self.compact,
+            reverse_indexes=self.reverse_indexes,
+            cache_dir=self.cache_dir,
+            journal=self.journal,
+            save_delay=self.save_delay,
+            executor=thread_pool,
+            process_executor=process_pool,
+        )
         self.dictionaries[filename] = op
         return op
 
     def unload_outdated(self):
         for filename, op in list(self.dictionaries.items()):
-            if op.needs_reloading():
+            if self._is_outdated(op):
+                op.unload()
                 del self.dictionaries[filename]
 
     def load(self, filenames):
@@ -58,19 +181,69 @@ class DictionaryLoadingManager:
 
 
 class DictionaryLoadingOperation:
-    def __init__(self, filename, state_change_callback):
+    def __init__(
+        self,
+        filename,
+        state_change_callback,
+        progress_callback=None,
+        compact=False,
+        reverse_indexes="eager",
+        cache_dir=None,
+        journal=False,
+        save_delay=0,
+        executor=None,
+        process_executor=None,
+    ):
         """
         Parameters:
         filename -- Path to dictionary file.
         state_change_callback -- A function that will be called when the load is finished
             with two parameters: the filename and the loaded StenoDictionary object
             (or an instance of ErroredDictionary if the load fails).
+        progress_callback -- If not None, a function that will be called to report
+            the loading progress, with two parameters: the filename and the progress.
+        compact -- If True, use compact storage for the loaded dictionary.
+        reverse_indexes -- When to build the reverse lookup indexes.
+        cache_dir -- If not None, directory used to cache the loaded dictionary.
+        journal -- If True, journal changes to a writable dictionary.
+        save_delay -- Delay before saving changes (in seconds).
+        executor -- If not None, executor used for loading the dictionary,
+            otherwise a new thread is started.
+        process_executor -- If not None, process pool executor used for
+            parsing the dictionary (for formats supporting it).
         """
         self._state_change_callback = state_change_callback
-        self.loading_thread = threading.Thread(target=self.load)
+        self._progress_callback = progress_callback
+        self._process_executor = process_executor
         self.filename = filename
+        self.compact = compact
+        self.reverse_indexes = reverse_indexes
+        self.cache_dir = cache_dir
+        self.journal = journal
+        self.save_delay = save_delay
         self.result = None
-        self.loading_thread.start()
+        if executor is None:
+            self.loading_thread = threading.Thread(target=self.load)
+            self.loading_thread.start()
+            self._future = None
+        else:
+            self.loading_thread = None
+            self._future = executor.submit(self.load)
+
+    def set_save_delay(self, delay):
+        self.save_delay = delay
+        if self.result is not None:
+            set_save_delay(self.result, delay)
+
+    def unload(self):
+        """Save pending changes, before the dictionary is dropped.
+
+        Note: so a delayed save does not overwrite a reloaded version.
+        """
+        try:
+            self.get().flush()
+        except Exception:
+            log.error("saving dictionary %s failed", self.filename, exc_info=True)
 
     def needs_reloading(self):
         try:
@@ -98,15 +271,38 @@ class DictionaryLoadingOperation:
         timestamp = None
         try:
             timestamp = resource_timestamp(self.filename)
-            self.result = load_dictionary(self.filename)
+            self.result = load_dictionary(
+                self.filename,
+                compact=self.compact,
+                reverse_indexes=self.reverse_indexes,
+                cache_dir=self.cache_dir,
+                journal=self.journal,
+                save_delay=self.save_delay,
+                progress=(
+                    None if self._progress_callback is None else self._report_progress
+                ),
+                parser=None if self._process_executor is None else self._parse,
+            )
         except Exception as e:
             log.debug("loading dictionary %s failed", self.filename, exc_info=True)
             from plover.engine import ErroredDictionary
 
             self.result = ErroredDictionary(self.filename, e)
             self.result.timestamp = timestamp
+        else:
+            # In case the delay was changed while loading.
+            set_save_delay(self.result, self.save_delay)
         self._state_change_callback(self.filename, self.result)
 
+    def _parse(self, resource):
+        return self._process_executor.submit(serialize_dictionary, resource).result()
+
+    def _report_progress(self, progress):
+        self._progress_callback(self.filename, progress)
+
     def get(self):
-        self.loading_thread.join()
+        if self._future is None:
+            self.loading_thread.join()
+        else:
+            self._future.result()
         return self.result
@@ -1,4 +1,5 @@
 from collections import deque
+from itertools import chain
 import sys
 import re
 
@@ -22,6 +23,10 @@ class BadRtfError(Exception):
 def finalize_translation(text):
     if not text:
         return text
+    # Fast path: nothing to do.
+    first = text[0]
+    if first not in ".?!:;," and not first.isspace() and not text[-1].isspace():
+        return text
     # caseCATalyst doesn't put punctuation in \cxp: treat any isolated
     # punctuation at the beginning of the translation as special.
     if text[0] in ".?!:;," and text[1:] in ("", " "):
@@ -35,262 +40,309 @@ def finalize_translation(text):
     return text
 
 
+# Simple mapping: `{\*\cxs STENO}TRANSLATION`, with no control words,
+# groups, or newlines in either part; to be unambiguous, it must be
+# followed by another mapping or the end of the document.
+SIMPLE_ENTRY_RX = re.compile(
+    r"\{\\\*\\cxs ([^\\{}\r\n\0]*)\}([^\\{}\r\n\0]*)[\r\n]*"
+    r"(?=\{\\\*\\cxs |\}[\r\n]*\Z)"
+)
+
+
+def _simple_entries(text):
+    """Find the simple mappings (see `SIMPLE_ENTRY_RX`) in <text>."""
+    for entry in SIMPLE_ENTRY_RX.finditer(text):
+        # Ignore matches starting on an escaped brace (`\{`).
+        start = pos = entry.start()
+        while pos and text[pos - 1] == "\\":
+            pos -= 1
+        if (start - pos) % 2:
+            continue
+        yield entry
+
+
+_ESCAPE_OR_CR_RX = re.compile(r"\\[\s\S]|\r")
+
+
+def _position(text, start, end):
+    """Return the tokenizer position (line and column) of <end> in <text>[<start>:]."""
+    lnum = text.count("\n", start, end)
+    line = text[text.rfind("\n", start, end) + 1 or start : end]
+    # Note: the tokenizer column is in UTF-8 bytes, and
+    # does not count (unescaped) carriage returns.
+    cnum = len(line.encode())
+    if "\r" in line:
+        cnum -= sum(m.group() == "\r" for m in _ESCAPE_OR_CR_RX.finditer(line))
+    return lnum, cnum
+
+
 def parse_rtfcre(text, normalize=lambda s: s, skip_errors=True):
+    # For speed, simple mappings (see `SIMPLE_ENTRY_RX`) are handled
+    # directly, and the tokenizer / state machine is only used for
+    # the rest: the document is split into segments, each ending
+    # with a simple mapping (if any), which is taken as is when the
+    # state machine reaches it from the top level.
+    document = text
     not_text = r"\{}"
     style_rx = re.compile("s[0-9]+")
-    tokenizer = RtfTokenizer(text)
-    next_token = tokenizer.next_token
-    rewind_token = tokenizer.rewind_token
-    # Check header.
-    if next_token() != "{" or next_token() != r"\rtf1":
-        raise BadRtfError("invalid header")
     # Parse header/document.
     g_destination, g_text = "rtf1", ""
     group_stack = deque()
     stylesheet = {}
     steno = None
-    while True:
-        token = next_token()
-        # EOF.
-        if token is None:
-            err = RtfParseError(
-                tokenizer.lnum, tokenizer.cnum, "unexpected end of file"
-            )
-            if not skip_errors:
-                raise err
-            log.error("%s", err)
-            break
-        # Group start.
-        if token == "{":
-            # Always rewind the last token?
-            rewind = False
-            # Is it an ignored group?
-            is_ignored = False
-            destination = None
+    # Depth of the ignored group being skipped.
+    skip_depth = 0
+    # Start of the current segment.
+    pos = 0
+    tokenizer = None
+
+    def error(fmt, *fmt_args):
+        lnum, cnum = tokenizer.lnum, tokenizer.cnum
+        base_lnum, base_cnum = _position(document, 0, pos)
+        if not lnum:
+            cnum += base_cnum
+        err = RtfParseError(base_lnum + lnum, cnum, fmt, *fmt_args)
+        if not skip_errors:
+            raise err
+        log.error("%s", err)
+
+    for entry in chain(_simple_entries(document), (None,)):
+        if entry is None:
+            end = len(document)
+            entry_position = None
+        else:
+            end = entry.end()
+            if pos and entry.start() == pos and not group_stack and not skip_depth:
+                # Fast path: no need to tokenize.
+                if steno is not None:
+                    yield normalize(steno), finalize_translation(g_text)
+                steno, g_text = entry.groups()
+                pos = end
+                continue
+            entry_position = _position(document, pos, entry.start())
+        tokenizer = RtfTokenizer(document[pos:end])
+        next_token = tokenizer.next_token
+        rewind_token = tokenizer.rewind_token
+        if not pos:
+            # Check header.
+            if next_token() != "{" or next_token() != r"\rtf1":
+                raise BadRtfError("invalid header")
+        while True:
             token = next_token()
-            # Ignored?
-            if token == r"\*":
-                token = next_token()
-                is_ignored = True
-            # Destination?
-            if token[0] == "\\":
-                destination = token[1:]
-                # Steno.
-                if destination == "cxs":
-                    if group_stack:
-                        err = RtfParseError(
-                            tokenizer.lnum,
-                            tokenizer.cnum,
-                            "starting new mapping, but previous is unfinished",
-                        )
-                        if not skip_errors:
-                            raise err
-                        log.error("%s", err)
-                        # Simulate missing group end(s).
-                        assert group_stack[0][0] == "rtf1"
-                        rewind_token(token)
-                        if is_ignored:
-                            rewind_token(r"\*")
-                        rewind_token("{")
-                        for __ in range(len(group_stack)):
-                            rewind_token("}")
-                        continue
+            # End of segment / EOF.
+            if token is None:
+                if entry is None:
+                    error("unexpected end of file")
+                break
+            # Skip ignored content.
+            if skip_depth:
+                if token == "{":
+                    skip_depth += 1
+                elif token == "}":
+                    skip_depth -= 1
+                continue
+            # Group start.
+            if token == "{":
+                if (
+                    not group_stack
+                    and (tokenizer.lnum, tokenizer.cnum) == entry_position
+                ):
+                    # Simple mapping.
                     if steno is not None:
                         yield normalize(steno), finalize_translation(g_text)
-                        steno = None
-                    is_ignored = False
-                    # Reset text.
-                    g_text = ""
-                elif destination in {
-                    # Fingerspelling.
-                    "cxfing",
-                    # Stenovations extensions...
-                    "cxsvatdictflags",
-                    # Plover macro.
-                    "cxplovermacro",
-                    # Plover meta.
-                    "cxplovermeta",
-                }:
-                    is_ignored = False
-                elif style_rx.fullmatch(destination):
-                    pass
+                    steno, g_text = entry.groups()
+                    break
+                # Always rewind the last token?
+                rewind = False
+                # Is it an ignored group?
+                is_ignored = False
+                destination = None
+                token = next_token()
+                # Ignored?
+                if token == r"\*":
+                    token = next_token()
+                    is_ignored = True
+                # Destination?
+                if token[0] == "\\":
+                    destination = token[1:]
+                    # Steno.
+                    if destination == "cxs":
+                        if group_stack:
+                            error("starting new mapping, but previous is unfinished")
+                            # Simulate missing group end(s).
+                            assert group_stack[0][0] == "rtf1"
+                            rewind_token(token)
+                            if is_ignored:
+                                rewind_token(r"\*")
+                            rewind_token("{")
+                            for __ in range(len(group_stack)):
+                                rewind_token("}")
+                            continue
+                        if steno is not None:
+                            yield normalize(steno), finalize_translation(g_text)
+                            steno = None
+                        is_ignored = False
+                        # Reset text.
+                        g_text = ""
+                    elif destination in {
+                        # Fingerspelling.
+                        "cxfing",
+                        # Stenovations extensions...
+                        "cxsvatdictflags",
+                        # Plover macro.
+                        "cxplovermacro",
+                        # Plover meta.
+                        "cxplovermeta",
+                    }:
+                        is_ignored = False
+                    elif style_rx.fullmatch(destination):
+                        pass
+                    else:
+                        # In the case of e.g. `{\par...`,
+                        # `\par` must be handled as a
+                        # control word.
+                        rewind = True
                 else:
-                    # In the case of e.g. `{\par...`,
-                    # `\par` must be handled as a
-                    # control word.
                     rewind = True
-            else:
-                rewind = True
-            if is_ignored:
-                # Skip ignored content.
-                stack_depth = 1
-                while True:
+                if is_ignored:
+                    skip_depth = 1
+                    continue
+                group_stack.append((g_destination, g_text))
+                g_destination, g_text = destination, ""
+                if rewind:
+                    rewind_token(token)
+                continue
+            # Group end.
+            if token == "}":
+                if not group_stack:
                     token = next_token()
                     if token is None:
-                        err = RtfParseError(
-                            tokenizer.lnum, tokenizer.cnum, "unexpected end of file"
-                        )
-                        if not skip_errors:
-                            raise err
-                        log.error("%s", err)
+                        # The end...
                         break
-                    if token == "{":
-                        stack_depth += 1
-                    elif token == "}":
-                        stack_depth -= 1
-                        if not stack_depth:
-                            break
-                if stack_depth:
-                    break
-                continue
-            group_stack.append((g_destination, g_text))
-            g_destination, g_text = destination, ""
-            if rewind:
-                rewind_token(token)
-            continue
-        # Group end.
-        if token == "}":
-            if not group_stack:
-                token = next_token()
-                if token is None:
-                    # The end...
-                    break
-                err = RtfParseError(
-                    tokenizer.lnum,
-                    tokenizer.cnum,
-                    "expected end of file, got: %r",
-                    token[0],
-                )
-                if not skip_errors:
-                    raise err
-                log.error("%s", err)
-                rewind_token(token)
-                continue
-            # Steno.
-            if g_destination == "cxs":
-                steno = g_text
-                text = ""
-            # Punctuation.
-            elif g_destination == "cxp":
-                text = g_text.strip()
-                if text in {".", "!", "?", ",", ";", ":"}:
-                    text = "{" + text + "}"
-                elif text == "'":
-                    text = "{^'}"
-                elif text in ("-", "/"):
-                    text = "{^" + text + "^}"
-                else:
-                    # Show unknown punctuation as given.
-                    text = "{^" + g_text + "^}"
-            # Stenovations extensions...
-            elif g_destination == "cxsvatdictflags":
-                if "N" in g_text:
-                    text = "{-|}"
-                else:
-                    text = ""
-            # Fingerspelling.
-            elif g_destination == "cxfing":
-                text = "{&" + g_text + "}"
-            # Plover macro.
-            elif g_destination == "cxplovermacro":
-                text = "=" + g_text
-            # Plover meta.
-            elif g_destination == "cxplovermeta":
-                text = "{" + g_text + "}"
-            # Style declaration.
-            elif (
-                g_destination is not None
-                and style_rx.fullmatch(g_destination)
-                and group_stack[-1][0] == "stylesheet"
-            ):
-                stylesheet[g_destination] = g_text
-            else:
-                text = g_text
-            g_destination, g_text = group_stack.pop()
-            g_text += text
-            continue
-        # Control char/word.
-        if token[0] == "\\":
-            ctrl = token[1:]
-            text = {
-                # Ignore.
-                "*": "",
-                # Hard space.
-                "~": "{^ ^}",
-                # Non-breaking hyphen.
-                "_": "{^-^}",
-                # Escaped newline: \par.
-                "": "\n\n",
-                "\n": "\n\n",
-                "\r": "\n\n",
-                # Escaped characters.
-                "\\": "\\",
-                "{": "{",
-                "}": "}",
-                "-": "-",
-                # Line break.
-                "line": "\n",
-                # Paragraph break.
-                "par": "\n\n",
-                # Tab.
-                "tab": "\t",
-                # Force Cap.
-                "cxfc": "{-|}",
-                # Force Lower Case.
-                "cxfl": "{>}",
-            }.get(ctrl)
-            if text is not None:
-                g_text += text
-            # Delete Spaces.
-            elif ctrl == "cxds":
-                token = next_token()
-                if token is None or token[0] in not_text:
-                    g_text += "{^}"
+                    error("expected end of file, got: %r", token[0])
                     rewind_token(token)
+                    continue
+                # Steno.
+                if g_destination == "cxs":
+                    steno = g_text
+                    text = ""
+                # Punctuation.
+                elif g_destination == "cxp":
+                    text = g_text.strip()
+                    if text in {".", "!", "?", ",", ";", ":"}:
+                        text = "{" + text + "}"
+                    elif text == "'":
+                        text = "{^'}"
+                    elif text in ("-", "/"):
+                        text = "{^" + text + "^}"
+                    else:
+                        # Show unknown punctuation as given.
+                        text = "{^" + g_text + "^}"
+                # Stenovations extensions...
+                elif g_destination == "cxsvatdictflags":
+                    if "N" in g_text:
+                        text = "{-|}"
+                    else:
+                        text = ""
+                # Fingerspelling.
+                elif g_destination == "cxfing":
+                    text = "{&" + g_text + "}"
+                # Plover macro.
+                elif g_destination == "cxplovermacro":
+                    text = "=" + g_text
+                # Plover meta.
+                elif g_destination == "cxplovermeta":
+                    text = "{" + g_text + "}"
+                # Style declaration.
+                elif (
+                    g_destination is not None
+                    and style_rx.fullmatch(g_destination)
+                    and group_stack[-1][0] == "stylesheet"
+                ):
+                    stylesheet[g_destination] = g_text
                 else:
-                    text = token
+                    text = g_text
+                g_destination, g_text = group_stack.pop()
+                g_text += text
+                continue
+            # Control char/word.
+            if token[0] == "\\":
+                ctrl = token[1:]
+                text = {
+                    # Ignore.
+                    "*": "",
+                    # Hard space.
+                    "~": "{^ ^}",
+                    # Non-breaking hyphen.
+                    "_": "{^-^}",
+                    # Escaped newline: \par.
+                    "": "\n\n",
+                    "\n": "\n\n",
+                    "\r": "\n\n",
+                    # Escaped characters.
+                    "\\": "\\",
+                    "{": "{",
+                    "}": "}",
+                    "-": "-",
+                    # Line break.
+                    "line": "\n",
+                    # Paragraph break.
+                    "par": "\n\n",
+                    # Tab.
+                    "tab": "\t",
+                    # Force Cap.
+                    "cxfc": "{-|}",
+                    # Force Lower Case.
+                    "cxfl": "{>}",
+                }.get(ctrl)
+                if text is not None:
+                    g_text += text
+                # Delete Spaces.
+                elif ctrl == "cxds":
                     token = next_token()
-                    if token == r"\cxds":
-                        # Infix
-                        g_text += "{^" + text + "^}"
+                    if token is None or token[0] in not_text:
+                        g_text += "{^}"
+                        rewind_token(token)
                     else:
-                        # Prefix.
-                        g_text += "{^" + text + "}"
+                        text = token
+                        token = next_token()
+                        if token == r"\cxds":
+                            # Infix
+                            g_text += "{^" + text + "^}"
+                        else:
+                            # Prefix.
+                            g_text += "{^" + text + "}"
+                            rewind_token(token)
+                # Delete Last Stroke.
+                elif ctrl == "cxdstroke":
+                    g_text = "=undo"
+                # Fingerspelling.
+                elif ctrl == "cxfing":
+                    token = next_token()
+                    if token is None or token[0] in not_text:
+                        error("expected text, got: %r", token)
                         rewind_token(token)
-            # Delete Last Stroke.
-            elif ctrl == "cxdstroke":
-                g_text = "=undo"
-            # Fingerspelling.
-            elif ctrl == "cxfing":
-                token = next_token()
-                if token is None or token[0] in not_text:
-                    err = RtfParseError(
-                        tokenizer.lnum, tokenizer.cnum, "expected text, got: %r", token
-                    )
-                    if not skip_errors:
-                        raise err
-                    log.error("%s", err)
-                    rewind_token(token)
-                else:
-                    g_text += "{&" + token + "}"
-            elif style_rx.fullmatch(ctrl):
-                # Workaround for caseCATalyst declaring
-                # new styles without a preceding \par.
-                if not g_text.endswith("\n\n"):
-                    g_text += "\n\n"
-                # Indent continuation styles.
-                if stylesheet.get(ctrl, "").startswith("Contin"):
-                    g_text += "    "
-            continue
-        # Text.
-        text = token
-        token = next_token()
-        if token == r"\cxds":
-            # Suffix.
-            text = "{" + text + "^}"
-        else:
-            rewind_token(token)
-        g_text += text
+                    else:
+                        g_text += "{&" + token + "}"
+                elif style_rx.fullmatch(ctrl):
+                    # Workaround for caseCATalyst declaring
+                    # new styles without a preceding \par.
+                    if not g_text.endswith("\n\n"):
+                        g_text += "\n\n"
+                    # Indent continuation styles.
+                    if stylesheet.get(ctrl, "").startswith("Contin"):
+                        g_text += "    "
+                continue
+            # Text.
+            text = token
+            token = next_token()
+            if token == r"\cxds":
+                # Suffix.
+                text = "{" + text + "^}"
+            else:
+                rewind_token(token)
+            g_text += text
+        pos = end
     if steno is not None:
         yield normalize(steno), finalize_translation(g_text)
 
@@ -1,17 +1,20 @@
 from collections import namedtuple, OrderedDict
 from functools import wraps
 from queue import Queue
+import copy
 import functools
 import os
 import shutil
 import threading
 
 from plover import log, system
+from plover.dictionary.cache import CACHE_DIR
 from plover.dictionary.loading_manager import DictionaryLoadingManager
 from plover.formatting import Formatter
 from plover.misc import shorten_path
 from plover.registry import registry
 from plover.resource import ASSET_SCHEME, resource_filename
+from plover.search import SUBSTRING, TranslationIndex
 from plover.steno import Stroke
 from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
 from plover.suggestions import Suggestions
@@ -42,6 +45,17 @@ class ErroredDictionary(StenoDictionary):
         return (self.path, self.exception) == (other.path, other.exception)
 
 
+class LoadingDictionary(StenoDictionary):
+    """Placeholder for dictionaries being loaded."""
+
+    def __init__(self, path, progress):
+        super().__init__()
+        self.enabled = False
+        self.readonly = True
+        self.path = path
+        self.progress = progress
+
+
 def copy_default_dictionaries(dictionaries_files):
     """Recreate default dictionaries.
 
@@ -84,6 +98,7 @@ class StenoEngine:
     config_changed
     dictionaries_loaded
     dictionary_state_changed
+    dictionary_loading_progress
     send_string
     send_backspaces
     send_key_combination
@@ -95,8 +110,22 @@ class StenoEngine:
     quit
     """.split()
 
+    # Maximum number of cached lookups results (see `_lookup`).
+    LOOKUP_CACHE_SIZE = 1024
+
+    # Number of lock-free attempts for dictionaries queries (see `_read`).
+    READ_ATTEMPTS = 3
+
+    # Errors a concurrent change can make a lock-free query fail with
+    # (e.g. a dictionary changed size during iteration, or inconsistent
+    # compact storage).
+    READ_CONCURRENCY_ERRORS = (RuntimeError, LookupError, ValueError)
+
     def __init__(self, config, controller, keyboard_emulation):
         self._config = config
+        # Read-only snapshot of the configuration, published on changes,
+        # `None` if outdated (see `config`).
+        self._config_snapshot = None
         self._controller = controller
         self._is_running = False
         self._queue = Queue()
@@ -118,8 +147,14 @@ class StenoEngine:
         self._translator.add_listener(log.translation)
         self._translator.add_listener(self._formatter.format)
         self._dictionaries = self._translator.get_dictionary()  # type: StenoDictionaryCollection
+        self._suggestions = Suggestions(self._dictionaries)
+        self._cached_lookup = functools.lru_cache(maxsize=self.LOOKUP_CACHE_SIZE)(
+            self._cached_lookup
+        )
+        self._translation_index = TranslationIndex()
         self._dictionaries_manager = DictionaryLoadingManager(
-            functools.partial(self._trigger_hook, "dictionary_state_changed")
+            functools.partial(self._trigger_hook, "dictionary_state_changed"),
+            functools.partial(self._trigger_hook, "dictionary_loading_progress"),
         )
         self._running_state = self._translator.get_state()
         self._translator.clear_state()
@@ -184,9 +219,11 @@ class StenoEngine:
             # No change.
             return
         self._dictionaries.set_dicts(dictionaries)
+        self._suggestions.update()
         self._trigger_hook(
             "dictionaries_loaded", StenoDictionaryCollection(dictionaries)
         )
+        self._translation_index.update(dictionaries)
 
     def _update(self, config_update=None, full=False, reset_machine=False):
         original_config = self._config.as_dict()
@@ -196,6 +233,9 @@ class StenoEngine:
             config = self._config.as_dict()
         else:
             config = original_config
+        # Note: deep copy, so changes to the configuration (or to the
+        # values returned to readers) do not affect the snapshot.
+        self._config_snapshot = copy.deepcopy(config)
         # Create configuration update.
         if full:
             config_update = config
@@ -273,6 +313,16 @@ class StenoEngine:
         # Update dictionaries.
         config_dictionaries = OrderedDict((d.path, d) for d in config["dictionaries"])
         copy_default_dictionaries(config_dictionaries.keys())
+        self._dictionaries_manager.compact = config["compact_dictionaries"]
+        self._dictionaries_manager.reverse_indexes = config["reverse_indexes"]
+        self._dictionaries_manager.cache_dir = (
+            CACHE_DIR if config["dictionaries_cache"] else None
+        )
+        self._dictionaries_manager.journal = config["dictionaries_journal"]
+        self._dictionaries_manager.save_delay = config["dictionaries_save_delay"] / 1000
+        self._dictionaries_manager.loader = config["dictionaries_loader"]
+        self._dictionaries_manager.workers = config["dictionaries_loader_workers"]
+        self._dictionaries.merged_index = config["merged_dictionary_index"]
         # Start by unloading outdated dictionaries.
         self._dictionaries_manager.unload_outdated()
         self._set_dictionaries(
@@ -324,6 +374,14 @@ class StenoEngine:
 
     def _quit(self, code):
         self._stop()
+        for d in self._dictionaries.dicts:
+            try:
+                d.flush()
+                if d.journal is not None:
+                    d.journal.compact()
+            except Exception:
+                log.error("saving dictionary %s failed", d.path, exc_info=True)
+        self._dictionaries_manager.close()
         self.code = code
         self._trigger_hook("quit")
         return True
@@ -449,18 +507,28 @@ class StenoEngine:
     def output(self, enabled):
         self._same_thread_hook(self._set_output, enabled)
 
+    # Note: no locking, a snapshot of the configuration
+    # is published by the engine thread on changes, and
+    # readers get their own (deep) copy of its values.
     @property
-    @with_lock
     def config(self):
-        return self._config.as_dict()
+        config = self._config_snapshot
+        if config is None:
+            with self._lock:
+                config = self._config_snapshot = copy.deepcopy(self._config.as_dict())
+        return copy.deepcopy(config)
 
     @config.setter
     def config(self, update):
         self._same_thread_hook(self._update, config_update=update)
 
-    @with_lock
     def __getitem__(self, setting):
-        return self._config[setting]
+        config = self._config_snapshot
+        # Note: per machine / system settings are not part of the snapshot.
+        if config is not None and setting in config:
+            return copy.deepcopy(config[setting])
+        with self._lock:
+            return self._config[setting]
 
     def __setitem__(self, setting, value):
         self.config = {setting: value}
@@ -477,6 +545,8 @@ class StenoEngine:
             )
             self._config.clear()
             return False
+        finally:
+            self._config_snapshot = None
         return True
 
     def start(self):
@@ -494,31 +564,80 @@ class StenoEngine:
     def join(self):
         return self.code
 
-    @with_lock
+    def _cached_lookup(self, method, key, generation):
+        # Note: <generation> is only used as part of the cache key.
+        result = getattr(self._dictionaries, method)(key)
+        if isinstance(result, set):
+            # Don't let callers change the cached result.
+            result = frozenset(result)
+        return result
+
+    def _lookup(self, method, key):
+        """Call the dictionaries' lookup <method>, using the results cache.
+
+        Note: sets are returned as (read-only) frozensets.
+        """
+        # Note: the generation must be fetched before the lookup.
+        generation = self._dictionaries.generation
+        if generation is None or generation % 2:
+            # Untracked changes, or changes in progress.
+            return getattr(self._dictionaries, method)(key)
+        result = self._cached_lookup(method, key, generation)
+        if self._dictionaries.generation != generation:
+            # The result may include a partially applied change: don't
+            # keep it (results of older generations are useless anyway).
+            self._cached_lookup.cache_clear()
+        return result
+
+    def _read(self, func, *args):
+        """Query the dictionaries, without blocking the engine thread.
+
+        The query is done without the engine lock, and its result is
+        only used if no changes were in progress, or made in the meantime
+        (see `StenoDictionaryCollection.generation`). After a few failed
+        attempts (or if changes cannot be tracked), the lock is taken.
+
+        Errors are only retried if they can be caused by a concurrent change
+        (see `READ_CONCURRENCY_ERRORS`), and one was made during the query.
+        """
+        for __ in range(self.READ_ATTEMPTS):
+            generation = self._dictionaries.generation
+            if generation is None:
+                break
+            if generation % 2:
+                # Changes in progress.
+                continue
+            try:
+                result = func(*args)
+            except self.READ_CONCURRENCY_ERRORS:
+                if self._dictionaries.generation == generation:
+                    # Not caused by a concurrent change.
+                    raise
+                continue
+            if self._dictionaries.generation == generation:
+                return result
+        with self._lock:
+            return func(*args)
+
     def lookup(self, translation):
-        return self._dictionaries.lookup(translation)
+        return self._read(self._lookup, "lookup", translation)
 
-    @with_lock
     def raw_lookup(self, translation):
-        return self._dictionaries.raw_lookup(translation)
+        return self._read(self._lookup, "raw_lookup", translation)
 
-    @with_lock
     def lookup_from_all(self, translation):
-        return self._dictionaries.lookup_from_all(translation)
+        return self._read(self._dictionaries.lookup_from_all, translation)
 
-    @with_lock
     def raw_lookup_from_all(self, translation):
-        return self._dictionaries.raw_lookup_from_all(translation)
+        return self._read(self._dictionaries.raw_lookup_from_all, translation)
 
-    @with_lock
     def reverse_lookup(self, translation):
-        matches = self._dictionaries.reverse_lookup(translation)
-        return [] if matches is None else matches
+        matches = self._read(self._lookup, "reverse_lookup", translation)
+        return [] if matches is None else set(matches)
 
-    @with_lock
     def casereverse_lookup(self, translation):
-        matches = self._dictionaries.casereverse_lookup(translation)
-        return set() if matches is None else matches
+        matches = self._read(self._lookup, "casereverse_lookup", translation)
+        return set() if matches is None else set(matches)
 
     @with_lock
     def add_dictionary_filter(self, dictionary_filter):
@@ -528,12 +647,23 @@ class StenoEngine:
     def remove_dictionary_filter(self, dictionary_filter):
         self._dictionaries.remove_filter(dictionary_filter)
 
-    @with_lock
     def get_suggestions(self, translation):
-        return Suggestions(self._dictionaries).find(translation)
+        return self._read(self._suggestions.find, translation)
+
+    # Note: no locking, the index is built in the background,
+    # and searching it does not block the engine thread.
+    def search_translations(self, pattern, mode=SUBSTRING, limit=50, max_distance=1):
+        """Search the translations of the loaded dictionaries.
+
+        Note: the search index is built on the first call, which
+        waits for it. See `plover.search.TranslationIndex.search`.
+        """
+        return self._translation_index.search(
+            pattern, mode=mode, limit=limit, max_distance=max_distance
+        )
 
+    # Note: no locking, as this only fetches the (live) state object.
     @property
-    @with_lock
     def translator_state(self):
         return self._translator.get_state()
 
@@ -573,8 +703,8 @@ class StenoEngine:
         self._dictionaries.set(strokes, translation, path=dictionary_path)
         self._dictionaries.save(path_list=(dictionary_path,))
 
+    # Note: no locking, the collection itself is never replaced.
     @property
-    @with_lock
     def dictionaries(self):
         return self._dictionaries
 
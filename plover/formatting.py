@@ -8,8 +8,8 @@ This module defines and implements plover's custom dictionary language.
 """
 
 from enum import Enum
-from os.path import commonprefix
 from collections import namedtuple
+import operator
 import re
 import string
 
@@ -186,6 +186,7 @@ class RetroFormatter:
     """
 
     FRAGMENT_RX = re.compile(r"\s*[^\s]+\s*|^\s*$")
+    FRAGMENT_SPLIT_RX = re.compile(r"(?<=\s)(?=[^\s])")
 
     def __init__(self, previous_translations):
         self.previous_translations = previous_translations
@@ -195,15 +196,13 @@ class RetroFormatter:
         for translation in reversed(self.previous_translations):
             yield from reversed(translation.formatting)
 
-    def iter_last_fragments(self):
-        """Iterate over last text fragments (last first).
+    def iter_last_text(self):
+        """Iterate over last text (last first), in chunks.
 
-        A text fragment is a series of non-whitespace characters
-        followed by zero or more trailing whitespace characters.
+        Replaced text is skipped, and spaces are included.
         """
         replace = 0
         next_action = None
-        current_fragment = ""
         for action in self.iter_last_actions():
             part = "" if action.text is None else action.text
             if (
@@ -221,23 +220,45 @@ class RetroFormatter:
                     replace -= len(part)
                     part = ""
             if part:
-                # Find out new complete fragments.
-                fragments = self.FRAGMENT_RX.findall(part + current_fragment)
-                yield from reversed(fragments[1:])
-                current_fragment = fragments[0]
+                yield part
             replace += len(action.prev_replace)
             next_action = action
+
+    def iter_last_fragments(self):
+        """Iterate over last text fragments (last first).
+
+        A text fragment is a series of non-whitespace characters
+        followed by zero or more trailing whitespace characters.
+        """
+        # Chunks of the current fragment (last first): only new
+        # text is scanned, so the cost is linear in the text size.
+        current_fragment = []
+        for part in self.iter_last_text():
+            if (
+                current_fragment
+                and part[-1].isspace()
+                and not current_fragment[-1][0].isspace()
+            ):
+                yield "".join(reversed(current_fragment))
+                current_fragment = []
+            pieces = self.FRAGMENT_SPLIT_RX.split(part)
+            current_fragment.append(pieces.pop())
+            for piece in reversed(pieces):
+                yield "".join(reversed(current_fragment))
+                current_fragment = [piece]
         # Don't forget to process the current (first) fragment.
-        if not current_fragment.isspace():
-            yield current_fragment.lstrip()
+        fragment = "".join(reversed(current_fragment))
+        if not fragment.isspace():
+            yield fragment.lstrip()
 
     def last_fragments(self, count=1):
         """Return the last <count> text fragments."""
         fragment_list = []
         for fragment in self.iter_last_fragments():
-            fragment_list.insert(0, fragment)
+            fragment_list.append(fragment)
             if len(fragment_list) == count:
                 break
+        fragment_list.reverse()
         return fragment_list
 
     def iter_last_words(self, strip=False, rx=WORD_RX):
@@ -260,20 +281,28 @@ class RetroFormatter:
         """Return the last <count> words."""
         word_list = []
         for w in self.iter_last_words(strip=strip, rx=rx):
-            word_list.insert(0, w)
+            word_list.append(w)
             if len(word_list) == count:
                 break
+        word_list.reverse()
         return word_list
 
     def last_text(self, size):
         """Return the last <size> characters."""
-        text = ""
         if not size:
-            return text
-        for fragment in self.iter_last_fragments():
-            text = fragment + text
-            if len(text) >= size:
+            return ""
+        part_list = []
+        length = 0
+        text_iter = self.iter_last_text()
+        for part in text_iter:
+            part_list.append(part)
+            length += len(part)
+            if length >= size:
                 break
+        text = "".join(reversed(part_list))
+        if not text[:-size].strip() and not any(part.strip() for part in text_iter):
+            # Leading whitespace is ignored (like for fragments).
+            text = text.lstrip()
         return text[-size:]
 
 
@@ -408,6 +437,53 @@ class Formatter:
         """
         assert undo or do
 
+        old, new = self.format_actions(undo, do, prev)
+
+        # Figure out what really changed.
+
+        min_length = min(len(old), len(new))
+        for i in range(min_length):
+            if old[i] != new[i]:
+                break
+        else:
+            i = min_length
+
+        if i > 0:
+            optimized_away = old[:i]
+            old = old[i:]
+            new = new[i:]
+        else:
+            optimized_away = []
+
+        # Notify listeners.
+
+        for callback in self._listeners:
+            callback(old, new)
+
+        # Render output.
+
+        if optimized_away:
+            last_action = optimized_away[-1]
+        elif prev and prev[-1].formatting:
+            last_action = prev[-1].formatting[-1]
+        else:
+            last_action = None
+
+        OutputHelper(
+            self._output, self.last_output_spaces_after, self.spaces_after
+        ).render(last_action, old, new)
+        self.last_output_spaces_after = self.spaces_after
+
+    def format_actions(self, undo, do, prev):
+        """Format the given translations, without rendering any output.
+
+        The arguments are the same as for `format`: the formatting
+        attribute of the translations in do is filled in, and previous
+        look-ahead actions are updated.
+
+        Return the list of old actions, and the list of new actions.
+
+        """
         if do:
             last_action = self.last_action(prev)
             ctx = _Context(prev or (), last_action)
@@ -450,40 +526,80 @@ class Formatter:
                         break
                     tail.insert(0, a)
 
-        # Figure out what really changed.
+        return old, new
 
-        min_length = min(len(old), len(new))
-        for i in range(min_length):
-            if old[i] != new[i]:
-                break
-        else:
-            i = min_length
 
-        if i > 0:
-            optimized_away = old[:i]
-            old = old[i:]
-            new = new[i:]
-        else:
-            optimized_away = []
+class _TextBuffer:
+    """Text buffer, for efficiently appending or erasing text at the end.
 
-        # Notify listeners.
+    The text is kept as a list of chunks (e.g. one per action), so the
+    cost of an operation does not depend on the size of the whole text.
+    """
 
-        for callback in self._listeners:
-            callback(old, new)
+    __slots__ = ("_chunks", "_length")
 
-        # Render output.
+    def __init__(self, text=""):
+        self.reset(text)
 
-        if optimized_away:
-            last_action = optimized_away[-1]
-        elif prev and prev[-1].formatting:
-            last_action = prev[-1].formatting[-1]
-        else:
-            last_action = None
+    def reset(self, text=""):
+        """Reset the buffer content to <text>."""
+        self._chunks = [text] if text else []
+        self._length = len(text)
 
-        OutputHelper(
-            self._output, self.last_output_spaces_after, self.spaces_after
-        ).render(last_action, old, new)
-        self.last_output_spaces_after = self.spaces_after
+    def __len__(self):
+        return self._length
+
+    def __str__(self):
+        return "".join(self._chunks)
+
+    def append(self, text):
+        if text:
+            self._chunks.append(text)
+            self._length += len(text)
+
+    def erase(self, count):
+        """Erase the last <count> characters."""
+        chunks = self._chunks
+        self._length -= count
+        if chunks and 0 < count < len(chunks[-1]):
+            chunks[-1] = chunks[-1][:-count]
+            return
+        while count:
+            chunk = chunks.pop()
+            if count < len(chunk):
+                chunks.append(chunk[:-count])
+                break
+            count -= len(chunk)
+
+    def endswith(self, text):
+        chunks = self._chunks
+        if chunks and len(text) <= len(chunks[-1]):
+            return chunks[-1].endswith(text)
+        if len(text) > self._length:
+            return False
+        n = len(chunks)
+        size = 0
+        while size < len(text):
+            n -= 1
+            size += len(chunks[n])
+        return "".join(chunks[n:]).endswith(text)
+
+
+def _common_prefix_length(a, b):
+    """Return the length of the common prefix of strings a and b."""
+    hi = min(len(a), len(b))
+    if a[:hi] == b[:hi]:
+        return hi
+    # Bisect to the first difference, only comparing the
+    # remaining range, so the total cost is linear.
+    lo = 0
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid
+    return lo
 
 
 class TextFormatter:
@@ -494,19 +610,23 @@ class TextFormatter:
         # Initial replaced text.
         self.replaced_text = ""
         # New appended text.
-        self.appended_text = ""
+        self._appended = _TextBuffer()
         self.trailing_space = ""
 
+    @property
+    def appended_text(self):
+        return str(self._appended)
+
     def _render_action(self, action):
+        appended = self._appended
         if self.spaces_after and self.trailing_space:
-            assert self.appended_text.endswith(self.trailing_space)
-            self.appended_text = self.appended_text[: -len(self.trailing_space)]
+            assert appended.endswith(self.trailing_space)
+            appended.erase(len(self.trailing_space))
         if action.prev_replace:
             replaced = len(action.prev_replace)
-            appended = len(self.appended_text)
-            if replaced > appended:
-                assert action.prev_replace.endswith(self.appended_text)
-                replaced -= appended
+            if replaced > len(appended):
+                assert action.prev_replace.endswith(str(appended))
+                replaced -= len(appended)
                 if replaced > len(self.replaced_text):
                     assert action.prev_replace.endswith(self.replaced_text)
                     self.replaced_text = action.prev_replace[:replaced]
@@ -514,18 +634,19 @@ class TextFormatter:
                     assert self.replaced_text.endswith(action.prev_replace)
                     self.replaced_text = self.replaced_text[:-replaced]
                     self.replaced_text += action.prev_replace[:replaced]
-                self.appended_text = ""
+                appended.reset()
             else:
-                assert self.appended_text.endswith(action.prev_replace)
-                self.appended_text = self.appended_text[:-replaced]
+                assert appended.endswith(action.prev_replace)
+                appended.erase(replaced)
+        text = action.text
         if not action.prev_attach:
-            self.appended_text += action.space_char
-        self.appended_text += action.text
+            text = action.space_char + text
         if self.spaces_after and not action.next_attach:
-            self.appended_text += action.space_char
+            text += action.space_char
             self.trailing_space = action.space_char
         else:
             self.trailing_space = ""
+        appended.append(text)
 
     def render(self, action_list, last_action):
         """Render a series of action.
@@ -535,7 +656,7 @@ class TextFormatter:
         """
         if self.spaces_after and last_action is not None:
             self.trailing_space = last_action.trailing_space
-            self.appended_text = last_action.trailing_space
+            self._appended.reset(last_action.trailing_space)
         for action in action_list:
             if action.text is None:
                 yield action
@@ -545,7 +666,7 @@ class TextFormatter:
     def reset(self, trailing_space):
         """Reset current state (rendered text)."""
         self.replaced_text = ""
-        self.appended_text = trailing_space
+        self._appended.reset(trailing_space)
 
 
 class OutputHelper:
@@ -572,21 +693,24 @@ class OutputHelper:
         # 2
         # >>> len(unicodedata.normalize('NFC', u"C\u0327"))
         # 1
-        if len(self.before.replaced_text) > len(self.after.replaced_text):
-            assert self.before.replaced_text.endswith(self.after.replaced_text)
-            replaced_text = self.before.replaced_text
+        before_replaced = self.before.replaced_text
+        after_replaced = self.after.replaced_text
+        # Only the longest replaced text matters: the other one is a suffix.
+        if len(before_replaced) > len(after_replaced):
+            assert before_replaced.endswith(after_replaced)
+            before = self.before.appended_text
+            after = (
+                before_replaced[: len(before_replaced) - len(after_replaced)]
+                + self.after.appended_text
+            )
         else:
-            assert self.after.replaced_text.endswith(self.before.replaced_text)
-            replaced_text = self.after.replaced_text
-        before = (
-            replaced_text[: len(replaced_text) - len(self.before.replaced_text)]
-            + self.before.appended_text
-        )
-        after = (
-            replaced_text[: len(replaced_text) - len(self.after.replaced_text)]
-            + self.after.appended_text
-        )
-        common_length = len(commonprefix([before, after]))
+            assert after_replaced.endswith(before_replaced)
+            before = (
+                after_replaced[: len(after_replaced) - len(before_replaced)]
+                + self.before.appended_text
+            )
+            after = self.after.appended_text
+        common_length = _common_prefix_length(before, after)
         erased = len(before) - common_length
         if erased:
             self.output.send_backspaces(erased)
@@ -610,6 +734,51 @@ class OutputHelper:
         self.flush()
 
 
+class _TextOutput:
+    """Output accumulating text, used by `translations_to_text`."""
+
+    def __init__(self):
+        self.text = ""
+
+    def send_backspaces(self, n):
+        # Note: text that was already yielded cannot be erased.
+        self.text = self.text[: max(len(self.text) - n, 0)]
+
+    def send_string(self, s):
+        self.text += s
+
+    def send_key_combination(self, c):
+        pass
+
+    def send_engine_command(self, c):
+        pass
+
+
+def translations_to_text(translations, spaces_after=False, context=1024):
+    """Render a stream of formatted translations to text.
+
+    Meant for the output of `plover.translation.translate_stream`: the text
+    is generated in chunks, the last context characters being held back
+    since following translations can still change them (e.g. retroactive
+    formatting). Key combinations and engine commands are ignored.
+
+    """
+    output = _TextOutput()
+    last_action = None
+    for t in translations:
+        if not t.formatting:
+            continue
+        OutputHelper(output, spaces_after, spaces_after).render(
+            last_action, (), t.formatting
+        )
+        last_action = t.formatting[-1]
+        if len(output.text) > 2 * context:
+            yield output.text[:-context]
+            output.text = output.text[-context:]
+    if output.text:
+        yield output.text
+
+
 class _Action:
     """A hybrid class that stores instructions and resulting state.
 
@@ -619,6 +788,27 @@ class _Action:
 
     """
 
+    __slots__ = (
+        # State variables.
+        "prev_attach",
+        "glue",
+        "word",
+        "upper_carry",
+        "orthography",
+        "next_attach",
+        "next_case",
+        "word_is_finished",
+        # Persistent state variables.
+        "space_char",
+        "case",
+        "trailing_space",
+        # Instruction variables.
+        "prev_replace",
+        "text",
+        "combo",
+        "command",
+    )
+
     def __init__(
         self,
         # Previous.
@@ -709,36 +899,72 @@ class _Action:
 
     def copy_state(self):
         """Clone this action but only clone the state variables."""
-        return _Action(
-            # Previous.
-            prev_attach=self.next_attach,
-            # Current.
-            case=self.case,
-            glue=self.glue,
-            orthography=self.orthography,
-            space_char=self.space_char,
-            upper_carry=self.upper_carry,
-            word=self.word,
-            trailing_space=self.trailing_space,
-            word_is_finished=self.word_is_finished,
-            # Next.
-            next_attach=self.next_attach,
-            next_case=self.next_case,
-        )
+        # Note: bypass `__init__` (and its keyword arguments handling).
+        action = _Action.__new__(_Action)
+        # Previous.
+        action.prev_attach = self.next_attach
+        action.prev_replace = ""
+        # Current.
+        action.case = self.case
+        action.glue = self.glue
+        action.orthography = self.orthography
+        action.space_char = self.space_char
+        action.upper_carry = self.upper_carry
+        action.word = self.word
+        action.text = None
+        action.trailing_space = self.trailing_space
+        action.word_is_finished = self.word_is_finished
+        action.combo = None
+        action.command = None
+        # Next.
+        action.next_attach = self.next_attach
+        action.next_case = self.next_case
+        return action
 
     def new_state(self):
-        return _Action(
-            # Previous.
-            prev_attach=self.next_attach,
-            # Current.
-            space_char=self.space_char,
-            case=self.case,
-            trailing_space=self.trailing_space,
-            # Next.
-        )
+        action = _Action.__new__(_Action)
+        # Previous.
+        action.prev_attach = self.next_attach
+        action.prev_replace = ""
+        # Current.
+        action.space_char = self.space_char
+        action.case = self.case
+        action.trailing_space = self.trailing_space
+        action.glue = False
+        action.word = None
+        action.orthography = True
+        action.upper_carry = False
+        action.text = None
+        action.word_is_finished = True
+        action.combo = None
+        action.command = None
+        # Next.
+        action.next_attach = False
+        action.next_case = None
+        return action
 
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        if type(other) is not type(self):
+            return NotImplemented
+        # Note: explicit comparisons (with the most likely
+        # different fields first) are the fastest option.
+        return (
+            self.text == other.text
+            and self.word == other.word
+            and self.prev_attach == other.prev_attach
+            and self.next_attach == other.next_attach
+            and self.prev_replace == other.prev_replace
+            and self.case == other.case
+            and self.next_case == other.next_case
+            and self.glue == other.glue
+            and self.upper_carry == other.upper_carry
+            and self.orthography == other.orthography
+            and self.word_is_finished == other.word_is_finished
+            and self.space_char == other.space_char
+            and self.trailing_space == other.trailing_space
+            and self.combo == other.combo
+            and self.command == other.command
+        )
 
     def __ne__(self, other):
         return not self == other
@@ -746,8 +972,10 @@ class _Action:
     def __str__(self):
         kwargs = [
             "%s=%r" % (k, v)
-            for k, v in self.__dict__.items()
-            if v != self.DEFAULT.__dict__[k]
+            for k, v, default in zip(
+                self.__slots__, _action_values(self), _action_values(self.DEFAULT)
+            )
+            if v != default
         ]
         return "Action(%s)" % ", ".join(sorted(kwargs))
 
@@ -755,6 +983,7 @@ class _Action:
         return str(self)
 
 
+_action_values = operator.attrgetter(*_Action.__slots__)
 _Action.DEFAULT = _Action()
 
 
@@ -776,6 +1005,11 @@ class _LookAheadAction(_Action):
     def __getattr__(self, name):
         return getattr(self.action, name)
 
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
     def __str__(self):
         return "LookAheadAction(%s)" % str(self.__dict__)
 
@@ -21,7 +21,7 @@ from PySide6.QtWidgets import (
 from plover import _
 from plover.config import DictionaryConfig
 from plover.dictionary.base import create_dictionary
-from plover.engine import ErroredDictionary
+from plover.engine import ErroredDictionary, LoadingDictionary
 from plover.misc import normalize_path
 from plover.oslayer.config import CONFIG_DIR
 from plover.registry import registry
@@ -82,7 +82,7 @@ class DictionariesModel(QAbstractListModel):
 
         @loaded.setter
         def loaded(self, loaded):
-            if loaded is None:
+            if loaded is None or isinstance(loaded, LoadingDictionary):
                 state = "loading"
             elif isinstance(loaded, ErroredDictionary):
                 state = "error"
@@ -135,6 +135,9 @@ class DictionariesModel(QAbstractListModel):
             engine.signal_connect(
                 "dictionary_state_changed", self._on_dictionary_state_changed
             )
+            engine.signal_connect(
+                "dictionary_loading_progress", self._on_dictionary_loading_progress
+            )
             self._reset_items(
                 config["dictionaries"],
                 config["classic_dictionaries_display_order"],
@@ -257,6 +260,11 @@ class DictionariesModel(QAbstractListModel):
             item.loaded = d
             self._updated_rows([item.row])
 
+    def _on_dictionary_loading_progress(self, filename, progress):
+        self._on_dictionary_state_changed(
+            filename, LoadingDictionary(filename, progress)
+        )
+
     def _move(self, index_list, step):
         row_list = sorted(self._normalized_row_list(index_list))
         if not row_list:
@@ -413,8 +421,16 @@ class DictionariesModel(QAbstractListModel):
                 # i18n: Widget: “DictionariesWidget”, tool tip.
                 tooltip.append(_("This dictionary is marked as the favorite."))
             elif d.state == "loading":
-                # i18n: Widget: “DictionariesWidget”, tool tip.
-                tooltip.append(_("This dictionary is being loaded."))
+                if d.loaded is None:
+                    # i18n: Widget: “DictionariesWidget”, tool tip.
+                    tooltip.append(_("This dictionary is being loaded."))
+                else:
+                    # i18n: Widget: “DictionariesWidget”, tool tip.
+                    tooltip.append(
+                        _("This dictionary is being loaded: {progress}%.").format(
+                            progress=int(d.loaded.progress * 100)
+                        )
+                    )
             elif d.state == "error":
                 # i18n: Widget: “DictionariesWidget”, tool tip.
                 tooltip.append(
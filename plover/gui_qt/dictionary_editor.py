@@ -67,10 +67,16 @@ class DictionaryItemModel(QAbstractTableModel):
     def _update_entries(self, strokes_filter=None, translation_filter=None):
         self._entries = []
         for dictionary in self._dictionary_list:
-            for strokes, translation in dictionary.items():
+            # Note: an empty strokes filter matches everything.
+            if not strokes_filter:
+                entries = dictionary.items()
+            else:
+                entries = (
+                    (strokes, dictionary[strokes])
+                    for strokes in dictionary.prefix_lookup(strokes_filter)
+                )
+            for strokes, translation in entries:
                 steno = "/".join(strokes)
-                if strokes_filter is not None and not steno.startswith(strokes_filter):
-                    continue
                 if translation_filter is not None and not translation.startswith(
                     translation_filter
                 ):
@@ -17,6 +17,9 @@ class Engine(StenoEngine, QThread):
     signal_dictionary_state_changed = Signal(
         str, object
     )  # Some dictionary has finished loading. Refer to class DictionaryLoadingManager for argument description.
+    signal_dictionary_loading_progress = Signal(
+        str, float
+    )  # Some dictionary loading progressed: filename, and progress (between 0 and 1).
     signal_dictionaries_loaded = Signal(
         object
     )  # All dictionaries are loaded. Argument is a StenoDictionaryCollection instance.
@@ -1,6 +1,9 @@
 from PySide6.QtCore import QEvent, Qt, Slot
 
 from plover import _
+from plover.search import FUZZY, SUBSTRING
+from plover.steno import sort_steno_strokes
+from plover.suggestions import Suggestion
 from plover.translation import unescape_translation
 
 from plover.gui_qt.lookup_dialog_ui import Ui_LookupDialog
@@ -16,6 +19,9 @@ class LookupDialog(Tool, Ui_LookupDialog):
     ROLE = "lookup"
     SHORTCUT = "Ctrl+L"
 
+    # Maximum number of other (substring, or fuzzy) matches.
+    SEARCH_LIMIT = 20
+
     def __init__(self, engine):
         super().__init__(engine)
         self.setupUi(self)
@@ -41,8 +47,25 @@ class LookupDialog(Tool, Ui_LookupDialog):
     def lookup(self, pattern):
         translation = unescape_translation(pattern.strip())
         suggestion_list = self._engine.get_suggestions(translation)
+        if translation:
+            suggestion_list.extend(self._search(translation, suggestion_list))
         self._update_suggestions(suggestion_list)
 
+    def _search(self, translation, suggestion_list):
+        known = {suggestion.text for suggestion in suggestion_list}
+        for mode in (SUBSTRING, FUZZY):
+            matches = self._engine.search_translations(
+                translation, mode=mode, limit=self.SEARCH_LIMIT
+            )
+            if matches:
+                break
+        for text in matches:
+            if text in known:
+                continue
+            strokes_list = self._engine.reverse_lookup(text)
+            if strokes_list:
+                yield Suggestion(text, sort_steno_strokes(strokes_list))
+
     def changeEvent(self, event):
         super().changeEvent(event)
         if event.type() == QEvent.Type.ActivationChange and self.isActiveWindow():
@@ -3,50 +3,189 @@
 
 """Functions that implement some English orthographic rules."""
 
-from plover import system
-
-
-def make_candidates_from_rules(word, suffix, check=lambda x: True):
-    candidates = []
-    for r in system.ORTHOGRAPHY_RULES:
-        m = r[0].match(word + " ^ " + suffix)
-        if m:
-            expanded = m.expand(r[1])
-            if check(expanded):
-                candidates.append(expanded)
-    return candidates
-
-
-def _add_suffix(word, suffix):
-    in_dict_f = lambda x: x in system.ORTHOGRAPHY_WORDS
-
-    candidates = []
+from functools import lru_cache
+import re
 
-    alias = system.ORTHOGRAPHY_RULES_ALIASES.get(suffix, None)
-    if alias is not None:
-        candidates.extend(make_candidates_from_rules(word, alias, in_dict_f))
+from plover import system
 
-    # Try a simple join if it is in the dictionary.
-    simple = word + suffix
-    if in_dict_f(simple):
-        candidates.append(simple)
 
-    # Try rules with dict lookup.
-    candidates.extend(make_candidates_from_rules(word, suffix, in_dict_f))
+# Orthography rules match against: word + RULE_SEPARATOR + suffix.
+RULE_SEPARATOR = " ^ "
+
+# The separator, as written in rules patterns: `" \\^ "`, or fully
+# escaped (`re.escape(RULE_SEPARATOR)`).
+_RULE_SEPARATOR_RX = re.compile(r"(?:\\ | )\\\^(?:\\ | )")
+
+
+def _has_top_level_alternation(pattern):
+    depth = 0
+    in_class = escaped = False
+    for c in pattern:
+        if escaped:
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        elif in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and not depth:
+            return True
+    return False
+
+
+def _suffix_filter(rule):
+    """Return a regexp matching the suffixes a rule can apply to.
+
+    None is returned if the rule pattern cannot be split into a word
+    and a suffix pattern (e.g. when a look-behind or a back-reference
+    makes the suffix pattern depend on the word, or a top-level
+    alternation).
+    """
+    separators = list(_RULE_SEPARATOR_RX.finditer(rule.pattern))
+    if not separators or _has_top_level_alternation(rule.pattern):
+        return None
+    word_pattern = rule.pattern[: separators[-1].start()]
+    suffix_pattern = rule.pattern[separators[-1].end() :]
+    if re.search(r"\(\?<|\(\?P=|\\[bB1-9]", suffix_pattern):
+        return None
+    try:
+        re.compile(word_pattern, rule.flags)
+        return re.compile(suffix_pattern, rule.flags)
+    except re.error:
+        return None
+
+
+class Orthography:
+    """Apply orthography rules to add suffixes to words.
+
+    rules -- A list of (compiled regexp, replacement) pairs.
+
+    aliases -- A mapping of suffixes to alternative suffixes, whose
+    candidates are only used if found in the words list.
+
+    words -- A mapping of known words to their rank (lower is more common).
+
+    Results are memoized (with a LRU cache of <cache_size> entries),
+    and rules are indexed by the suffixes they can apply to, so only
+    relevant rules are tried. The rules, aliases and words must not be
+    changed after creation.
+    """
 
-    # For all candidates sort by prominence in dictionary and, since sort is
-    # stable, also by the order added to candidates list.
-    if candidates:
-        candidates.sort(key=lambda x: system.ORTHOGRAPHY_WORDS[x])
-        return candidates[0]
+    def __init__(self, rules, aliases, words, cache_size=4096):
+        self.rules = rules
+        self.aliases = aliases
+        self.words = words
+        self._suffix_filters = [_suffix_filter(r[0]) for r in rules]
+        self._suffix_rules = lru_cache(maxsize=cache_size)(self._suffix_rules)
+        self._add_suffix = lru_cache(maxsize=cache_size)(self._add_suffix)
+
+    def _suffix_rules(self, suffix):
+        # Note: this is only valid when the separator is not also
+        # part of the word or suffix (`word_pattern` could match it).
+        return tuple(
+            rule
+            for rule, suffix_filter in zip(self.rules, self._suffix_filters)
+            if suffix_filter is None or suffix_filter.match(suffix) is not None
+        )
+
+    def candidates(self, word, suffix, check=None):
+        """Return the candidates for <word> + <suffix>, using the rules.
+
+        If <check> is provided, only the candidates it accepts are returned.
+        """
+        text = word + RULE_SEPARATOR + suffix
+        if text.find(RULE_SEPARATOR) == text.rfind(RULE_SEPARATOR):
+            rules = self._suffix_rules(suffix)
+        else:
+            rules = self.rules
+        candidates = []
+        for r in rules:
+            m = r[0].match(text)
+            if m:
+                expanded = m.expand(r[1])
+                if check is None or check(expanded):
+                    candidates.append(expanded)
+        return candidates
+
+    def _add_suffix(self, word, suffix):
+        words = self.words
+        in_dict_f = words.__contains__
+
+        candidates = []
+
+        alias = self.aliases.get(suffix, None)
+        if alias is not None:
+            candidates.extend(self.candidates(word, alias, in_dict_f))
+
+        # Try a simple join if it is in the dictionary.
+        simple = word + suffix
+        if in_dict_f(simple):
+            candidates.append(simple)
+
+        # Try rules with dict lookup.
+        candidates.extend(self.candidates(word, suffix, in_dict_f))
+
+        # For all candidates sort by prominence in dictionary and, since sort is
+        # stable, also by the order added to candidates list.
+        if candidates:
+            candidates.sort(key=words.__getitem__)
+            return candidates[0]
+
+        # Try rules without dict lookup.
+        candidates = self.candidates(word, suffix)
+        if candidates:
+            return candidates[0]
+
+        # If all else fails then just do a simple join.
+        return simple
+
+    def add_suffix(self, word, suffix):
+        """Add a suffix to a word by applying the rules.
+
+        Arguments:
+
+        word -- A word
+        suffix -- The suffix to add
+
+        """
+        suffix, sep, rest = suffix.partition(" ")
+        expanded = self._add_suffix(word, suffix)
+        return expanded + sep + rest
+
+    def add_suffixes(self, words, suffix):
+        """Add a suffix to each word in <words>, return the list of results."""
+        add_suffix = self.add_suffix
+        return [add_suffix(word, suffix) for word in words]
+
+
+_orthography = None
+
+
+def system_orthography():
+    """Return the orthography engine for the current system."""
+    global _orthography
+    orthography = _orthography
+    if (
+        orthography is None
+        or orthography.rules is not system.ORTHOGRAPHY_RULES
+        or orthography.aliases is not system.ORTHOGRAPHY_RULES_ALIASES
+        or orthography.words is not system.ORTHOGRAPHY_WORDS
+    ):
+        orthography = _orthography = Orthography(
+            system.ORTHOGRAPHY_RULES,
+            system.ORTHOGRAPHY_RULES_ALIASES,
+            system.ORTHOGRAPHY_WORDS,
+        )
+    return orthography
 
-    # Try rules without dict lookup.
-    candidates = make_candidates_from_rules(word, suffix)
-    if candidates:
-        return candidates[0]
 
-    # If all else fails then just do a simple join.
-    return simple
+def make_candidates_from_rules(word, suffix, check=lambda x: True):
+    return system_orthography().candidates(word, suffix, check)
 
 
 def add_suffix(word, suffix):
@@ -58,6 +197,9 @@ def add_suffix(word, suffix):
     suffix -- The suffix to add
 
     """
-    suffix, sep, rest = suffix.partition(" ")
-    expanded = _add_suffix(word, suffix)
-    return expanded + sep + rest
+    return system_orthography().add_suffix(word, suffix)
+
+
+def add_suffixes(words, suffix):
+    """Add a suffix to each word in <words>, return the list of results."""
+    return system_orthography().add_suffixes(words, suffix)
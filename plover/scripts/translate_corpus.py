@@ -0,0 +1,366 @@
+"""Translate a corpus of strokes, in parallel.
+
+The strokes are split into shards, translated in a process pool, and the
+results stitched together so the output is the same as a sequential run.
+
+There is no point where the translator state provably resets (a later
+undo stroke can always reach back, and the formatting context carries
+over), so each shard is preceded by a warm-up: its previous `overlap`
+strokes, which are translated but not output. Once the shards are
+translated, the translator state at the start of each shard (after the
+warm-up) is compared to the state at the end of the previous shard: on a
+mismatch, both shards are merged and translated again. Splitting the
+strokes at paragraph boundaries (blank lines) makes mismatches unlikely.
+
+Usage: plover -s plover_translate_corpus [OPTIONS] INPUT
+
+INPUT can either be a strokes log, or a text file of steno strokes
+(separated by spaces or slashes).
+"""
+
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+import argparse
+import logging
+import multiprocessing
+import os
+import re
+import sys
+
+from plover.config import Config
+from plover.dictionary.base import load_dictionary
+from plover.formatting import Formatter, OutputHelper
+from plover.oslayer.config import CONFIG_FILE
+from plover.registry import registry
+from plover.steno import Stroke
+from plover.steno_dictionary import StenoDictionaryCollection
+from plover.translation import Translation, Translator, translate_stream
+from plover import log, system
+
+
+LOG_LINE_RX = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d+ (.*)$")
+LOG_STROKE_RX = re.compile(r"^\*?Stroke\((\S+) : ")
+STENO_SEPARATOR_RX = re.compile(r"[\s/]+")
+
+ShardResult = namedtuple("ShardResult", "start_state end_state erased text")
+
+
+def read_corpus(fp):
+    """Read strokes from a file.
+
+    Return the list of steno strokes, and the list of paragraph
+    boundaries (as stroke indexes).
+    """
+    strokes = []
+    paragraphs = []
+    for line in fp:
+        m = LOG_LINE_RX.match(line)
+        if m is not None:
+            # Strokes log: ignore other log entries (e.g. translations).
+            m = LOG_STROKE_RX.match(m.group(1))
+            if m is not None:
+                strokes.append(m.group(1))
+            continue
+        steno_list = STENO_SEPARATOR_RX.split(line.strip())
+        if steno_list == [""]:
+            if strokes and (not paragraphs or paragraphs[-1] != len(strokes)):
+                paragraphs.append(len(strokes))
+            continue
+        strokes.extend(steno for steno in steno_list if steno)
+    return strokes, paragraphs
+
+
+def split_shards(stroke_count, paragraphs, shard_size):
+    """Split strokes in shards of about shard_size strokes.
+
+    Paragraph boundaries are preferred for splitting.
+
+    Return a list of (start, end) stroke indexes.
+    """
+    bounds = [0]
+    target = shard_size
+    while target < stroke_count:
+        n = bisect_left(paragraphs, target)
+        if n < len(paragraphs) and paragraphs[n] < target + shard_size // 2:
+            target = paragraphs[n]
+        if target >= stroke_count:
+            break
+        bounds.append(target)
+        target += shard_size
+    bounds.append(stroke_count)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _signature(obj):
+    # Note: only the translator state is involved, so the types
+    # are limited to translations, formatting actions, and values.
+    # The result must be picklable.
+    if obj is None or isinstance(obj, (str, int, float)):
+        return obj
+    if isinstance(obj, Enum):
+        return str(obj)
+    if isinstance(obj, (list, tuple)):
+        return tuple(_signature(o) for o in obj)
+    if isinstance(obj, Translation):
+        return (
+            obj.rtfcre,
+            obj.english,
+            obj.is_retrospective_command,
+            _signature(obj.replaced),
+            _signature(obj.formatting),
+        )
+    if hasattr(obj, "__dict__"):
+        values = vars(obj)
+    else:
+        values = {k: getattr(obj, k) for k in obj.__slots__}
+    return (
+        type(obj).__name__,
+        tuple(sorted((k, _signature(v)) for k, v in values.items())),
+    )
+
+
+def _state_signature(state, last_action):
+    return _signature((state.translations, state.tail, last_action))
+
+
+class _ShardOutput:
+    """Text output, keeping track of the text erased before it."""
+
+    def __init__(self):
+        self.erased = 0
+        self._chunks = []
+
+    @property
+    def text(self):
+        return "".join(self._chunks)
+
+    def send_backspaces(self, n):
+        while n and self._chunks:
+            chunk = self._chunks.pop()
+            if n < len(chunk):
+                self._chunks.append(chunk[:-n])
+                return
+            n -= len(chunk)
+        self.erased += n
+
+    def send_string(self, s):
+        self._chunks.append(s)
+
+    def send_key_combination(self, c):
+        pass
+
+    def send_engine_command(self, c):
+        pass
+
+
+def translate_shard(strokes, start, last, dictionaries, formatter, undo_levels):
+    """Translate a shard.
+
+    strokes -- The shard steno strokes, the first start ones being the warm-up.
+
+    last -- True if this is the last shard, and the final translations
+    history should be output.
+
+    Return a ShardResult.
+    """
+    state = Translator().get_state()
+    output = _ShardOutput()
+    last_action = None
+    start_state = end_state = None
+    # 0: warm-up, 1: shard, 2: end of the shard.
+    phase = 0
+
+    def feed():
+        nonlocal phase, start_state, end_state
+        for n, steno in enumerate(strokes):
+            if n == start:
+                start_state = _state_signature(state, last_action)
+                phase = 1
+            yield Stroke(steno)
+        end_state = _state_signature(state, last_action)
+        phase = 2
+
+    for t in translate_stream(
+        feed(), dictionaries, formatter, undo_levels, state=state
+    ):
+        if not t.formatting:
+            continue
+        if phase == 1 or (phase == 2 and last):
+            OutputHelper(output, formatter.spaces_after, formatter.spaces_after).render(
+                last_action, (), t.formatting
+            )
+        last_action = t.formatting[-1]
+    return ShardResult(start_state, end_state, output.erased, output.text)
+
+
+def translate_corpus(
+    strokes, translate, paragraphs=(), shard_size=20000, overlap=1000, map=map
+):
+    """Translate a corpus, in shards.
+
+    translate -- The function used for translating a shard: called with
+    the shard strokes, the warm-up size, and whether it's the last shard
+    (see `translate_shard`).
+
+    map -- The function used for mapping `translate` over the shards
+    (e.g. `Executor.map`).
+
+    Return the output text.
+    """
+    shards = split_shards(len(strokes), paragraphs, shard_size)
+
+    def shard_args(n):
+        start, end = shards[n]
+        warmup = max(start - overlap, 0)
+        return strokes[warmup:end], start - warmup, n == len(shards) - 1
+
+    results = list(map(translate, *zip(*[shard_args(n) for n in range(len(shards))])))
+    n = 1
+    while n < len(shards):
+        if results[n].start_state == results[n - 1].end_state:
+            n += 1
+            continue
+        # The warm-up was not enough: merge with the previous shard.
+        log.info("translator state mismatch at stroke %u, merging shards", shards[n][0])
+        shards[n - 1] = (shards[n - 1][0], shards[n][1])
+        del shards[n]
+        del results[n]
+        results[n - 1] = translate(*shard_args(n - 1))
+    text = ""
+    for r in results:
+        text = text[: max(len(text) - r.erased, 0)] + r.text
+    return text
+
+
+# Worker process context: dictionaries, formatter, undo levels.
+_context = None
+
+
+def _init_worker(
+    system_name,
+    dictionaries,
+    space_placement,
+    start_attached,
+    start_capitalized,
+    undo_levels,
+):
+    global _context
+    if system.NAME != system_name:
+        # Plugins loading errors are already reported by the main process.
+        logging.disable(logging.ERROR)
+        try:
+            registry.update()
+        finally:
+            logging.disable(logging.NOTSET)
+        system.setup(system_name)
+    formatter = Formatter()
+    formatter.set_space_placement(space_placement)
+    formatter.start_attached = start_attached
+    formatter.start_capitalized = start_capitalized
+    dictionaries = StenoDictionaryCollection(
+        [load_dictionary(filename, threaded_save=False) for filename in dictionaries]
+    )
+    _context = dictionaries, formatter, undo_levels
+
+
+def _translate_shard(strokes, start, last):
+    return translate_shard(strokes, start, last, *_context)
+
+
+def main():
+    description = "Translate a corpus of strokes, in parallel."
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        choices=["debug", "info", "warning", "error"],
+        default=None,
+        help="set log level",
+    )
+    parser.add_argument(
+        "-d",
+        "--dictionary",
+        dest="dictionaries",
+        action="append",
+        help="dictionary to use (highest priority first), "
+        "the enabled dictionaries from the configuration by default",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of worker processes, the number of CPUs by default",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=20000,
+        help="approximate number of strokes per shard",
+    )
+    parser.add_argument(
+        "--overlap",
+        type=int,
+        default=None,
+        help="number of warm-up strokes per shard, "
+        "10 times the number of undo levels by default",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="output file, standard output by default",
+    )
+    parser.add_argument("input", help="strokes log or steno file")
+    args = parser.parse_args(args=sys.argv[1:])
+    if args.log_level is not None:
+        log.set_level(args.log_level.upper())
+    log.setup_platform_handler()
+    config = Config(CONFIG_FILE)
+    if os.path.exists(CONFIG_FILE):
+        config.load()
+    if args.dictionaries is None:
+        dictionaries = [d.path for d in config["dictionaries"] if d.enabled]
+    else:
+        dictionaries = args.dictionaries
+    undo_levels = config["undo_levels"]
+    overlap = args.overlap
+    if overlap is None:
+        overlap = max(10 * undo_levels, 100)
+    with open(args.input, encoding="utf-8") as fp:
+        strokes, paragraphs = read_corpus(fp)
+    initargs = (
+        config["system_name"],
+        dictionaries,
+        config["space_placement"],
+        config["start_attached"],
+        config["start_capitalized"],
+        undo_levels,
+    )
+    # The main process translates merged shards.
+    _init_worker(*initargs)
+    with ProcessPoolExecutor(
+        args.jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=initargs,
+    ) as executor:
+        text = translate_corpus(
+            strokes,
+            _translate_shard,
+            paragraphs=paragraphs,
+            shard_size=args.shard_size,
+            overlap=overlap,
+            map=executor.map,
+        )
+    if args.output is None:
+        sys.stdout.write(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            fp.write(text)
+
+
+if __name__ == "__main__":
+    main()
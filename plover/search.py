@@ -0,0 +1,393 @@
+"""Search the translations of a collection of dictionaries.
+
+The translations are indexed by trigrams (padded, so the start and end
+of a translation are indexed too), which makes it possible to quickly
+find the translations:
+- starting with a given text (`PREFIX`)
+- containing a given text (`SUBSTRING`)
+- within a given edit distance of a given text (`FUZZY`)
+
+Matching is case insensitive.
+"""
+
+from array import array
+from collections import Counter, defaultdict
+import heapq
+import threading
+
+from plover import log
+
+
+PREFIX = "prefix"
+SUBSTRING = "substring"
+FUZZY = "fuzzy"
+
+SEARCH_MODES = (PREFIX, SUBSTRING, FUZZY)
+
+_PADDING = "\0\0"
+
+
+def _trigrams(text):
+    return {text[n : n + 3] for n in range(len(text) - 2)}
+
+
+def edit_distance(a, b, max_distance):
+    """Return the Levenshtein distance between <a> and <b>.
+
+    If the distance is greater than <max_distance>,
+    `max_distance + 1` is returned.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for i, cb in enumerate(b, start=1):
+        current = [i]
+        for j, ca in enumerate(a, start=1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+
+class _Index:
+    """Trigrams index of a list of (unique) translations.
+
+    The texts and trigrams are immutable, only the count of entries
+    using each translation (`counts`) is updated.
+    """
+
+    def __init__(self, texts, counts=None):
+        self.texts = texts
+        # Number of entries (in the enabled dictionaries) using each translation.
+        self.counts = array("I", [1]) * len(texts) if counts is None else counts
+        # Trigram -> ids of the translations containing it.
+        self.trigrams = defaultdict(lambda: array("I"))
+        # Length -> ids of the translations of that length.
+        self.lengths = defaultdict(lambda: array("I"))
+        for n, text in enumerate(texts):
+            lower = text.lower()
+            for trigram in _trigrams(_PADDING + lower + _PADDING):
+                self.trigrams[trigram].append(n)
+            self.lengths[len(lower)].append(n)
+
+    @classmethod
+    def from_dictionaries(cls, dicts):
+        counts = Counter()
+        for d in dicts:
+            if d.enabled:
+                counts.update(value for __, value in list(d.items()))
+        return cls(list(counts), array("I", counts.values()))
+
+    def _containing(self, trigrams):
+        """Return the ids of the translations containing all <trigrams>."""
+        postings = sorted(
+            (self.trigrams.get(trigram, ()) for trigram in trigrams), key=len
+        )
+        ids = set(postings[0])
+        for p in postings[1:]:
+            if not ids:
+                break
+            ids.intersection_update(p)
+        return ids
+
+    def find_id(self, text):
+        """Return the id of <text>, or None if it's not indexed."""
+        lower = text.lower()
+        ids = self._containing(_trigrams(_PADDING + lower + _PADDING))
+        for n in ids:
+            if self.texts[n] == text:
+                return n
+        return None
+
+    def find(self, pattern, mode, max_distance):
+        """Return the ids of the translations matching the lowercase <pattern>.
+
+        For `FUZZY`, (id, distance) pairs are returned.
+        """
+        texts = self.texts
+        if mode == PREFIX:
+            ids = self._containing(_trigrams(_PADDING + pattern))
+            return [n for n in ids if texts[n].lower().startswith(pattern)]
+        if mode == SUBSTRING:
+            if len(pattern) < 3:
+                return [n for n, text in enumerate(texts) if pattern in text.lower()]
+            ids = self._containing(_trigrams(pattern))
+            return [n for n in ids if pattern in texts[n].lower()]
+        assert mode == FUZZY
+        trigrams = _trigrams(_PADDING + pattern + _PADDING)
+        # An edit changes at most 3 trigrams.
+        threshold = len(trigrams) - 3 * max_distance
+        lengths = range(
+            max(len(pattern) - max_distance, 0), len(pattern) + max_distance + 1
+        )
+        if threshold > 0:
+            counts = Counter()
+            for trigram in trigrams:
+                counts.update(self.trigrams.get(trigram, ()))
+            candidates = [
+                n
+                for n, count in counts.items()
+                if count >= threshold and len(texts[n].lower()) in lengths
+            ]
+        else:
+            candidates = [n for length in lengths for n in self.lengths.get(length, ())]
+        matches = []
+        for n in candidates:
+            distance = edit_distance(pattern, texts[n].lower(), max_distance)
+            if distance <= max_distance:
+                matches.append((n, distance))
+        return matches
+
+
+def _rank(text, pattern, lower_pattern):
+    lower = text.lower()
+    position = lower.find(lower_pattern)
+    at_word_start = position == 0 or not lower[position - 1].isalnum()
+    return (
+        lower != lower_pattern,
+        text != pattern,
+        position != 0,
+        not at_word_start,
+        len(text),
+        text,
+    )
+
+
+class TranslationIndex:
+    """Search index of the translations of a list of dictionaries.
+
+    The index is built in a background thread, on the first search (see
+    `update`). Changes to single entries are taken into account as they
+    happen (added translations are immediately searchable, and removed
+    ones ignored), other changes (e.g. when a dictionary is enabled or
+    disabled) trigger a rebuild, which queries wait for.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dicts = []
+        # False until the first search.
+        self._active = False
+        self._index = _Index([])
+        # Translation -> entries count, for the translations added since
+        # the index was built. Note: replaced, not changed, on updates.
+        self._added = {}
+        # (id(dictionary), key) -> [previous value, nesting depth],
+        # for the entries being changed, see `_dictionary_changing`.
+        self._changing = {}
+        # Number of changes in progress.
+        self._in_flight = 0
+        # True if the index entries counts are outdated, until it's rebuilt
+        # (e.g. a dictionary was disabled).
+        self._maybe_removed = False
+        self._changes = 0
+        self._pending = False
+        self._builder = None
+        self._ready = threading.Event()
+        self._ready.set()
+
+    def update(self, dicts):
+        """Index the translations of <dicts>, in the background.
+
+        Note: the index is only built once searched.
+        """
+        with self._lock:
+            dicts = list(dicts)
+            new_ids = {id(d) for d in dicts}
+            old_ids = {id(d) for d in self._dicts}
+            for d in self._dicts:
+                if id(d) not in new_ids:
+                    d._observers.discard(self)
+            for d in dicts:
+                if id(d) not in old_ids:
+                    d._observers.add(self)
+            self._dicts = dicts
+            if not self._active:
+                return
+            self._invalidate()
+        self._schedule_build()
+
+    def _invalidate(self):
+        # Note: must be called with `_lock` held.
+        self._maybe_removed = True
+        self._changes += 1
+        self._ready.clear()
+
+    def wait(self, timeout=None):
+        """Wait for the index to be up to date, return False on timeout."""
+        return self._ready.wait(timeout)
+
+    def _schedule_build(self):
+        with self._lock:
+            self._pending = True
+            if self._builder is not None:
+                return
+            self._builder = threading.Thread(
+                target=self._build, name="TranslationIndexBuilder", daemon=True
+            )
+            self._builder.start()
+
+    def _build(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._builder = None
+                    return
+                self._pending = False
+                dicts = self._dicts
+                changes = self._changes
+                consistent = not self._in_flight
+            try:
+                index = _Index.from_dictionaries(dicts)
+            except RuntimeError:
+                # A dictionary was changed while being indexed.
+                log.debug("indexing translations failed", exc_info=True)
+                with self._lock:
+                    self._pending = True
+                continue
+            with self._lock:
+                if dicts is not self._dicts:
+                    continue
+                self._index = index
+                self._added = {}
+                if consistent and changes == self._changes:
+                    self._maybe_removed = False
+                else:
+                    # Changed while being indexed: the
+                    # entries counts may be wrong, start again.
+                    self._pending = True
+                if not self._pending:
+                    self._ready.set()
+
+    def _count(self, text, delta):
+        """Update the entries count of <text> by <delta>."""
+        # Note: must be called with `_lock` held.
+        if text is None:
+            return
+        index = self._index
+        n = index.find_id(text)
+        if n is not None:
+            index.counts[n] = max(index.counts[n] + delta, 0)
+            return
+        added = dict(self._added)
+        count = added.get(text, 0) + delta
+        if count > 0:
+            added[text] = count
+        else:
+            added.pop(text, None)
+        self._added = added
+
+    def _dictionary_changing(self, d, key):
+        with self._lock:
+            self._in_flight += 1
+            self._changes += 1
+            if not self._active or key is None:
+                return
+            changing = self._changing.get((id(d), key))
+            if changing is not None:
+                # Nested change (e.g. replacing an entry deletes it first).
+                changing[1] += 1
+                return
+            value = d.get(key) if d.enabled else None
+            self._changing[id(d), key] = [value, 1]
+
+    def _dictionary_changed(self, d, key):
+        with self._lock:
+            self._changes += 1
+            # Note: may not have been notified of the change beforehand.
+            self._in_flight = max(self._in_flight - 1, 0)
+            if not self._active:
+                return
+            if key is None or (id(d), key) not in self._changing:
+                self._invalidate()
+                rebuild = True
+            else:
+                rebuild = False
+                changing = self._changing[id(d), key]
+                changing[1] -= 1
+                if not changing[1]:
+                    del self._changing[id(d), key]
+                    previous = changing[0]
+                    value = d.get(key) if d.enabled else None
+                    if previous != value:
+                        self._count(previous, -1)
+                        self._count(value, 1)
+        if rebuild:
+            self._schedule_build()
+
+    def _dictionary_enabled_changed(self, d):
+        self._dictionary_changed(d, None)
+
+    def _snapshot(self):
+        """Return the index, and the added translations, once up to date."""
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._active = True
+                    self._invalidate()
+                    activated = True
+                else:
+                    activated = False
+                if not self._maybe_removed:
+                    return self._index, self._added
+            if activated:
+                self._schedule_build()
+            self._ready.wait()
+
+    def search(self, pattern, mode=SUBSTRING, limit=50, max_distance=1):
+        """Search the translations matching <pattern>.
+
+        mode -- One of `PREFIX`, `SUBSTRING`, or `FUZZY`.
+
+        limit -- The maximum number of results, or None for no limit.
+
+        max_distance -- The maximum edit distance for `FUZZY` searches.
+
+        The translations are returned best matches first: exact matches,
+        then (same case first) by edit distance for `FUZZY`, or matches
+        at the start of the translation, and then at the start of a word.
+        Shorter translations come first.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError("invalid search mode: %r" % mode)
+        if not pattern:
+            return []
+        index, added = self._snapshot()
+        counts = index.counts
+        lower_pattern = pattern.lower()
+        if mode == FUZZY:
+            matches = [
+                (index.texts[n], distance)
+                for n, distance in index.find(lower_pattern, mode, max_distance)
+                if counts[n]
+            ]
+            for text in added:
+                distance = edit_distance(lower_pattern, text.lower(), max_distance)
+                if distance <= max_distance:
+                    matches.append((text, distance))
+            ranked = [
+                ((distance, text != pattern, len(text), text), text)
+                for text, distance in matches
+            ]
+        else:
+            matches = [
+                index.texts[n] for n in index.find(lower_pattern, mode, 0) if counts[n]
+            ]
+            for text in added:
+                lower = text.lower()
+                if mode == PREFIX and lower.startswith(lower_pattern):
+                    matches.append(text)
+                elif mode == SUBSTRING and lower_pattern in lower:
+                    matches.append(text)
+            ranked = [(_rank(text, pattern, lower_pattern), text) for text in matches]
+        heapq.heapify(ranked)
+        results = []
+        while ranked and (limit is None or len(results) < limit):
+            __, text = heapq.heappop(ranked)
+            results.append(text)
+        return results
@@ -7,8 +7,12 @@ A steno dictionary maps sequences of steno strokes to translations.
 
 """
 
+import bisect
 import collections
+import contextlib
 import os
+import threading
+import weakref
 
 from plover.resource import (
     ASSET_SCHEME,
@@ -18,6 +22,50 @@ from plover.resource import (
 )
 
 
+# Methods a dictionary class must not override to be considered as using
+# the standard storage (or the compact one, see `plover.dictionary.compact`).
+_STORAGE_METHODS = """
+__contains__
+__delitem__
+__getitem__
+__iter__
+__len__
+__setitem__
+casereverse_lookup
+clear
+get
+items
+longest_key
+reverse_lookup
+update
+""".split()
+
+
+def has_standard_storage(dict_class):
+    """Check if <dict_class> uses one of the standard storage implementations.
+
+    Such dictionaries can be enumerated, and notify the collections
+    using them of any change (see `StenoDictionaryCollection`).
+    """
+    for storage_class in dict_class.__mro__:
+        if "_STANDARD_STORAGE" in storage_class.__dict__:
+            break
+    else:
+        return False
+    return all(
+        getattr(dict_class, name) is getattr(storage_class, name)
+        for name in _STORAGE_METHODS
+    )
+
+
+def has_standard_load(dict_class):
+    """Check if <dict_class> uses the standard `load` implementation.
+
+    Which accepts the `entries` and `progress` arguments.
+    """
+    return dict_class.load.__func__ is StenoDictionary.load.__func__
+
+
 class StenoDictionary:
     """A steno dictionary.
 
@@ -27,23 +75,44 @@ class StenoDictionary:
     Attributes:
     longest_key -- A read only property holding the length of the longest key.
     timestamp -- File last modification time, used to detect external changes.
+    journal -- The changes journal, if enabled (see `plover.dictionary.journal`).
+    reverse -- Reverse mapping: translation -> list of keys.
+    casereverse -- Case-insensitive reverse mapping: lowercase translation -> list
+        of translations.
+
+    Note: the reverse mappings are only built when first needed (or on a
+    call to `build_reverse_indexes`), and then updated on changes.
 
     """
 
     # False if class support creation.
     readonly = False
 
+    # See `has_standard_storage`.
+    _STANDARD_STORAGE = True
+
     def __init__(self):
+        # Objects to notify of changes (e.g. collections), see `_changing`.
+        self._observers = weakref.WeakSet()
         self._dict = {}
         self._longest_key = 0
-        self.reverse = collections.defaultdict(list)
-        # Case-insensitive reverse dict
-        self.casereverse = collections.defaultdict(list)
+        # Reverse lookup indexes, `None` until built.
+        self._reverse = None
+        self._casereverse = None
+        # Protect the reverse indexes, and
+        # keep count of changes to the entries.
+        self._reverse_lock = threading.Lock()
+        self._changes = 0
         self.filters = []
         self.timestamp = 0
+        # Loading progress callback (see `load`).
+        self._progress = None
         self.readonly = False
         self.enabled = True
         self.path = None
+        self.journal = None
+        # Outlines index for `prefix_lookup`, created on first use.
+        self._prefix_index = None
 
     def __str__(self):
         return "%s(%r)" % (self.__class__.__name__, self.path)
@@ -61,11 +130,27 @@ class StenoDictionary:
         return d
 
     @classmethod
-    def load(cls, resource):
+    def load(cls, resource, entries=None, progress=None):
+        """Load a dictionary from <resource>.
+
+        If <entries> is not None, it is used for the dictionary contents
+        instead of parsing the file (see `plover.dictionary.cache`).
+
+        <progress> is an optional callback, periodically called with the
+        loading progress (between 0 and 1) by implementations supporting
+        it (see `_report_progress`).
+        """
         filename = resource_filename(resource)
         timestamp = resource_timestamp(filename)
         d = cls()
-        d._load(filename)
+        if entries is None:
+            d._progress = progress
+            try:
+                d._load(filename)
+            finally:
+                d._progress = None
+        else:
+            d.update(entries)
         if (
             cls.readonly
             or resource.startswith(ASSET_SCHEME)
@@ -82,9 +167,17 @@ class StenoDictionary:
             self._save(temp_path)
         self.timestamp = resource_timestamp(self.path)
 
+    def flush(self):
+        """Wait for pending saves (see `plover.dictionary.base.load_dictionary`)."""
+
     def _load(self, filename):
         raise NotImplementedError()
 
+    def _report_progress(self, progress):
+        """Report loading progress, from `_load`."""
+        if self._progress is not None:
+            self._progress(progress)
+
     def _save(self, filename):
         raise NotImplementedError()
 
@@ -93,6 +186,76 @@ class StenoDictionary:
         """The length of the longest key in the dict."""
         return self._longest_key
 
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        if enabled != getattr(self, "_enabled", None):
+            observers = list(self._observers)
+            for observer in observers:
+                observer._dictionary_changing(self, None)
+            self._enabled = enabled
+            for observer in observers:
+                observer._dictionary_enabled_changed(self)
+
+    @contextlib.contextmanager
+    def _changing(self, key=None):
+        """Notify observers of a change to <key> (or to all entries if None).
+
+        Observers are notified before the change is made (with
+        `_dictionary_changing`), and once it's done (with
+        `_dictionary_changed`), even if it failed.
+        """
+        observers = list(self._observers)
+        for observer in observers:
+            observer._dictionary_changing(self, key)
+        try:
+            yield
+        finally:
+            for observer in observers:
+                observer._dictionary_changed(self, key)
+
+    def _notify(self, key=None):
+        """Notify observers of a change to <key> (or to all entries if None).
+
+        Note: prefer `_changing`, so observers are notified of the
+        change before it's made too.
+        """
+        for observer in list(self._observers):
+            observer._dictionary_changed(self, key)
+
+    @property
+    def reverse(self):
+        if self._reverse is None:
+            self.build_reverse_indexes()
+        return self._reverse
+
+    @property
+    def casereverse(self):
+        if self._casereverse is None:
+            self.build_reverse_indexes()
+        return self._casereverse
+
+    def build_reverse_indexes(self):
+        """Build the reverse lookup indexes, if not already done.
+
+        Note: can be called from another thread.
+        """
+        while self._reverse is None:
+            changes = self._changes
+            reverse = collections.defaultdict(list)
+            casereverse = collections.defaultdict(list)
+            for key, value in list(self._dict.items()):
+                reverse[value].append(key)
+                casereverse[value.lower()].append(value)
+            with self._reverse_lock:
+                # Don't install outdated indexes, and start again.
+                if self._reverse is None and changes == self._changes:
+                    self._reverse = reverse
+                    self._casereverse = casereverse
+
     def __len__(self):
         return self._dict.__len__()
 
@@ -104,10 +267,12 @@ class StenoDictionary:
 
     def clear(self):
         assert not self.readonly
-        self._dict.clear()
-        self.reverse.clear()
-        self.casereverse.clear()
-        self._longest_key = 0
+        with self._changing():
+            with self._reverse_lock:
+                self._changes += 1
+                self._dict.clear()
+                self._reverse = self._casereverse = None
+            self._longest_key = 0
 
     def items(self):
         return self._dict.items()
@@ -120,18 +285,15 @@ class StenoDictionary:
         if kwargs:
             iterable_list.append(kwargs.items())
         if not self._dict:
-            reverse = self.reverse
-            casereverse = self.casereverse
-            longest_key = self._longest_key
-            assert not (reverse or casereverse or longest_key)
-            self._dict = dict(*iterable_list)
-            for key, value in self._dict.items():
-                reverse[value].append(key)
-                casereverse[value.lower()].append(value)
-                key_len = len(key)
-                if key_len > longest_key:
-                    longest_key = key_len
-            self._longest_key = longest_key
+            assert not self._longest_key
+            entries = dict(*iterable_list)
+            with self._changing():
+                # The reverse indexes will be rebuilt on demand.
+                with self._reverse_lock:
+                    self._changes += 1
+                    self._dict = entries
+                    self._reverse = self._casereverse = None
+                self._longest_key = max(map(len, self._dict), default=0)
         else:
             for iterable in iterable_list:
                 for key, value in iterable:
@@ -139,26 +301,38 @@ class StenoDictionary:
 
     def __setitem__(self, key, value):
         assert not self.readonly
-        if key in self:
-            del self[key]
-        self._longest_key = max(self._longest_key, len(key))
-        self._dict[key] = value
-        self.reverse[value].append(key)
-        self.casereverse[value.lower()].append(value)
+        with self._changing(key):
+            if key in self:
+                del self[key]
+            self._longest_key = max(self._longest_key, len(key))
+            # Note: count the change before making it, so an index being
+            # built concurrently (see `build_reverse_indexes`) is discarded.
+            with self._reverse_lock:
+                self._changes += 1
+                self._dict[key] = value
+                if self._reverse is not None:
+                    self._reverse[value].append(key)
+                    self._casereverse[value.lower()].append(value)
 
     def get(self, key, fallback=None):
         return self._dict.get(key, fallback)
 
     def __delitem__(self, key):
         assert not self.readonly
-        value = self._dict.pop(key)
-        self.reverse[value].remove(key)
-        self.casereverse[value.lower()].remove(value)
-        if len(key) == self.longest_key:
-            if self._dict:
-                self._longest_key = max(len(x) for x in self._dict)
-            else:
-                self._longest_key = 0
+        if key not in self._dict:
+            raise KeyError(key)
+        with self._changing(key):
+            with self._reverse_lock:
+                self._changes += 1
+                value = self._dict.pop(key)
+                if self._reverse is not None:
+                    self._reverse[value].remove(key)
+                    self._casereverse[value.lower()].remove(value)
+            if len(key) == self.longest_key:
+                if self._dict:
+                    self._longest_key = max(len(x) for x in self._dict)
+                else:
+                    self._longest_key = 0
 
     def __contains__(self, key):
         return self.get(key) is not None
@@ -169,19 +343,314 @@ class StenoDictionary:
     def casereverse_lookup(self, value):
         return set(self.casereverse.get(value, ()))
 
+    def prefix_lookup(self, steno_prefix):
+        """Return the keys whose steno starts with <steno_prefix>.
+
+        The steno is the strokes joined with "/", so this can be used
+        to search for a partial stroke: e.g. "TEFT" matches both
+        `("TEFT",)` and `("TEFTS", "-G")`.
+
+        Note: the keys are returned in steno order, and (for dictionaries
+        using a standard storage) the index used is built on first use,
+        and then updated on changes.
+        """
+        if not has_standard_storage(type(self)):
+            return sorted(
+                (key for key in self if "/".join(key).startswith(steno_prefix)),
+                key="/".join,
+            )
+        index = self._prefix_index
+        if index is None:
+            index = self._prefix_index = _PrefixIndex(self)
+        return index.lookup(steno_prefix)
+
+
+class _PrefixIndex:
+    """Sorted index of a dictionary outlines, see `StenoDictionary.prefix_lookup`."""
+
+    def __init__(self, d):
+        self._dictionary = d
+        self._lock = threading.Lock()
+        # Sorted (steno, key) pairs, `None` if not built yet.
+        # Note: the key is kept, as different keys can have the
+        # same steno (e.g. `()` and `("",)`).
+        self._entries = None
+        d._observers.add(self)
+
+    def lookup(self, steno_prefix):
+        with self._lock:
+            entries = self._entries
+            if entries is None:
+                entries = self._entries = sorted(
+                    ("/".join(key), key) for key in list(self._dictionary)
+                )
+            keys = []
+            n = bisect.bisect_left(entries, (steno_prefix,))
+            while n < len(entries) and entries[n][0].startswith(steno_prefix):
+                keys.append(entries[n][1])
+                n += 1
+            return keys
+
+    def _dictionary_changing(self, d, key):
+        pass
+
+    def _dictionary_changed(self, d, key):
+        with self._lock:
+            entries = self._entries
+            if entries is None:
+                return
+            if key is None:
+                # Rebuild on next lookup.
+                self._entries = None
+                return
+            entry = ("/".join(key), key)
+            n = bisect.bisect_left(entries, entry)
+            present = n < len(entries) and entries[n] == entry
+            if key in d:
+                if not present:
+                    entries.insert(n, entry)
+            elif present:
+                del entries[n]
+
+    def _dictionary_enabled_changed(self, d):
+        pass
+
 
 class StenoDictionaryCollection:
-    def __init__(self, dicts=[]):
+    """A prioritized collection of steno dictionaries.
+
+    If <merged_index> is True, and all the dictionaries use one of the
+    standard storage implementations, lookups are done using an index
+    merging all enabled dictionaries: one probe per lookup, instead of
+    one per dictionary. The index is built on first use, and updated
+    as the dictionaries are changed.
+
+    The same goes for the outlines prefixes set used by
+    `has_longer_outlines`, and the outlines owners map used by
+    `reverse_lookup` (which do not depend on <merged_index>).
+
+    See `generation` for caching lookups results.
+    """
+
+    def __init__(self, dicts=[], merged_index=False):
         self.dicts = []
         self.filters = []
+        self._merged_index = merged_index
+        self._indexable = False
+        # Protect the cached index / longest key.
+        self._index_lock = threading.Lock()
+        # Merged index, `None` if not built yet:
+        # - key -> highest priority value
+        # - key -> list of lower priority values
+        self._index = None
+        # Proper prefixes of the enabled dictionaries outlines,
+        # `None` if not built yet (see `has_longer_outlines`).
+        self._prefixes = None
+        # Outlines defined in more than one enabled dictionary -> index of
+        # the highest priority one, `None` if not built yet (see
+        # `reverse_lookup`).
+        self._owners = None
+        self._longest_key = None
+        # Incremented before and after changes, see `generation`.
+        self._generation = 0
+        # Number of changes in progress.
+        self._changes_in_progress = 0
         self.set_dicts(dicts)
 
     @property
     def longest_key(self):
-        return max((d.longest_key for d in self.dicts if d.enabled), default=0)
+        longest_key = self._longest_key
+        if longest_key is not None:
+            return longest_key
+        if not self._indexable:
+            return max((d.longest_key for d in self.dicts if d.enabled), default=0)
+        with self._index_lock:
+            longest_key = self._longest_key = max(
+                (d.longest_key for d in self.dicts if d.enabled), default=0
+            )
+        return longest_key
+
+    @property
+    def generation(self):
+        """A number incremented on every change to the lookups results.
+
+        That is, on changes to the dictionaries list, the filters, or
+        the dictionaries themselves (entries, or enabled state). So
+        lookups results can be cached for a given generation.
+
+        Like a sequence lock counter, it is incremented both before and
+        after a change: the generation is odd while changes are in
+        progress (and lookups results may be inconsistent).
+
+        None if changes to the dictionaries cannot be tracked (not
+        all of them use one of the standard storage implementations).
+
+        Note: filters are assumed to give consistent results.
+        """
+        if not self._indexable:
+            return None
+        return self._generation
+
+    def _begin_change(self):
+        # Note: must be called with `_index_lock` held.
+        self._changes_in_progress += 1
+        if self._changes_in_progress == 1:
+            self._generation += 1
+
+    def _end_change(self):
+        # Note: must be called with `_index_lock` held.
+        if not self._changes_in_progress:
+            # Not notified of the change beforehand.
+            self._generation += 2
+            return
+        self._changes_in_progress -= 1
+        if not self._changes_in_progress:
+            self._generation += 1
+
+    @property
+    def merged_index(self):
+        return self._merged_index
+
+    @merged_index.setter
+    def merged_index(self, merged_index):
+        if merged_index != self._merged_index:
+            self._merged_index = merged_index
+            self.set_dicts(self.dicts)
 
     def set_dicts(self, dicts):
-        self.dicts = dicts[:]
+        with self._index_lock:
+            self._begin_change()
+            for d in self.dicts:
+                d._observers.discard(self)
+            self.dicts = dicts[:]
+            self._indexable = all(has_standard_storage(type(d)) for d in self.dicts)
+            if self._indexable:
+                for d in self.dicts:
+                    d._observers.add(self)
+            self._index = None
+            self._prefixes = None
+            self._owners = None
+            self._longest_key = None
+            self._end_change()
+
+    def _dictionary_changing(self, d, key):
+        with self._index_lock:
+            self._begin_change()
+
+    def _dictionary_changed(self, d, key):
+        with self._index_lock:
+            try:
+                self._update_indexes(d, key)
+            finally:
+                self._end_change()
+
+    def _update_indexes(self, d, key):
+        # Note: must be called with `_index_lock` held.
+        self._longest_key = None
+        if key is None:
+            self._index = None
+            self._prefixes = None
+            self._owners = None
+            return
+        if self._prefixes is not None and len(key) > 1 and d.enabled:
+            # Note: the prefixes of deleted outlines are kept,
+            # which is harmless (see `has_longer_outlines`).
+            self._prefixes.update(key[:n] for n in range(1, len(key)))
+        if self._index is None and self._owners is None:
+            return
+        owners = []
+        values = []
+        for n, other in enumerate(self.dicts):
+            if not other.enabled:
+                continue
+            value = other.get(key)
+            if value is not None:
+                owners.append(n)
+                values.append(value)
+        if self._owners is not None:
+            if len(owners) > 1:
+                self._owners[key] = owners[0]
+            else:
+                self._owners.pop(key, None)
+        if self._index is None:
+            return
+        merged, shadowed = self._index
+        if values:
+            merged[key] = values[0]
+        else:
+            merged.pop(key, None)
+        if len(values) > 1:
+            shadowed[key] = values[1:]
+        else:
+            shadowed.pop(key, None)
+
+    def _dictionary_enabled_changed(self, d):
+        self._dictionary_changed(d, None)
+
+    def _get_index(self):
+        index = self._index
+        if index is not None or not self._merged_index or not self._indexable:
+            return index
+        with self._index_lock:
+            if self._index is None:
+                merged = {}
+                shadowed = {}
+                for d in self.dicts:
+                    if not d.enabled:
+                        continue
+                    for key, value in d.items():
+                        if key not in merged:
+                            merged[key] = value
+                        elif key in shadowed:
+                            shadowed[key].append(value)
+                        else:
+                            shadowed[key] = [value]
+                self._index = merged, shadowed
+            return self._index
+
+    def has_longer_outlines(self, key):
+        """Check if there may be outlines longer than, and starting with <key>.
+
+        Return False only if no enabled dictionary contains such an outline
+        (e.g. so the translator can skip lookups that cannot succeed).
+        """
+        prefixes = self._prefixes
+        if prefixes is None:
+            if not self._indexable:
+                return True
+            with self._index_lock:
+                if self._prefixes is None:
+                    self._prefixes = self._build_prefixes()
+                prefixes = self._prefixes
+        return key in prefixes
+
+    def _build_prefixes(self):
+        prefixes = set()
+        for d in self.dicts:
+            if not d.enabled or d.longest_key < 2:
+                continue
+            keys = [key for key in list(d) if len(key) > 1]
+            for n in range(1, d.longest_key):
+                prefixes.update(key[:n] for key in keys if len(key) > n)
+        return prefixes
+
+    def _get_owners(self):
+        owners = self._owners
+        if owners is not None or not self._indexable:
+            return owners
+        with self._index_lock:
+            if self._owners is None:
+                first_owners = {}
+                owners = {}
+                for n, d in enumerate(self.dicts):
+                    if not d.enabled:
+                        continue
+                    for key in list(d):
+                        first = first_owners.setdefault(key, n)
+                        if first != n:
+                            owners[key] = first
+                self._owners = owners
+            return self._owners
 
     def _lookup_keep_deleted(self, key, dicts=None, filters=()):
         """
@@ -191,6 +660,16 @@ class StenoDictionaryCollection:
         return "{plover:deleted}".
         """
         if dicts is None:
+            index = self._get_index()
+            if index is not None:
+                merged, shadowed = index
+                value = merged.get(key)
+                if value is None or not filters:
+                    return value
+                for value in (value, *shadowed.get(key, ())):
+                    if not any(f(key, value) for f in filters):
+                        return value
+                return None
             dicts = self.dicts
         key_len = len(key)
         if key_len > self.longest_key:
@@ -259,10 +738,14 @@ class StenoDictionaryCollection:
 
     def reverse_lookup(self, value):
         keys = set()
+        owners = self._get_owners()
         for n, d in enumerate(self.dicts):
             if not d.enabled:
                 continue
             # Ignore key if it's overridden by a higher priority dictionary.
+            if owners is not None:
+                keys.update(k for k in d.reverse_lookup(value) if owners.get(k, n) == n)
+                continue
             keys.update(
                 k
                 for k in d.reverse_lookup(value)
@@ -320,7 +803,15 @@ class StenoDictionaryCollection:
             yield d.path
 
     def add_filter(self, f):
-        self.filters.append(f)
+        with self._index_lock:
+            self._begin_change()
+            self.filters.append(f)
+            self._end_change()
 
     def remove_filter(self, f):
-        self.filters.remove(f)
+        with self._index_lock:
+            self._begin_change()
+            try:
+                self.filters.remove(f)
+            finally:
+                self._end_change()
@@ -1,30 +1,140 @@
 import collections
+import threading
 
 from plover.steno import sort_steno_strokes
+from plover.steno_dictionary import has_standard_storage
 
 
 Suggestion = collections.namedtuple("Suggestion", "text steno_list")
 
 
+MODS = (
+    "%s",  # Same
+    "{^%s}",  # Prefix
+    "{^}%s",
+    "{^%s^}",  # Infix
+    "{^}%s{^}",
+    "{%s^}",  # Suffix
+    "%s{^}",
+    "{&%s}",  # Fingerspell
+    "{#%s}",  # Command
+)
+
+# (prefix, suffix) pairs, for finding the base text of a variant.
+_MODS_AFFIXES = tuple(tuple(mod.split("%s")) for mod in MODS)
+
+
+def variant_bases(value):
+    """Return the base texts <value> is a variant of (see `MODS`)."""
+    if not value.startswith("{") and not value.endswith("}"):
+        # Fast path: only the identity applies.
+        return {value}
+    bases = set()
+    for prefix, suffix in _MODS_AFFIXES:
+        if (
+            len(value) >= len(prefix) + len(suffix)
+            and value.startswith(prefix)
+            and value.endswith(suffix)
+        ):
+            bases.add(value[len(prefix) : len(value) - len(suffix)])
+    return bases
+
+
 class Suggestions:
+    """Find the outlines for a translation and its variants.
+
+    For collections of dictionaries using one of the standard storage
+    implementations, an index of the variants (by lowercase base text)
+    is built on first use, and the outlines of each variant are cached:
+    both are updated as the dictionaries are changed, so a query only
+    involves a few lookups.
+    """
+
     def __init__(self, dictionary):
         self.dictionary = dictionary
+        self._lock = threading.Lock()
+        # The observed dictionaries list, see `update`.
+        self._dicts = None
+        # Lowercase base text -> variants, `None` if not built yet.
+        # Note: removed values are kept, which is harmless (their
+        # outlines are just empty).
+        self._variants = None
+        # Variant -> sorted outlines.
+        self._outlines = {}
+        # Outline -> variants whose cached outlines include it.
+        self._outline_variants = collections.defaultdict(set)
+        self.update()
 
-    def find(self, translation):
-        suggestions = []
+    def update(self):
+        """Track the current dictionaries of the collection.
+
+        Must be called when the collection's dictionaries are set (with
+        the same locking), until then queries use normal lookups.
+        """
+        with self._lock:
+            dicts = getattr(self.dictionary, "dicts", None)
+            if self._dicts is not None:
+                for d in self._dicts:
+                    d._observers.discard(self)
+            self._reset()
+            if dicts is None or not all(has_standard_storage(type(d)) for d in dicts):
+                self._dicts = None
+                return
+            self._dicts = dicts
+            for d in dicts:
+                d._observers.add(self)
+
+    def _reset(self):
+        self._variants = None
+        self._outlines.clear()
+        self._outline_variants.clear()
 
-        mods = [
-            "%s",  # Same
-            "{^%s}",  # Prefix
-            "{^}%s",
-            "{^%s^}",  # Infix
-            "{^}%s{^}",
-            "{%s^}",  # Suffix
-            "%s{^}",
-            "{&%s}",  # Fingerspell
-            "{#%s}",  # Command
-        ]
+    def _build_variants(self):
+        variants = collections.defaultdict(set)
+        for d in self._dicts:
+            if not d.enabled:
+                continue
+            for value in {value for __, value in d.items()}:
+                for base in variant_bases(value):
+                    variants[base.lower()].add(value)
+        return variants
 
+    def _dictionary_changing(self, d, key):
+        pass
+
+    def _dictionary_changed(self, d, key):
+        with self._lock:
+            if self._variants is None:
+                return
+            if key is None:
+                self._reset()
+                return
+            stale = self._outline_variants.pop(key, set())
+            for other in self._dicts:
+                if not other.enabled:
+                    continue
+                value = other.get(key)
+                if value is None:
+                    continue
+                stale.add(value)
+                for base in variant_bases(value):
+                    self._variants[base.lower()].add(value)
+            for value in stale:
+                self._outlines.pop(value, None)
+
+    def _dictionary_enabled_changed(self, d):
+        self._dictionary_changed(d, None)
+
+    def _variant_outlines(self, value):
+        outlines = self._outlines.get(value)
+        if outlines is None:
+            outlines = sort_steno_strokes(self.dictionary.reverse_lookup(value))
+            self._outlines[value] = outlines
+            for key in outlines:
+                self._outline_variants[key].add(value)
+        return outlines
+
+    def find(self, translation):
         possible_translations = {translation}
 
         # Only strip spaces, so patterns with \n or \t are correctly handled.
@@ -40,13 +150,36 @@ class Suggestions:
         if similar_words:
             possible_translations |= set(similar_words)
 
+        with self._lock:
+            dicts = getattr(self.dictionary, "dicts", None)
+            if self._dicts is None or dicts is not self._dicts:
+                # Not indexable, or not tracked (see `update`).
+                return self._find(possible_translations)
+            if self._variants is None:
+                self._variants = self._build_variants()
+            suggestions = []
+            for t in possible_translations:
+                variants = self._variants.get(t.lower())
+                if not variants:
+                    continue
+                for modded_translation in [mod % t for mod in MODS]:
+                    if modded_translation not in variants:
+                        continue
+                    strokes_list = self._variant_outlines(modded_translation)
+                    if not strokes_list:
+                        continue
+                    suggestion = Suggestion(modded_translation, list(strokes_list))
+                    suggestions.append(suggestion)
+            return suggestions
+
+    def _find(self, possible_translations):
+        suggestions = []
         for t in possible_translations:
-            for modded_translation in [mod % t for mod in mods]:
+            for modded_translation in [mod % t for mod in MODS]:
                 strokes_list = self.dictionary.reverse_lookup(modded_translation)
                 if not strokes_list:
                     continue
                 strokes_list = sort_steno_strokes(strokes_list)
                 suggestion = Suggestion(modded_translation, strokes_list)
                 suggestions.append(suggestion)
-
         return suggestions
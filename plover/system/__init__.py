@@ -6,6 +6,11 @@ from plover.oslayer.config import CONFIG_DIR
 from plover.resource import resource_filename
 from plover.registry import registry
 from plover.steno import Stroke
+from plover.system.wordlist import CACHE_DIR, WordList
+
+
+# Directory used to cache the orthography words lists indexes (or None).
+WORDLISTS_CACHE_DIR = CACHE_DIR
 
 
 def _load_wordlist(filename, assets_dir):
@@ -20,13 +25,8 @@ def _load_wordlist(filename, assets_dir):
             break
     else:
         return {}
-    with open(path, encoding="utf-8") as f:
-        text = f.read()
-    fields = text.split()
-    it = iter(fields)
-    words = dict(zip(it, map(int, it)))
-    assert len(fields) == 2 * len(words), path + " contains duplicate words."
-    return words
+    # Note: the index is only loaded on first use.
+    return WordList(path, WORDLISTS_CACHE_DIR)
 
 
 def _key_order(keys, numbers):
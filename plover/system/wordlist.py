@@ -0,0 +1,242 @@
+"""Compact, memory-mapped index of an orthography words list.
+
+A words list is a text file of words and their rank (lower is more
+common). Instead of loading it into a dictionary, it is converted
+into a binary index: an open addressing hash table of the words
+(using CRC32), that can be memory-mapped and queried in place. The
+index is cached, and rebuilt if the words list file changes (same
+path, modification time, and size).
+
+"""
+
+from array import array
+from collections.abc import Mapping
+from zlib import crc32
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+
+from plover import log
+from plover.oslayer.config import CONFIG_DIR
+
+
+CACHE_DIR = os.path.join(CONFIG_DIR, "wordlists_cache")
+
+MAGIC = b"PLWL"
+
+# Must be bumped on incompatible format changes.
+VERSION = 1
+
+# magic, version, words count, hash slots count, cache key size.
+_HEADER = struct.Struct("=4sIIII")
+
+
+def parse_wordlist(text, filename="words list"):
+    """Parse a words list, return a dictionary of words to ranks."""
+    fields = text.split()
+    it = iter(fields)
+    words = dict(zip(it, map(int, it)))
+    assert len(fields) == 2 * len(words), filename + " contains duplicate words."
+    return words
+
+
+def _align(size):
+    return (size + 7) & ~7
+
+
+def _build_index(words, key):
+    encoded = [w.encode("utf-8", "surrogatepass") for w in words]
+    ranks = array("q", words.values())
+    offsets = array("I", [0])
+    size = 0
+    for b in encoded:
+        size += len(b)
+        offsets.append(size)
+    # Hash table slots: (word hash, word number + 1) pairs,
+    # with a load factor of 50%.
+    slots_count = max(2 * len(encoded), 1)
+    slots = array("I", bytes(8 * slots_count))
+    for n, b in enumerate(encoded, start=1):
+        h = crc32(b)
+        i = h % slots_count
+        while slots[2 * i + 1]:
+            i = (i + 1) % slots_count
+        slots[2 * i] = h
+        slots[2 * i + 1] = n
+    header = _HEADER.pack(MAGIC, VERSION, len(encoded), slots_count, len(key)) + key
+    parts = []
+    for data in (header, ranks, slots, offsets):
+        data = bytes(data)
+        parts.append(data + bytes(_align(len(data)) - len(data)))
+    parts.extend(encoded)
+    return b"".join(parts)
+
+
+def _cache_key(filename):
+    stat = os.stat(filename)
+    # Note: the index uses native byte order and sizes.
+    return repr(
+        (
+            VERSION,
+            sys.byteorder,
+            os.path.abspath(filename),
+            stat.st_mtime_ns,
+            stat.st_size,
+        )
+    ).encode("utf-8", "surrogatepass")
+
+
+def cache_filename(cache_dir, filename):
+    path = os.path.abspath(filename).encode("utf-8", "surrogatepass")
+    return os.path.join(cache_dir, hashlib.sha1(path).hexdigest() + ".index")
+
+
+def _read_cache(cache_file, key):
+    try:
+        with open(cache_file, "rb") as fp:
+            buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < _HEADER.size:
+            buffer.close()
+            return None
+    except FileNotFoundError:
+        return None
+    except Exception:
+        log.debug("reading words list index %s failed", cache_file, exc_info=True)
+        return None
+    magic, version, __, __, key_size = _HEADER.unpack_from(buffer)
+    if (magic, version, buffer[_HEADER.size : _HEADER.size + key_size]) != (
+        MAGIC,
+        VERSION,
+        key,
+    ):
+        buffer.close()
+        return None
+    return buffer
+
+
+def _write_cache(cache_file, index):
+    try:
+        cache_dir = os.path.dirname(cache_file)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_file = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(index)
+            os.replace(temp_file, cache_file)
+        except:
+            os.unlink(temp_file)
+            raise
+    except Exception:
+        log.warning("writing words list index %s failed", cache_file, exc_info=True)
+        return False
+    return True
+
+
+class WordList(Mapping):
+    """Read-only mapping of words to ranks, backed by a binary index.
+
+    The index is only loaded (or built) on first access, or by `load`.
+    If <cache_dir> is not None, the index is saved there and memory-mapped,
+    otherwise it is kept in memory.
+    """
+
+    def __init__(self, filename, cache_dir=None):
+        self.filename = filename
+        self.cache_dir = cache_dir
+        self._buffer = None
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """Load the index, if not already done.
+
+        Note: on error (e.g. duplicate words), the error is
+        logged, and the words list is considered empty.
+        """
+        if self._buffer is not None:
+            return
+        with self._load_lock:
+            if self._buffer is not None:
+                return
+            try:
+                buffer = self._load()
+            except Exception:
+                log.error("loading words list %s failed", self.filename, exc_info=True)
+                buffer = _build_index({}, b"")
+            self._set_buffer(buffer)
+
+    def _load(self):
+        key = _cache_key(self.filename)
+        buffer = None
+        if self.cache_dir is not None:
+            cache_file = cache_filename(self.cache_dir, self.filename)
+            buffer = _read_cache(cache_file, key)
+        if buffer is None:
+            with open(self.filename, encoding="utf-8") as fp:
+                words = parse_wordlist(fp.read(), self.filename)
+            buffer = _build_index(words, key)
+            if self.cache_dir is not None and _write_cache(cache_file, buffer):
+                buffer = _read_cache(cache_file, key) or buffer
+        return buffer
+
+    def _set_buffer(self, buffer):
+        __, __, count, slots_count, key_size = _HEADER.unpack_from(buffer)
+        view = memoryview(buffer)
+        start = _align(_HEADER.size + key_size)
+        end = start + 8 * count
+        self._ranks = view[start:end].cast("q")
+        start, end = end, end + 8 * slots_count
+        self._slots = view[start:end].cast("I")
+        start, end = _align(end), _align(end) + 4 * (count + 1)
+        self._offsets = view[start:end].cast("I")
+        self._data_start = _align(end)
+        # Note: set last, as this marks the index as loaded.
+        self._buffer = buffer
+
+    def _word(self, n):
+        offsets = self._offsets
+        start = self._data_start
+        return self._buffer[start + offsets[n] : start + offsets[n + 1]]
+
+    def _find(self, word):
+        if self._buffer is None:
+            self.load()
+        try:
+            word = word.encode("utf-8", "surrogatepass")
+        except AttributeError:
+            return -1
+        slots = self._slots
+        h = crc32(word)
+        i = 2 * (h % (len(slots) // 2))
+        while True:
+            n = slots[i + 1]
+            if not n:
+                return -1
+            if slots[i] == h:
+                n -= 1
+                if self._word(n) == word:
+                    return n
+            i += 2
+            if i == len(slots):
+                i = 0
+
+    def __contains__(self, word):
+        return self._find(word) >= 0
+
+    def __getitem__(self, word):
+        n = self._find(word)
+        if n < 0:
+            raise KeyError(word)
+        return self._ranks[n]
+
+    def __len__(self):
+        if self._buffer is None:
+            self.load()
+        return len(self._ranks)
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self._word(n).decode("utf-8", "surrogatepass")
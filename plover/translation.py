@@ -14,11 +14,16 @@ also be meta commands.
 Translator -- A state machine that takes in a single Stroke object at a time and
 emits one or more Translation objects based on a greedy conversion algorithm.
 
+The translate_stream function provides a faster alternative to the Translator
+for translating a stream of strokes offline (e.g. replaying a strokes log).
+
 """
 
 from collections import namedtuple
 import re
 
+from plover.config import DEFAULT_UNDO_LEVELS
+from plover.formatting import Formatter
 from plover.steno import Stroke
 from plover.steno_dictionary import StenoDictionaryCollection
 from plover.registry import registry
@@ -107,8 +112,20 @@ class Translation:
     formatting -- Information stored on the translation by the formatter for
     sticky state (e.g. capitalize next stroke) and to hold undo info.
 
+    Note: replaced and formatting are initially a shared empty tuple, they must
+    be assigned to (not updated in place).
+
     """
 
+    __slots__ = (
+        "strokes",
+        "rtfcre",
+        "english",
+        "replaced",
+        "formatting",
+        "is_retrospective_command",
+    )
+
     def __init__(self, outline, translation):
         """Create a translation by looking up strokes in a dictionary.
 
@@ -122,8 +139,8 @@ class Translation:
         self.strokes = outline
         self.rtfcre = tuple(s.rtfcre for s in outline)
         self.english = translation
-        self.replaced = []
-        self.formatting = []
+        self.replaced = ()
+        self.formatting = ()
         self.is_retrospective_command = False
 
     def __eq__(self, other):
@@ -372,6 +389,7 @@ class Translator:
             translation_count += 1
         translation_index = len(self._state.translations) - translation_count
         translations = self._state.translations[translation_index:]
+        stroke_steno = (stroke.rtfcre,)
         # The new stroke can either create a new translation or replace
         # existing translations by matching a longer entry in the
         # dictionary.
@@ -381,8 +399,10 @@ class Translator:
             strokes.append(stroke)
             if len(strokes) < min_len:
                 continue
+            # Reuse the translations steno, instead of converting each stroke again.
+            steno = tuple(s for t in replaced for s in t.rtfcre) + stroke_steno
             mapping = self._lookup_with_prefix(
-                max_len, translations[:i], strokes, suffixes
+                max_len, translations[:i], strokes, suffixes, steno
             )
             if mapping is not None:
                 t = Translation(strokes, mapping)
@@ -399,23 +419,29 @@ class Translator:
         """
         return self._dictionary.lookup(tuple(s.rtfcre for s in strokes))
 
-    def _lookup_with_suffix(self, strokes, suffixes=()):
+    def _lookup_with_suffix(self, strokes, suffixes=(), steno=None):
         """Look for a matching translation.
 
         suffixes -- A list of (suffix stroke, suffix mapping) pairs to try.
+        steno    -- The strokes steno, if already known.
 
         If the suffix list is empty, look for a direct match.
 
         Otherwise, assume the last stroke contains an implicit suffix,
         and look for a corresponding match.
         """
+        if steno is None:
+            steno = tuple(s.rtfcre for s in strokes)
+        if len(steno) > 1 and not self._dictionary.has_longer_outlines(steno[:-1]):
+            # No possible match, whatever the last stroke.
+            return None
         if not suffixes:
             # No suffix, do a regular lookup.
-            return self._lookup_strokes(strokes)
+            return self._dictionary.lookup(steno)
         for suffix_stroke, suffix_mapping in suffixes:
             assert suffix_stroke in strokes[-1]
-            main_mapping = self._lookup_strokes(
-                strokes[:-1] + [strokes[-1] - suffix_stroke]
+            main_mapping = self._dictionary.lookup(
+                steno[:-1] + ((strokes[-1] - suffix_stroke).rtfcre,)
             )
             if main_mapping is not None:
                 return main_mapping + " " + suffix_mapping
@@ -457,20 +483,100 @@ class Translator:
             return True
         return formatting[-1].word_is_finished
 
-    def _lookup_with_prefix(self, max_len, last_translations, strokes, suffixes=()):
+    def _lookup_with_prefix(
+        self, max_len, last_translations, strokes, suffixes=(), steno=None
+    ):
+        if steno is None:
+            steno = tuple(s.rtfcre for s in strokes)
         if len(strokes) < max_len and self._previous_word_is_finished(
             last_translations
         ):
             mapping = self._lookup_with_suffix(
-                [Stroke.PREFIX_STROKE] + strokes, suffixes
+                [Stroke.PREFIX_STROKE] + strokes,
+                suffixes,
+                (Stroke.PREFIX_STROKE.rtfcre,) + steno,
             )
             if mapping is not None:
                 return mapping
         if len(strokes) <= max_len:
-            return self._lookup_with_suffix(strokes, suffixes)
+            return self._lookup_with_suffix(strokes, suffixes, steno)
         return None
 
 
+class _History(list):
+    """A list of translations, keeping track of their total number of strokes.
+
+    All the mutating methods are supported, so the history can still
+    be used (and modified) like a regular list: it's sliced by retro
+    macros, tools, and plugins, which rules out a deque or ring buffer.
+    """
+
+    __slots__ = ("stroke_count",)
+
+    def __init__(self, translations=()):
+        super().__init__(translations)
+        self.stroke_count = sum(len(t) for t in self)
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+    def append(self, t):
+        super().append(t)
+        self.stroke_count += len(t)
+
+    def extend(self, translations):
+        if not isinstance(translations, (list, tuple)):
+            translations = list(translations)
+        super().extend(translations)
+        for t in translations:
+            self.stroke_count += len(t)
+
+    def __iadd__(self, translations):
+        self.extend(translations)
+        return self
+
+    def __imul__(self, n):
+        super().__imul__(n)
+        self.stroke_count = sum(len(t) for t in self)
+        return self
+
+    def insert(self, index, t):
+        super().insert(index, t)
+        self.stroke_count += len(t)
+
+    def pop(self, index=-1):
+        t = super().pop(index)
+        self.stroke_count -= len(t)
+        return t
+
+    def remove(self, t):
+        super().remove(t)
+        self.stroke_count -= len(t)
+
+    def clear(self):
+        super().clear()
+        self.stroke_count = 0
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            removed = sum(len(t) for t in self[index])
+        else:
+            removed = len(self[index])
+        super().__delitem__(index)
+        self.stroke_count -= removed
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            removed = sum(len(t) for t in self[index])
+            added = sum(len(t) for t in value)
+        else:
+            removed = len(self[index])
+            added = len(value)
+        super().__setitem__(index, value)
+        self.stroke_count += added - removed
+
+
 class _State:
     """An object representing the current state of the translator state machine.
 
@@ -483,7 +589,7 @@ class _State:
     """
 
     def __init__(self):
-        self.translations = []
+        self.translations = _History()
         self.tail = None
 
     def prev(self, count=None):
@@ -499,15 +605,136 @@ class _State:
         return None
 
     def restrict_size(self, n):
-        """Reduce the history of translations to n."""
-        stroke_count = 0
-        translation_count = 0
-        for t in reversed(self.translations):
-            stroke_count += len(t)
-            translation_count += 1
-            if stroke_count >= n:
+        """Reduce the history of translations to n strokes.
+
+        Return the removed translations.
+
+        Note: only the removed translations are visited, but removing
+        them still shifts the rest of the history (which must stay a
+        list, see `_History`): trimming is not constant time, though
+        cheap for any realistic undo levels.
+        """
+        translations = self.translations
+        if not isinstance(translations, _History):
+            # Support for assigning a plain list.
+            translations = self.translations = _History(translations)
+        # Thanks to the running strokes count, only the
+        # removed translations need to be visited.
+        stroke_count = translations.stroke_count
+        translation_index = 0
+        for t in translations:
+            if translation_index == len(translations) - 1:
                 break
-        translation_index = len(self.translations) - translation_count
-        if translation_index:
-            self.tail = self.translations[translation_index - 1]
-        del self.translations[:translation_index]
+            stroke_count -= len(t)
+            if stroke_count < n:
+                break
+            translation_index += 1
+        if not translation_index:
+            return []
+        self.tail = translations[translation_index - 1]
+        removed = translations[:translation_index]
+        del translations[:translation_index]
+        return removed
+
+
+class _StreamTranslator(Translator):
+    """Translator used by `translate_stream`.
+
+    New translations are directly formatted, without any listener
+    or undo tracking, and the translations trimmed from the history
+    are final: they are appended to the finished list.
+    """
+
+    def __init__(self, formatter):
+        super().__init__()
+        self._formatter = formatter
+        self.finished = []
+
+    def flush(self, extra_translations=None):
+        state = self._state
+        if self._to_do:
+            prev = state.prev(self._to_do)
+            do = state.translations[-self._to_do :]
+        else:
+            prev = state.prev()
+            do = []
+        if extra_translations is not None:
+            do.extend(extra_translations)
+        self._to_do = 0
+        if do:
+            self._formatter.format_actions((), do, prev)
+        if extra_translations:
+            # Extra translations are not part of the history:
+            # finalize the history first to keep the output order.
+            if state.translations:
+                state.tail = state.translations[-1]
+                self.finished.extend(state.translations)
+                del state.translations[:]
+            self.finished.extend(extra_translations)
+            return
+        size = max(self._dictionary.longest_key, self._undo_length)
+        translations = state.translations
+        # Fast path: check if the oldest translation must be trimmed.
+        if not isinstance(translations, _History) or (
+            len(translations) > 1
+            and translations.stroke_count - len(translations[0]) >= size
+        ):
+            self.finished.extend(state.restrict_size(size))
+
+    def _undo(self, *translations):
+        for t in reversed(translations):
+            assert t == self._state.translations.pop()
+            if self._to_do:
+                self._to_do -= 1
+
+
+def translate_stream(
+    strokes,
+    dictionaries,
+    formatter=None,
+    undo_levels=DEFAULT_UNDO_LEVELS,
+    state=None,
+):
+    """Translate a stream of strokes.
+
+    Arguments:
+
+    strokes -- An iterable of Stroke objects, consumed lazily,
+    so a generator can be used for huge inputs.
+
+    dictionaries -- A StenoDictionaryCollection, or a list of
+    dictionaries, by order of priority.
+
+    formatter -- The Formatter used to format the translations,
+    a default one is used if None.
+
+    undo_levels -- The minimum number of strokes that can be
+    undone, like with `Translator.set_min_undo_length`.
+
+    state -- The initial translator state (see `Translator.get_state`),
+    updated in place while the strokes are consumed. A new one if None.
+
+    Generate the translations, formatted, once they are final (i.e. they
+    can no longer be undone or replaced): use `formatting.translations_to_text`
+    to render them to text. The result is the same as when feeding the
+    strokes one at a time to a Translator, but no listeners or undo
+    tracking is involved, and no output is rendered.
+
+    """
+    if not isinstance(dictionaries, StenoDictionaryCollection):
+        dictionaries = StenoDictionaryCollection(dictionaries)
+    if formatter is None:
+        formatter = Formatter()
+    translator = _StreamTranslator(formatter)
+    if state is not None:
+        translator.set_state(state)
+    translator.set_dictionary(dictionaries)
+    translator.set_min_undo_length(undo_levels)
+    finished = translator.finished
+    for stroke in strokes:
+        translator.translate_stroke(stroke)
+        translator.flush()
+        if finished:
+            yield from finished
+            del finished[:]
+    yield from translator.get_state().translations
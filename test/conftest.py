@@ -11,8 +11,10 @@ from plover.registry import registry
 
 
 @pytest.fixture(scope="session", autouse=True)
-def setup_plover():
+def setup_plover(tmp_path_factory):
     registry.update()
+    # Don't write to the configuration directory.
+    system.WORDLISTS_CACHE_DIR = str(tmp_path_factory.mktemp("wordlists_cache"))
     system.setup(DEFAULT_SYSTEM_NAME)
 
 
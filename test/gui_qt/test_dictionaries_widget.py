@@ -226,6 +226,7 @@ def model_test(monkeypatch, request):
         "config_changed",
         "dictionaries_loaded",
         "dictionary_state_changed",
+        "dictionary_loading_progress",
     }
     config.reset_mock()
     engine.reset_mock()
@@ -301,6 +302,25 @@ def test_model_accessible_text_4(model_test):
     )
 
 
+def test_model_loading_progress(model_test):
+    """
+    ☑ 🗘 user.json
+    """
+    path = expand_path("user.json")
+    on_state_changed = model_test.connections["dictionary_state_changed"]
+    on_loading_progress = model_test.connections["dictionary_loading_progress"]
+    index = model_test.model.index(0)
+    on_loading_progress(path, 0.42)
+    assert index.data(Qt.ItemDataRole.DecorationRole) == "loading"
+    assert index.data(Qt.ItemDataRole.ToolTipRole).endswith(
+        "This dictionary is being loaded: 42%."
+    )
+    d = StenoDictionary()
+    d.path = path
+    on_state_changed(path, d)
+    assert index.data(Qt.ItemDataRole.DecorationRole) == "normal"
+
+
 def test_model_add_existing(model_test):
     """
     ☑ ★ user.json
@@ -0,0 +1,35 @@
+from PySide6.QtCore import QModelIndex, Qt
+
+from plover.gui_qt.dictionary_editor import DictionaryItemModel
+from plover.steno_dictionary import StenoDictionary
+
+
+def model_entries(model):
+    return [
+        (
+            model.data(model.index(row, 0), Qt.ItemDataRole.DisplayRole),
+            model.data(model.index(row, 1), Qt.ItemDataRole.DisplayRole),
+        )
+        for row in range(model.rowCount(QModelIndex()))
+    ]
+
+
+def test_model_filter(qtbot):
+    d = StenoDictionary()
+    d.path = "main.json"
+    d[("TEFT",)] = "test"
+    d[("TEFT", "-G")] = "testing"
+    d[("TKPW",)] = "go"
+    model = DictionaryItemModel([d], 0, Qt.SortOrder.AscendingOrder)
+    assert model_entries(model) == [
+        ("TKPW", "go"),
+        ("TEFT", "test"),
+        ("TEFT/-G", "testing"),
+    ]
+    model.filter(strokes_filter="TEFT/", translation_filter=None)
+    assert model_entries(model) == [("TEFT/-G", "testing")]
+    # An empty strokes filter matches all entries.
+    model.filter(strokes_filter="", translation_filter="test")
+    assert model_entries(model) == [("TEFT", "test"), ("TEFT/-G", "testing")]
+    model.filter()
+    assert len(model_entries(model)) == 3
@@ -0,0 +1,122 @@
+"""Unit tests for dictionary/compact.py."""
+
+import random
+
+from plover.dictionary.compact import (
+    CompactStenoDictionary,
+    compact_dictionary_class,
+)
+from plover.dictionary.json_dict import JsonDictionary
+from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
+
+from plover_build_utils.testing import dictionary_test
+
+from .test_json_dict import JSON_LOAD_TESTS, JSON_SAVE_TESTS
+
+
+@dictionary_test
+class TestCompactStenoDictionary:
+    class DICT_CLASS(CompactStenoDictionary):
+        def _load(self, filename):
+            pass
+
+    DICT_EXTENSION = "dict"
+    DICT_SAMPLE = b""
+
+
+@dictionary_test
+class TestCompactJsonDictionary:
+    DICT_CLASS = compact_dictionary_class(JsonDictionary)
+    DICT_EXTENSION = "json"
+    DICT_LOAD_TESTS = JSON_LOAD_TESTS
+    DICT_SAVE_TESTS = JSON_SAVE_TESTS
+    DICT_SAMPLE = b"{}"
+
+
+def test_compact_dictionary_class():
+    compact_class = compact_dictionary_class(JsonDictionary)
+    assert issubclass(compact_class, CompactStenoDictionary)
+    assert issubclass(compact_class, JsonDictionary)
+    # Classes are cached.
+    assert compact_dictionary_class(JsonDictionary) is compact_class
+    assert compact_dictionary_class(compact_class) is compact_class
+
+    # Implementations with their own storage are left alone.
+    class CustomDictionary(StenoDictionary):
+        def get(self, key, fallback=None):
+            return fallback
+
+    assert compact_dictionary_class(CustomDictionary) is CustomDictionary
+
+
+def test_same_as_default_storage():
+    rnd = random.Random(42)
+    strokes = ["S", "T", "KAT", "-G", "TEFT", "PWAOUFL", "STKPWHR", "*"]
+    translations = ["a", "A", "b", "B", "{^ing}", "café", "Café", "CAFÉ", ""]
+    reference = StenoDictionary()
+    compact = CompactStenoDictionary()
+    for n in range(5000):
+        key = tuple(rnd.choice(strokes) for __ in range(rnd.randint(1, 4)))
+        if key in reference and rnd.random() < 0.4:
+            del reference[key]
+            del compact[key]
+        else:
+            value = rnd.choice(translations) + str(n % 7)
+            reference[key] = value
+            compact[key] = value
+        assert len(compact) == len(reference)
+        assert compact.longest_key == reference.longest_key
+    assert list(compact.items()) == list(reference.items())
+    assert list(compact) == list(reference)
+    for value in set(reference.reverse) | {"missing"}:
+        assert compact.reverse_lookup(value) == reference.reverse_lookup(value)
+    for value in set(reference.casereverse) | {"Café0", "missing"}:
+        assert compact.casereverse_lookup(value) == reference.casereverse_lookup(value)
+    # Note: the default storage keeps empty lists for removed values.
+    assert dict(compact.reverse) == {
+        value: keys for value, keys in reference.reverse.items() if keys
+    }
+    assert {value: sorted(values) for value, values in compact.casereverse.items()} == {
+        value: sorted(values)
+        for value, values in reference.casereverse.items()
+        if values
+    }
+    assert compact.reverse.get("missing") is None
+    assert "missing" not in compact.casereverse
+
+
+def test_delete_everything():
+    d = CompactStenoDictionary()
+    keys = [("S", str(n)) for n in range(3000)]
+    for n, key in enumerate(keys):
+        d[key] = "value %u" % (n % 10)
+    # Deleting most entries will trigger a compaction of the storage.
+    for key in keys[:-1]:
+        del d[key]
+    assert list(d.items()) == [(keys[-1], "value 9")]
+    assert d.reverse_lookup("value 9") == {keys[-1]}
+    assert d.reverse_lookup("value 0") == set()
+    assert d.casereverse_lookup("value 0") == set()
+    del d[keys[-1]]
+    assert len(d) == 0
+    assert d.longest_key == 0
+    assert d.get(keys[-1]) is None
+
+
+def test_dictionary_collection():
+    d1 = CompactStenoDictionary()
+    d1[("PWAOUFL",)] = "beautiful"
+    d1[("WAOUFL",)] = "beAuTIFul"
+    d2 = CompactStenoDictionary()
+    d2[("PW-FL",)] = "BEAUTIFUL"
+    d2[("WAOUFL",)] = "{plover:deleted}"
+    dc = StenoDictionaryCollection([d2, d1])
+    assert dc.lookup(("PWAOUFL",)) == "beautiful"
+    assert dc.lookup(("WAOUFL",)) is None
+    assert dc.reverse_lookup("beautiful") == {("PWAOUFL",)}
+    assert dc.reverse_lookup("beAuTIFul") == set()
+    assert dc.casereverse_lookup("beautiful") == {
+        "beautiful",
+        "BEAUTIFUL",
+        "beAuTIFul",
+    }
@@ -0,0 +1,62 @@
+"""Unit tests for dictionary/base.py."""
+
+import threading
+
+from plover.dictionary.base import _SaveScheduler
+
+
+def test_save_scheduler_coalescing():
+    saves = []
+    scheduler = _SaveScheduler(lambda: saves.append(None), delay=60)
+    for __ in range(10):
+        scheduler()
+    assert saves == []
+    scheduler.flush()
+    assert len(saves) == 1
+    # Nothing left to save.
+    scheduler.flush()
+    assert len(saves) == 1
+
+
+def test_save_scheduler_latest_state():
+    state = {"value": 0}
+    saved = []
+    saving = threading.Event()
+    resume = threading.Event()
+
+    def save():
+        value = state["value"]
+        saving.set()
+        resume.wait()
+        saved.append(value)
+
+    scheduler = _SaveScheduler(save)
+    state["value"] = 1
+    scheduler()
+    assert saving.wait(5)
+    # Changes during a save trigger a single new save.
+    for n in range(2, 5):
+        state["value"] = n
+        scheduler()
+    resume.set()
+    scheduler.flush()
+    assert saved == [1, 4]
+
+
+def test_save_scheduler_error():
+    calls = []
+
+    def save():
+        calls.append(None)
+        if len(calls) == 1:
+            raise OSError()
+
+    scheduler = _SaveScheduler(save, delay=60)
+    scheduler()
+    try:
+        scheduler.flush()
+    except OSError:
+        pass
+    # The changes are still pending.
+    scheduler.flush()
+    assert len(calls) == 2
@@ -0,0 +1,108 @@
+"""Unit tests for dictionary/cache.py."""
+
+import json
+import os
+import threading
+
+from plover import system
+from plover.dictionary.base import load_dictionary
+from plover.dictionary.cache import cache_filename, is_cacheable
+from plover.dictionary.compact import CompactStenoDictionary
+from plover.dictionary.json_dict import JsonDictionary
+from plover.steno_dictionary import StenoDictionary
+
+
+def wait_for_cache_writers():
+    for thread in threading.enumerate():
+        if thread.name == "DictionaryCacheWriter":
+            thread.join()
+
+
+def test_is_cacheable():
+    assert is_cacheable(JsonDictionary)
+
+    class CustomDictionary(StenoDictionary):
+        def get(self, key, fallback=None):
+            return fallback
+
+    assert not is_cacheable(CustomDictionary)
+
+
+def test_cache(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    dict_file = tmp_path / "dict.json"
+    dict_file.write_text(json.dumps({"TEFT": "test", "TEFT/-G": "testing"}))
+    cache_file = cache_filename(str(cache_dir), str(dict_file))
+    expected = {("TEFT",): "test", ("TEFT", "-G"): "testing"}
+    # Cache miss: the dictionary is parsed, and the cache created.
+    d = load_dictionary(str(dict_file), threaded_save=False, cache_dir=str(cache_dir))
+    assert dict(d.items()) == expected
+    wait_for_cache_writers()
+    assert os.path.exists(cache_file)
+    # Cache hit: the dictionary is not parsed.
+    monkeypatch.setattr(JsonDictionary, "_load", None)
+    for compact in (False, True):
+        d = load_dictionary(
+            str(dict_file),
+            threaded_save=False,
+            compact=compact,
+            cache_dir=str(cache_dir),
+        )
+        assert isinstance(d, JsonDictionary)
+        assert isinstance(d, CompactStenoDictionary) == compact
+        assert dict(d.items()) == expected
+        assert d.path == str(dict_file)
+        assert d.timestamp == os.path.getmtime(dict_file)
+        assert d.longest_key == 2
+    monkeypatch.undo()
+    # The dictionary is newer: the cache must be ignored, and updated.
+    dict_file.write_text(json.dumps({"TEFT": "test", "TEFTS": "tests"}))
+    os.utime(dict_file, (0, 0))
+    d = load_dictionary(str(dict_file), threaded_save=False, cache_dir=str(cache_dir))
+    assert dict(d.items()) == {("TEFT",): "test", ("TEFTS",): "tests"}
+    wait_for_cache_writers()
+    monkeypatch.setattr(JsonDictionary, "_load", None)
+    d = load_dictionary(str(dict_file), threaded_save=False, cache_dir=str(cache_dir))
+    assert dict(d.items()) == {("TEFT",): "test", ("TEFTS",): "tests"}
+
+
+def test_cache_system_change(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    dict_file = tmp_path / "dict.json"
+    dict_file.write_text(json.dumps({"TEFT": "test"}))
+    load_dictionary(str(dict_file), threaded_save=False, cache_dir=str(cache_dir))
+    wait_for_cache_writers()
+    load = JsonDictionary._load
+    loads = []
+
+    def spy_load(self, filename):
+        loads.append(filename)
+        load(self, filename)
+
+    monkeypatch.setattr(JsonDictionary, "_load", spy_load)
+    # The normalized steno depends on the system: the cache must be ignored.
+    for name, value in (("NAME", "Other"), ("IMPLICIT_HYPHEN_KEYS", set())):
+        with monkeypatch.context() as m:
+            m.setattr(system, name, value)
+            del loads[:]
+            d = load_dictionary(
+                str(dict_file), threaded_save=False, cache_dir=str(cache_dir)
+            )
+            assert dict(d.items()) == {("TEFT",): "test"}
+            assert loads == [str(dict_file)]
+            wait_for_cache_writers()
+
+
+def test_invalid_cache(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    dict_file = tmp_path / "dict.json"
+    dict_file.write_text(json.dumps({"TEFT": "test"}))
+    cache_file = cache_filename(str(cache_dir), str(dict_file))
+    with open(cache_file, "wb") as fp:
+        fp.write(b"garbage")
+    d = load_dictionary(str(dict_file), threaded_save=False, cache_dir=str(cache_dir))
+    assert dict(d.items()) == {("TEFT",): "test"}
+    wait_for_cache_writers()
+    d = load_dictionary(str(dict_file), threaded_save=False, cache_dir=str(cache_dir))
+    assert dict(d.items()) == {("TEFT",): "test"}
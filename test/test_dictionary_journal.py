@@ -0,0 +1,88 @@
+"""Unit tests for dictionary/journal.py."""
+
+import json
+import os
+
+from plover.dictionary import journal as journal_module
+from plover.dictionary.base import load_dictionary
+from plover.dictionary.journal import journal_filename
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def test_journal(tmp_path, monkeypatch):
+    dict_file = tmp_path / "dict.json"
+    dict_file.write_text(json.dumps({"TEFT": "test", "TEFT/-G": "testing"}))
+    journal_file = journal_filename(str(dict_file))
+    d = load_dictionary(str(dict_file), threaded_save=False, journal=True)
+    assert d.journal is not None
+    # Changes are appended to the journal, the dictionary is left untouched.
+    d[("TEFTS",)] = "tests"
+    del d[("TEFT", "-G")]
+    d.save()
+    d[("TEFT",)] = "téste"
+    d.save()
+    assert read_json(dict_file) == {"TEFT": "test", "TEFT/-G": "testing"}
+    with open(journal_file, encoding="utf-8") as fp:
+        assert len(fp.readlines()) == 4
+    # Simulate a crash: the journal is replayed on the next load.
+    expected = {("TEFT",): "téste", ("TEFTS",): "tests"}
+    d = load_dictionary(str(dict_file), threaded_save=False, journal=True)
+    assert dict(d.items()) == expected
+    # Compaction.
+    d.journal.compact()
+    assert not os.path.exists(journal_file)
+    assert read_json(dict_file) == {"TEFT": "téste", "TEFTS": "tests"}
+    d = load_dictionary(str(dict_file), threaded_save=False, journal=True)
+    assert dict(d.items()) == expected
+    # Automatic compaction when the journal grows too big.
+    monkeypatch.setattr(journal_module, "COMPACTION_THRESHOLD", 2)
+    d[("TKPW",)] = "go"
+    d.save()
+    assert os.path.exists(journal_file)
+    d[("TKPWO",)] = "go"
+    d[("TKPWOE",)] = "go"
+    d.save()
+    assert not os.path.exists(journal_file)
+    assert len(read_json(dict_file)) == 5
+    # Bulk changes trigger a full save.
+    d[("A",)] = "a"
+    d.save()
+    assert os.path.exists(journal_file)
+    d.clear()
+    d.save()
+    assert not os.path.exists(journal_file)
+    assert read_json(dict_file) == {}
+
+
+def test_truncated_journal(tmp_path):
+    dict_file = tmp_path / "dict.json"
+    dict_file.write_text(json.dumps({"TEFT": "test"}))
+    d = load_dictionary(str(dict_file), threaded_save=False, journal=True)
+    d[("TEFTS",)] = "tests"
+    d[("TEFT",)] = "teste"
+    d.save()
+    journal_file = journal_filename(str(dict_file))
+    with open(journal_file, "rb") as fp:
+        contents = fp.read()
+    with open(journal_file, "wb") as fp:
+        fp.write(contents[:-5])
+    d = load_dictionary(str(dict_file), threaded_save=False, journal=True)
+    assert dict(d.items()) == {("TEFT",): "test", ("TEFTS",): "tests"}
+
+
+def test_leftover_journal(tmp_path):
+    dict_file = tmp_path / "dict.json"
+    dict_file.write_text(json.dumps({"TEFT": "test"}))
+    d = load_dictionary(str(dict_file), threaded_save=False, journal=True)
+    d[("TEFTS",)] = "tests"
+    d.save()
+    # With journaling disabled, a leftover journal is still folded in.
+    d = load_dictionary(str(dict_file), threaded_save=False)
+    assert d.journal is None
+    assert dict(d.items()) == {("TEFT",): "test", ("TEFTS",): "tests"}
+    assert not os.path.exists(journal_filename(str(dict_file)))
+    assert read_json(dict_file) == {"TEFT": "test", "TEFTS": "tests"}
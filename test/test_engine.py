@@ -1,6 +1,7 @@
 from functools import partial
 import os
 import tempfile
+import threading
 
 import pytest
 
@@ -19,6 +20,7 @@ from plover.oslayer.controller import Controller
 from plover.output import Output
 from plover.registry import Registry
 from plover.steno_dictionary import StenoDictionaryCollection
+from plover.suggestions import Suggestion
 
 from plover_build_utils.testing import make_dict
 
@@ -178,7 +180,10 @@ def test_engine_lifecycle(engine):
 def test_loading_dictionaries(tmp_path, engine):
     def check_loaded_events(actual_events, expected_events):
         filtered_events = [
-            event for event in actual_events if event[0] != "dictionary_state_changed"
+            event
+            for event in actual_events
+            if event[0]
+            not in {"dictionary_state_changed", "dictionary_loading_progress"}
         ]
         assert len(filtered_events) == len(expected_events)
         for n, event in enumerate(filtered_events):
@@ -295,3 +300,148 @@ def test_engine_running_state(engine):
 
 def test_undo_and_clear_empty_translator_state(engine):
     engine.clear_translator_state(undo=True)
+
+
+def test_search_translations(tmp_path, engine):
+    with make_dict(
+        tmp_path, b'{"TEFT": "test", "TEFTS": "tests", "TOEFT": "toast"}', "json"
+    ) as dict_path:
+        dict_path = normalize_path(str(dict_path))
+        engine.start()
+        engine.config = {"dictionaries": [DictionaryConfig(dict_path)]}
+        assert engine._translation_index.wait(5)
+        assert engine.search_translations("test") == ["test", "tests"]
+        assert engine.search_translations("tst", mode="fuzzy") == ["test"]
+        engine.add_translation(("TEFTD",), "tested")
+        assert engine.search_translations("test", mode="prefix") == [
+            "test",
+            "tests",
+            "tested",
+        ]
+
+
+def test_lookup_cache(tmp_path, engine):
+    with make_dict(
+        tmp_path, b'{"TEFT": "test", "TEFTS": "tests"}', "json"
+    ) as dict_path:
+        dict_path = normalize_path(str(dict_path))
+        engine.start()
+        engine.config = {"dictionaries": [DictionaryConfig(dict_path)]}
+        assert engine.lookup(("TEFT",)) == "test"
+        assert engine.reverse_lookup("test") == {("TEFT",)}
+        assert engine.casereverse_lookup("test") == {"test"}
+        # Cached results are not shared with callers.
+        engine.reverse_lookup("test").add(("TEFTD",))
+        assert engine.reverse_lookup("test") == {("TEFT",)}
+        # Changes are taken into account.
+        engine.add_translation(("TEFT",), "Test")
+        assert engine.lookup(("TEFT",)) == "Test"
+        assert engine.reverse_lookup("test") == set()
+        assert engine.casereverse_lookup("test") == {"Test"}
+        engine.add_dictionary_filter(lambda key, value: value == "Test")
+        assert engine.lookup(("TEFT",)) is None
+        assert engine.raw_lookup(("TEFT",)) == "Test"
+        engine.dictionaries[dict_path].enabled = False
+        assert engine.raw_lookup(("TEFT",)) is None
+        assert engine.casereverse_lookup("test") == set()
+
+
+def test_lock_free_reads(tmp_path, engine):
+    with make_dict(tmp_path, b'{"TEFT": "test"}', "json") as dict_path:
+        dict_path = normalize_path(str(dict_path))
+        engine.start()
+        engine.config = {"dictionaries": [DictionaryConfig(dict_path)]}
+        locked = threading.Event()
+        release = threading.Event()
+
+        def busy_engine():
+            with engine:
+                locked.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=busy_engine)
+        thread.start()
+        try:
+            assert locked.wait(5)
+            # Queries must not wait on the engine.
+            assert engine.lookup(("TEFT",)) == "test"
+            assert engine.reverse_lookup("test") == {("TEFT",)}
+            assert engine.casereverse_lookup("test") == {"test"}
+            assert engine.get_suggestions("test") == [Suggestion("test", [("TEFT",)])]
+            assert [d.path for d in engine.config["dictionaries"]] == [dict_path]
+            assert engine["undo_levels"] == engine.config["undo_levels"]
+            assert engine.dictionaries[dict_path].enabled
+            assert thread.is_alive()
+        finally:
+            release.set()
+            thread.join()
+        # A query is retried if the dictionaries change in the meantime.
+        calls = []
+
+        def query():
+            calls.append(engine.dictionaries.generation)
+            if len(calls) == 1:
+                engine.dictionaries[dict_path][("TEFTD",)] = "tested"
+            return engine.dictionaries.lookup(("TEFTD",))
+
+        assert engine._read(query) == "tested"
+        assert len(calls) == 2
+        # Or if it fails because of a concurrent change
+        # (e.g. on inconsistent data).
+        calls = []
+
+        def failing_query():
+            calls.append(engine.dictionaries.generation)
+            if len(calls) == 1:
+                engine.dictionaries[dict_path][("TEFTD",)] = "tested"
+                raise IndexError()
+            return engine.dictionaries.lookup(("TEFTD",))
+
+        assert engine._read(failing_query) == "tested"
+        assert len(calls) == 2
+        # Other errors are raised immediately.
+        for change in (False, True):
+            calls = []
+
+            def buggy_query():
+                calls.append(engine.dictionaries.generation)
+                if change:
+                    engine.dictionaries[dict_path][("TEFTD",)] = "tested"
+                    raise TypeError()
+                raise IndexError()
+
+            with pytest.raises(TypeError if change else IndexError):
+                engine._read(buggy_query)
+            assert len(calls) == 1
+        # Queries made while a change is in progress wait for it.
+        results = []
+
+        class RacyDict(dict):
+            def __setitem__(self, key, value):
+                super().__setitem__(key, value)
+                reader.start()
+                reader.join(0.1)
+                results.append(reader.is_alive())
+
+        reader = threading.Thread(
+            target=lambda: results.append(engine.lookup(("TEFTS",)))
+        )
+        d = engine.dictionaries[dict_path]
+        d._dict = RacyDict(d._dict)
+        with engine:
+            d[("TEFTS",)] = "tests"
+        reader.join()
+        assert results == [True, "tests"]
+        assert engine.lookup(("TEFTS",)) == "tests"
+
+
+def test_config_snapshot(engine):
+    dictionaries = engine.config["dictionaries"]
+    # Readers get their own copy of the configuration values.
+    config = engine.config
+    config["dictionaries"].append(DictionaryConfig("foobar.json"))
+    config["enabled_extensions"].add("foobar")
+    assert engine["dictionaries"] == dictionaries
+    engine["dictionaries"].clear()
+    assert engine.config["dictionaries"] == dictionaries
+    assert "foobar" not in engine["enabled_extensions"]
@@ -3,6 +3,7 @@
 
 """Unit tests for formatting.py."""
 
+from os.path import commonprefix
 import inspect
 
 import pytest
@@ -293,6 +294,32 @@ def test_action():
     assert action(word="test") != action(word="test", next_attach=True)
     assert action(text="test") == action(text="test")
     assert action(text="test", word="test").copy_state() == action(word="test")
+    a = action(
+        prev_attach=True,
+        prev_replace="x",
+        text="test",
+        word="test",
+        next_attach=True,
+        next_case=Case.UPPER,
+        space_char="-",
+        trailing_space="-",
+    )
+    assert a.new_state() == action(prev_attach=True, space_char="-", trailing_space="-")
+    assert a.copy_state() == action(
+        prev_attach=True,
+        word="test",
+        word_is_finished=False,
+        next_attach=True,
+        next_case=Case.UPPER,
+        space_char="-",
+        trailing_space="-",
+    )
+    assert str(action(text="test", word="test")) == "Action(text='test', word='test')"
+    look_ahead = formatting._LookAheadAction("a", action(text="a"), action(text="b"))
+    assert look_ahead != look_ahead.action
+    assert look_ahead == formatting._LookAheadAction(
+        "a", action(text="a"), action(text="b")
+    )
 
 
 TRANSLATION_TO_ACTIONS_TESTS = (
@@ -1481,6 +1508,16 @@ OUTPUT_OPTIMISATION_TESTS = (
         ],
         [("c", "a"), ("c", "b")],
     ),
+    # Change in the middle.
+    lambda: (
+        [
+            translation(english="Luca e mela{^s}"),
+        ],
+        [
+            translation(english="Luca e pera{^s}"),
+        ],
+        [("s", " Luca e melas"), ("b", 5), ("s", "peras")],
+    ),
 )
 
 
@@ -1494,6 +1531,21 @@ def test_output_optimization(undo, do, expected_instructions):
     assert output.instructions == expected_instructions
 
 
+def test_common_prefix_length():
+    for a, b in (
+        ("", ""),
+        ("", "abc"),
+        ("abc", "abc"),
+        ("abc", "abcd"),
+        ("abcdef", "abxdef"),
+        ("a", "b"),
+        ("x" * 1000 + "a", "x" * 1000 + "b"),
+        ("x" * 999 + "a", "x" * 1000),
+    ):
+        assert formatting._common_prefix_length(a, b) == len(commonprefix([a, b]))
+        assert formatting._common_prefix_length(b, a) == len(commonprefix([a, b]))
+
+
 class TestRetroFormatter:
     def setup_method(self):
         self.formatter = formatting.Formatter()
@@ -1553,6 +1605,11 @@ class TestRetroFormatter:
         lambda: (False, ["Luca, mela."], ["mela.", "Luca, "]),
         lambda: (False, ["Luca{-|}mela"], ["Mela", "Luca "]),
         lambda: (True, ["Luca{-|}mela"], ["Mela", "Luca "]),
+        lambda: (
+            False,
+            ["Luca{^ ^}", "{^mela}", "{^\t^}", "{^pera}"],
+            ["pera", "mela\t", "Luca "],
+        ),
     )
 
     @parametrize(ITER_LAST_FRAGMENTS_TESTS)
@@ -1585,6 +1642,8 @@ class TestRetroFormatter:
         lambda: (False, ["Luca{-|}mela"], 12, "Luca Mela"),
         lambda: (False, ["Luca{-|}mela"], 20, "Luca Mela"),
         lambda: (True, ["Luca{-|}mela"], 6, "a Mela"),
+        lambda: (False, ["{^ ^}Luca"], 5, "Luca"),
+        lambda: (False, ["Luca{^ ^}", "{^mela}", "{^\t^}", "{^pera}"], 6, "a\tpera"),
     )
 
     @parametrize(LAST_TEXT_TESTS)
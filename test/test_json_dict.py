@@ -4,7 +4,12 @@
 
 """Unit tests for json.py."""
 
-from plover.dictionary.json_dict import JsonDictionary
+import json
+
+import pytest
+
+from plover.dictionary.base import load_dictionary
+from plover.dictionary.json_dict import JsonDictionary, _iter_object
 
 from plover_build_utils.testing import dictionary_test
 
@@ -30,6 +35,16 @@ JSON_LOAD_TESTS = (
     lambda: json_load_test('"foo"', ValueError),
     # Ditto.
     lambda: json_load_test("4.2", TypeError),
+    # Truncated.
+    lambda: json_load_test('{"S": "a", "T"', ValueError),
+    # Trailing garbage.
+    lambda: json_load_test('{"S": "a"} {}', ValueError),
+    # Invalid translations.
+    lambda: json_load_test('{"S": "a", "T": null}', ValueError),
+    lambda: json_load_test('{"S": 42}', ValueError),
+    lambda: json_load_test('{"S": ["a"]}', ValueError),
+    # Duplicate keys: last one wins.
+    lambda: json_load_test('{"S": "a", "T": "b", "S": "c"}', '"S": "c", "T": "b"'),
 )
 
 
@@ -86,3 +101,80 @@ class TestJsonDictionary:
     DICT_LOAD_TESTS = JSON_LOAD_TESTS
     DICT_SAVE_TESTS = JSON_SAVE_TESTS
     DICT_SAMPLE = b"{}"
+
+
+ITER_OBJECT_TESTS = (
+    "{}",
+    ' \n{ "S": "a" }\n ',
+    '{"S/T": "{^\\"\\u00e9\\ud83d\\ude00\\n^}", "-T": "caf\u00e9", "S": "s"}',
+    '{"S": 42, "T": -1.5e3, "P": true, "H": null, "R": [1, {"A": "b"}], "O": {}}',
+    '{"S": "a",}',
+    '{"S": "a" "T": "b"}',
+    '{"S" "a"}',
+    '{"S": }',
+    '{"S": "a"',
+    '{"S": "a"}}',
+    '{"S": "a\\x"}',
+    '{"S": 12a}',
+)
+
+
+@pytest.mark.parametrize("document", ITER_OBJECT_TESTS)
+def test_iter_object(document):
+    try:
+        expected = json.loads(document)
+    except ValueError:
+        expected = ValueError
+    # Feed the parser with chunks of all sizes, to
+    # check tokens split across chunks are handled.
+    for chunk_size in range(1, len(document) + 1):
+        chunks = [
+            document[n : n + chunk_size] for n in range(0, len(document), chunk_size)
+        ]
+        if expected is ValueError:
+            with pytest.raises(ValueError):
+                list(_iter_object(chunks))
+        else:
+            assert dict(_iter_object(chunks)) == expected
+
+
+def test_load_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr("plover.dictionary.json_dict._CHUNK_SIZE", 64)
+    dict_file = tmp_path / "dict.json"
+    dict_file.write_text(json.dumps({"S" * n: str(n) for n in range(1, 40)}))
+    progress = []
+    d = JsonDictionary.load(str(dict_file), progress=progress.append)
+    assert len(d) == 39
+    assert len(progress) > 10
+    assert progress == sorted(progress)
+    assert progress[-1] == 1.0
+
+
+def test_load_error_position(tmp_path, monkeypatch):
+    monkeypatch.setattr("plover.dictionary.json_dict._CHUNK_SIZE", 64)
+    dict_file = tmp_path / "dict.json"
+    document = "{\n" + "".join('"S%u": "%u",\n' % (n, n) for n in range(40)) + "}\n"
+    dict_file.write_text(document)
+    with pytest.raises(ValueError) as expected:
+        json.loads(document)
+    with pytest.raises(ValueError) as exc_info:
+        JsonDictionary.load(str(dict_file))
+    assert str(exc_info.value) == str(expected.value)
+    assert "line 42" in str(exc_info.value)
+
+
+@pytest.mark.parametrize("compact", (False, True))
+def test_load_latin1_after_entries(tmp_path, monkeypatch, compact):
+    monkeypatch.setattr("plover.dictionary.json_dict._CHUNK_SIZE", 64)
+    dict_file = tmp_path / "dict.json"
+    entries = {"/".join("S" * n): str(n) for n in range(1, 20)}
+    # Valid UTF-8 ("\xe9"), but decoded differently as latin-1.
+    entries["\xc3\xa9"] = "A"
+    entries.update({"/".join("T" * n): str(n) for n in range(1, 20)})
+    # Not valid UTF-8, several chunks in.
+    entries["TK"] = "caf\xe9"
+    document = json.dumps(entries, ensure_ascii=False)
+    dict_file.write_bytes(document.encode("latin-1"))
+    d = load_dictionary(str(dict_file), threaded_save=False, compact=compact)
+    assert dict(d.items()) == {tuple(k.split("/")): v for k, v in entries.items()}
+    assert d.reverse_lookup("A") == {("\xc3\xa9",)}
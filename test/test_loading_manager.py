@@ -17,6 +17,13 @@ class FakeDictionaryContents:
     def __init__(self, contents, timestamp):
         self.contents = contents
         self.timestamp = timestamp
+        self.flush_count = 0
+
+    def save(self):
+        pass
+
+    def flush(self):
+        self.flush_count += 1
 
     def __eq__(self, other):
         if isinstance(other, FakeDictionaryContents):
@@ -39,7 +46,17 @@ class MockLoader:
         self.files = files
         self.load_counts = defaultdict(int)
 
-    def __call__(self, filename):
+    def __call__(
+        self,
+        filename,
+        compact=False,
+        reverse_indexes="eager",
+        cache_dir=None,
+        progress=None,
+        parser=None,
+        journal=False,
+        save_delay=0,
+    ):
         self.load_counts[filename] += 1
         d = self.files[filename]
         if isinstance(d.contents, Exception):
@@ -114,3 +131,99 @@ def test_loading(monkeypatch):
     manager.unload_outdated()
     assert len(manager) == 0
     assert df("c") not in manager
+
+
+@pytest.mark.parametrize("loader", loading_manager.LOADERS)
+def test_loaders(tmp_path, loader):
+    filenames = []
+    for n in range(4):
+        filename = tmp_path / ("dict%u.json" % n)
+        filename.write_text('{"TEFT": "test %u", "TEFT/-G": "testing"}' % n)
+        filenames.append(str(filename))
+    filenames.append(str(tmp_path / "missing.json"))
+    states = []
+    manager = loading_manager.DictionaryLoadingManager(
+        lambda filename, d: states.append((filename, d))
+    )
+    manager.loader = loader
+    manager.workers = 2
+    manager.compact = True
+    results = manager.load(filenames)
+    for n, d in enumerate(results[:-1]):
+        assert d.path == filenames[n]
+        assert dict(d.items()) == {("TEFT",): "test %u" % n, ("TEFT", "-G"): "testing"}
+        assert d.timestamp == os.path.getmtime(filenames[n])
+        assert (filenames[n], d) in states
+    assert isinstance(results[-1], ErroredDictionary)
+    assert (filenames[-1], results[-1]) in states
+    # Workers are shut down on close.
+    executors = [e for e in manager._get_executors() if e is not None]
+    manager.close()
+    for executor in executors:
+        with pytest.raises(RuntimeError):
+            executor.submit(print)
+
+
+def test_loading_progress(monkeypatch, tmp_path):
+    filename = tmp_path / "dict.json"
+    filename.write_text("{}")
+    filename = str(filename)
+
+    def loader(filename, progress=None, **kwargs):
+        assert progress is not None
+        progress(0.5)
+        return FakeDictionaryContents("contents", None)
+
+    monkeypatch.setattr("plover.dictionary.loading_manager.load_dictionary", loader)
+    states = []
+    progress = []
+    manager = loading_manager.DictionaryLoadingManager(
+        lambda filename, d: states.append((filename, d)),
+        lambda filename, p: progress.append((filename, p)),
+    )
+    assert manager.load([filename]) == ["contents"]
+    # Progress is only reported through its own callback.
+    assert progress == [(filename, 0.5)]
+    assert states == [(filename, "contents")]
+
+
+@pytest.mark.parametrize(
+    "setting, value",
+    (
+        ("compact", True),
+        ("reverse_indexes", "lazy"),
+        ("cache_dir", "cache"),
+        ("journal", True),
+    ),
+)
+def test_settings_change(monkeypatch, setting, value):
+    d = FakeDictionaryInfo("a", "aaaaa")
+    loader = MockLoader({d.tf.name: d})
+    monkeypatch.setattr("plover.dictionary.loading_manager.load_dictionary", loader)
+    manager = loading_manager.DictionaryLoadingManager(lambda filename, result: None)
+    manager.load([d.tf.name])
+    manager.load([d.tf.name])
+    assert loader.load_counts[d.tf.name] == 1
+    # Changing a loading setting reloads the dictionary.
+    result = manager[d.tf.name]
+    setattr(manager, setting, value)
+    manager.unload_outdated()
+    assert d.tf.name not in manager
+    # Pending changes are saved first.
+    assert result.flush_count == 1
+    assert manager.load([d.tf.name]) == ["aaaaa"]
+    assert loader.load_counts[d.tf.name] == 2
+
+
+def test_save_delay_change(tmp_path):
+    filename = tmp_path / "dict.json"
+    filename.write_text('{"TEFT": "test"}')
+    filename = str(filename)
+    manager = loading_manager.DictionaryLoadingManager(lambda filename, d: None)
+    manager.save_delay = 1
+    (d,) = manager.load([filename])
+    assert d.save.delay == 1
+    # No need to reload, the loaded dictionaries are updated.
+    manager.save_delay = 2
+    assert manager.load([filename]) == [d]
+    assert d.save.delay == 2
@@ -1,7 +1,10 @@
 # Copyright (c) 2013 Hesky Fisher
 # See LICENSE.txt for details.
 
-from plover.orthography import add_suffix
+import re
+
+from plover import system
+from plover.orthography import Orthography, add_suffix
 
 from plover_build_utils.testing import parametrize
 
@@ -149,3 +152,55 @@ ADD_SUFFIX_TESTS = (
 @parametrize(ADD_SUFFIX_TESTS)
 def test_add_suffix(word, suffix, expected):
     assert add_suffix(word, suffix) == expected
+
+
+def test_orthography():
+    rules = [
+        (re.compile(r"^(.+[bcdfghjklmnpqrstvwxz])y \^ s$", re.I), r"\1ies"),
+        (re.compile(r"^(.+)e \^ ([aeiouy].*)$", re.I), r"\1\2"),
+        # Not indexable by suffix.
+        (re.compile(r"^(.*)x \^ (?<=\^ )y$", re.I), r"\1z"),
+    ]
+    orthography = Orthography(rules, {"able": "ible"}, {"sensible": 1})
+    assert orthography.add_suffixes(["cherry", "day", "box"], "s") == [
+        "cherries",
+        "days",
+        "boxs",
+    ]
+    assert orthography.add_suffixes(["make", "sense", "box"], "able") == [
+        "makable",
+        "sensible",
+        "boxable",
+    ]
+    assert orthography.add_suffix("box", "y") == "boz"
+    assert orthography.add_suffix("make", "ing foo") == "making foo"
+
+
+def test_orthography_follows_system(monkeypatch):
+    monkeypatch.setattr(system, "ORTHOGRAPHY_RULES", [])
+    assert add_suffix("cherry", "s") == "cherrys"
+    rules = [(re.compile(r"^(.+)y \^ s$", re.I), r"\1ies")]
+    monkeypatch.setattr(system, "ORTHOGRAPHY_RULES", rules)
+    assert add_suffix("cherry", "s") == "cherries"
+
+
+def test_orthography_suffix_rules():
+    rules = system.ORTHOGRAPHY_RULES
+    orthography = Orthography(rules, {}, {})
+    # The system rules can be indexed by suffix.
+    assert all(f is not None for f in orthography._suffix_filters)
+    s_rules = orthography._suffix_rules("s")
+    assert 0 < len(s_rules) < len(rules)
+    assert set(s_rules) < set(rules)
+    # Both escaped forms of the separator are handled,
+    # but not rules the suffix pattern cannot be split from.
+    for pattern, indexable in (
+        (r"^(.+)y \^ s$", True),
+        (re.escape("y ^ ") + "s$", True),
+        (r"^(.+)y \^ (?<=y \^ )s$", False),
+        (r"^(.+)(y) \^ \2s$", False),
+        (r"^a \^ s$|^b \^ es$", False),
+        (r"^(.+)y\^s$", False),
+    ):
+        orthography = Orthography([(re.compile(pattern), "")], {}, {})
+        assert (orthography._suffix_filters[0] is not None) == indexable
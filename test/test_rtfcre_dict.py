@@ -1,13 +1,14 @@
 # Copyright (c) 2013 Hesky Fisher
 # See LICENSE.txt for details.
 
+import re
 import textwrap
 
 import pytest
 
 from plover import __version__ as plover_version
 from plover.dictionary.rtfcre_dict import RtfDictionary, TranslationFormatter
-from plover.dictionary.rtfcre_parse import BadRtfError
+from plover.dictionary.rtfcre_parse import BadRtfError, RtfParseError, parse_rtfcre
 
 from plover_build_utils.testing import dictionary_test, parametrize
 
@@ -548,3 +549,60 @@ class TestRtfDictionary:
             + ["}", contents, "}", ""]
         )
         return rtf.encode("cp1252")
+
+
+@pytest.mark.parametrize(
+    "rtf, entries, error",
+    (
+        (
+            "{\\rtf1\\ansi\r\n{\\*\\cxs A}a\r\n{\\*\\cxs B}{\\cxp .}\r\n"
+            "{\\*\\cxs C}\\cxfing {\\*\\cxs D}d\r\n}",
+            [("A", "a"), ("B", "{.}"), ("C", ""), ("D", "d")],
+            "line 4, column 19: expected text, got: '{'",
+        ),
+        (
+            "{\\rtf1\\ansi\r\n{\\*\\cxs A}a\r\n{\\*\\cxs B}{\\b b\r\n"
+            "{\\*\\cxs C}c\r\n{\\*\\cxs D}d\r\n}",
+            [("A", "a"), ("B", "b"), ("C", "c"), ("D", "d")],
+            "line 4, column 4: starting new mapping, but previous is unfinished",
+        ),
+        (
+            "{\\rtf1\\ansi\r\n{\\*\\cxs A}\xe9\r\n{\\*\\cxs B}b}\r\n{\\*\\cxs C}c\r\n}",
+            [("A", "\xe9"), ("B", "b"), ("C", "c")],
+            "line 4, column 1: expected end of file, got: '{'",
+        ),
+    ),
+)
+def test_parse_errors(rtf, entries, error):
+    # Check simple mappings (parsed without the tokenizer) are
+    # correctly handled around errors, and positions reported.
+    assert list(parse_rtfcre(rtf)) == entries
+    with pytest.raises(RtfParseError) as exc_info:
+        list(parse_rtfcre(rtf, skip_errors=False))
+    assert str(exc_info.value) == error
+
+
+@pytest.mark.parametrize(
+    "rtf",
+    (
+        # Escaped brace before a simple mapping.
+        "{\\rtf1\\cxds \r\n{\\*\\cxs S} wordword\\par\r\n\\{\\*\\cxs T}}",
+        "{\\rtf1\\ansi\r\n{\\*\\cxs A}a\\\\\\{\\*\\cxs B}b\r\n{\\*\\cxs C}c}\r\n}",
+        # Escaped backslash: not an escaped brace.
+        "{\\rtf1\\ansi\r\n{\\*\\cxs A}a\\\\{\\*\\cxs B}b\r\n{\\*\\cxs C}c}\r\n}",
+    ),
+)
+def test_parse_errors_same_as_full_parser(rtf, caplog, monkeypatch):
+    def parse():
+        caplog.clear()
+        entries = list(parse_rtfcre(rtf))
+        return entries, [record.getMessage() for record in caplog.records]
+
+    result = parse()
+    # Disable simple mappings handling.
+    monkeypatch.setattr(
+        "plover.dictionary.rtfcre_parse.SIMPLE_ENTRY_RX", re.compile(r"(?!)")
+    )
+    expected = parse()
+    assert expected[1]
+    assert result == expected
@@ -0,0 +1,142 @@
+"""Unit tests for search.py."""
+
+import pytest
+
+from plover.search import FUZZY, PREFIX, SUBSTRING, TranslationIndex, edit_distance
+from plover.steno_dictionary import StenoDictionary
+
+
+@pytest.mark.parametrize(
+    "a, b, max_distance, distance",
+    (
+        ("", "", 1, 0),
+        ("test", "test", 1, 0),
+        ("test", "tests", 1, 1),
+        ("test", "tset", 2, 2),
+        ("test", "toast", 2, 2),
+        ("test", "toast", 1, 2),
+        ("kitten", "sitting", 3, 3),
+        ("kitten", "sitting", 2, 3),
+        ("", "abc", 1, 2),
+    ),
+)
+def test_edit_distance(a, b, max_distance, distance):
+    assert edit_distance(a, b, max_distance) == distance
+    assert edit_distance(b, a, max_distance) == distance
+
+
+def _index(*dicts):
+    index = TranslationIndex()
+    index.update(dicts)
+    assert index.wait(5)
+    return index
+
+
+def _dictionary(*translations):
+    d = StenoDictionary()
+    d.update((("S-%u" % n,), t) for n, t in enumerate(translations))
+    return d
+
+
+def test_search():
+    d1 = _dictionary("test", "testing", "Test", "contest", "{^test}", "the test")
+    d2 = _dictionary("tests", "toast", "tent", "attest", "test")
+    index = _index(d1, d2)
+    assert index.search("test", PREFIX) == ["test", "Test", "tests", "testing"]
+    assert index.search("TEST", SUBSTRING) == [
+        "Test",
+        "test",
+        "tests",
+        "testing",
+        "{^test}",
+        "the test",
+        "attest",
+        "contest",
+    ]
+    assert index.search("test", SUBSTRING, limit=3) == ["test", "Test", "tests"]
+    assert index.search("tes", FUZZY) == ["Test", "test"]
+    assert index.search("test", FUZZY) == ["test", "Test", "tent", "tests"]
+    assert index.search("tset", FUZZY) == []
+    assert index.search("tset", FUZZY, max_distance=2) == ["Test", "tent", "test"]
+    assert index.search("t", SUBSTRING, limit=None) == [
+        "Test",
+        "tent",
+        "test",
+        "tests",
+        "toast",
+        "testing",
+        "the test",
+        "{^test}",
+        "attest",
+        "contest",
+    ]
+    assert index.search("", SUBSTRING) == []
+    assert index.search("foo", SUBSTRING) == []
+    with pytest.raises(ValueError):
+        index.search("test", "regexp")
+
+
+def test_search_changes():
+    d1 = _dictionary("test", "testing")
+    d2 = _dictionary("tests")
+    index = _index(d1, d2)
+    assert index.search("test") == ["test", "tests", "testing"]
+    # Added translations are immediately available.
+    d2[("TEFTD",)] = "tested"
+    assert index.search("test") == ["test", "tests", "tested", "testing"]
+    # And removed ones are ignored.
+    del d1[("S-1",)]
+    d2[("S-0",)] = "toast"
+    assert index.search("test") == ["test", "tested"]
+    # Same after a rebuild.
+    d2.enabled = False
+    assert index.wait(5)
+    assert index.search("test") == ["test"]
+    d2.enabled = True
+    assert index.wait(5)
+    assert index.search("test") == ["test", "tested"]
+    assert index.search("toast") == ["toast"]
+    # Switching to other dictionaries.
+    index.update([d2])
+    assert index.wait(5)
+    assert index.search("test") == ["tested"]
+    d1[("TEFT",)] = "tester"
+    assert index.search("test") == ["tested"]
+
+
+def test_search_without_reverse_indexes():
+    d = _dictionary("test", "testing")
+    index = _index(d)
+    index.update([d])
+    assert index.wait(5)
+    assert len(d._observers) == 1
+    # Adding translations does not require the reverse indexes.
+    d[("TEFTS",)] = "tests"
+    assert index.search("test") == ["test", "tests", "testing"]
+    assert d._reverse is None
+    # Neither does removing some.
+    d[("S-1",)] = "toast"
+    assert not index._maybe_removed
+    assert index.search("test") == ["test", "tests"]
+    assert index.search("toast") == ["toast"]
+    # Translations still used by other entries are kept.
+    d[("TEFT",)] = "test"
+    del d[("S-0",)]
+    assert index.search("test") == ["test", "tests"]
+    # Or rebuilding the index.
+    d.enabled = False
+    assert index.search("test") == []
+    d.enabled = True
+    assert index.search("test") == ["test", "tests"]
+    assert d._reverse is None
+
+
+def test_search_lazy_build():
+    d = _dictionary("test", "testing")
+    index = _index(d)
+    # Not built until searched.
+    assert index._builder is None
+    assert index._index.texts == []
+    d[("TEFTS",)] = "tests"
+    assert index.search("test") == ["test", "tests", "testing"]
+    assert index._index.texts == ["test", "testing", "tests"]
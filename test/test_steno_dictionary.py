@@ -3,8 +3,13 @@
 
 """Unit tests for steno_dictionary.py."""
 
+import random
+import threading
+import time
+
 import pytest
 
+from plover.dictionary.compact import CompactStenoDictionary
 from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
 
 from plover_build_utils.testing import dictionary_test
@@ -151,6 +156,27 @@ def test_dictionary_collection_longest_key():
     assert dc.longest_key == 0
 
 
+def test_dictionary_collection_longest_key_cache():
+    d = StenoDictionary()
+    d[("S", "T")] = "a"
+    dc = StenoDictionaryCollection([d])
+    # Cached, even without a merged index.
+    assert dc.longest_key == 2
+    assert dc._longest_key == 2
+    d[("S", "T", "R")] = "b"
+    assert dc._longest_key is None
+    assert dc.longest_key == 3
+
+    # Changes to custom dictionaries cannot be tracked.
+    class CustomDictionary(StenoDictionary):
+        def get(self, key, fallback=None):
+            return self._dict.get(key, fallback)
+
+    dc.set_dicts([CustomDictionary(), d])
+    assert dc.longest_key == 3
+    assert dc._longest_key is None
+
+
 def test_casereverse_lookup():
     dc = StenoDictionaryCollection()
 
@@ -201,6 +227,301 @@ def test_reverse_lookup():
     assert dc.reverse_lookup("beautiful") == {("PW-FL",), ("PWAOUFL",)}
 
 
+def test_reverse_lookup_changes():
+    d1 = StenoDictionary()
+    d1[("WAOUFL",)] = "not beautiful"
+    d2 = StenoDictionary()
+    d2[("PWAOUFL",)] = "beautiful"
+    d2[("WAOUFL",)] = "beautiful"
+    dc = StenoDictionaryCollection([d1, d2])
+    assert dc.reverse_lookup("beautiful") == {("PWAOUFL",)}
+    assert dc._owners == {("WAOUFL",): 0}
+    # The outlines owners are updated on changes.
+    del d1[("WAOUFL",)]
+    assert dc.reverse_lookup("beautiful") == {("PWAOUFL",), ("WAOUFL",)}
+    d1[("PWAOUFL",)] = "{plover:deleted}"
+    assert dc.reverse_lookup("beautiful") == {("WAOUFL",)}
+    assert dc._owners == {("PWAOUFL",): 0}
+    d1.enabled = False
+    assert dc.reverse_lookup("beautiful") == {("PWAOUFL",), ("WAOUFL",)}
+    assert dc._owners == {}
+    d1.enabled = True
+    d2[("PW-FL",)] = "beautiful"
+    assert dc.reverse_lookup("beautiful") == {("PW-FL",), ("WAOUFL",)}
+    dc.set_dicts([d2, d1])
+    assert dc.reverse_lookup("beautiful") == {("PW-FL",), ("PWAOUFL",), ("WAOUFL",)}
+    assert dc._owners == {("PWAOUFL",): 0}
+
+
+def test_reverse_lookup_custom_storage():
+    class CustomDictionary(StenoDictionary):
+        def get(self, key, fallback=None):
+            return "custom" if key == ("WAOUFL",) else fallback
+
+        def reverse_lookup(self, value):
+            return {("WAOUFL",)} if value == "custom" else set()
+
+    d1 = CustomDictionary()
+    d1._longest_key = 1
+    d2 = StenoDictionary()
+    d2[("PWAOUFL",)] = "beautiful"
+    d2[("WAOUFL",)] = "beautiful"
+    dc = StenoDictionaryCollection([d1, d2])
+    # Not all dictionaries can be indexed: use normal lookups.
+    assert dc.reverse_lookup("beautiful") == {("PWAOUFL",)}
+    assert dc._owners is None
+
+
+def test_generation():
+    d1 = StenoDictionary()
+    d2 = StenoDictionary()
+    dc = StenoDictionaryCollection([d1])
+    generations = [dc.generation]
+
+    def check_changed():
+        assert dc.generation not in generations
+        assert dc.generation % 2 == 0
+        generations.append(dc.generation)
+
+    d1[("TEFT",)] = "test"
+    check_changed()
+    del d1[("TEFT",)]
+    check_changed()
+    d1.update({("TEFT",): "test"})
+    check_changed()
+    d1.enabled = False
+    check_changed()
+    dc.set_dicts([d1, d2])
+    check_changed()
+    d2[("TEFT",)] = "test"
+    check_changed()
+    f = lambda key, value: False
+    dc.add_filter(f)
+    check_changed()
+    dc.remove_filter(f)
+    check_changed()
+    # The generation is odd while a change is in progress.
+    in_progress = []
+
+    class RecordingDict(dict):
+        def __setitem__(self, key, value):
+            in_progress.append(dc.generation)
+            super().__setitem__(key, value)
+
+    d2._dict = RecordingDict(d2._dict)
+    d2[("TEFT",)] = "Test"
+    assert len(in_progress) == 1
+    assert in_progress[0] % 2 == 1
+    check_changed()
+    # No change.
+    d1.enabled = False
+    assert dc.generation == generations[-1]
+    # Changes to removed dictionaries don't matter.
+    dc.set_dicts([d2])
+    check_changed()
+    d1.clear()
+    assert dc.generation == generations[-1]
+
+    # Changes to custom dictionaries cannot be tracked.
+    class CustomDictionary(StenoDictionary):
+        def get(self, key, fallback=None):
+            return fallback
+
+    dc.set_dicts([CustomDictionary(), d2])
+    assert dc.generation is None
+
+
+def test_lazy_reverse_indexes():
+    d = StenoDictionary()
+    d.update({("PWAOUFL",): "beautiful", ("PW-FL",): "Beautiful"})
+    # Not built until needed.
+    assert d._reverse is None
+    assert d.reverse_lookup("beautiful") == {("PWAOUFL",)}
+    assert d.casereverse_lookup("beautiful") == {"beautiful", "Beautiful"}
+    # Then updated on changes.
+    d[("WAOUFL",)] = "beautiful"
+    del d[("PW-FL",)]
+    assert d.reverse_lookup("beautiful") == {("PWAOUFL",), ("WAOUFL",)}
+    assert d.casereverse_lookup("beautiful") == {"beautiful"}
+    assert d.reverse == {"beautiful": [("PWAOUFL",), ("WAOUFL",)], "Beautiful": []}
+    d.clear()
+    assert d.reverse_lookup("beautiful") == set()
+
+
+def test_build_reverse_indexes_concurrently():
+    d = StenoDictionary()
+    d.update({("S", str(n)): "value %u" % (n % 10) for n in range(20000)})
+    builder = threading.Thread(target=d.build_reverse_indexes)
+    builder.start()
+    # Changes made while the indexes are being built must not be lost.
+    for n in range(1000):
+        d[("T", str(n))] = "value %u" % (n % 10)
+        del d[("S", str(n))]
+    builder.join()
+    for n in range(10):
+        value = "value %u" % n
+        expected = {k for k, v in d.items() if v == value}
+        assert d.reverse_lookup(value) == expected
+        assert d.casereverse_lookup(value) == {value}
+
+
+def test_build_reverse_indexes_during_change():
+    builders = []
+
+    class RacyDict(dict):
+        def __setitem__(self, key, value):
+            super().__setitem__(key, value)
+            # Build the indexes in the middle of the change.
+            builder = threading.Thread(target=d.build_reverse_indexes)
+            builder.start()
+            builders.append(builder)
+            time.sleep(0.01)
+
+    d = StenoDictionary()
+    d.update({("S", str(n)): "value" for n in range(1000)})
+    d._dict = RacyDict(d._dict)
+    d[("T",)] = "value"
+    for builder in builders:
+        builder.join()
+    # The change must be accounted for exactly once.
+    assert d.reverse["value"].count(("T",)) == 1
+    del d[("T",)]
+    assert ("T",) not in d.reverse["value"]
+
+
+def test_merged_index():
+    rnd = random.Random(42)
+    keys = [(s,) for s in ("S", "T", "-G", "*")] + [("S", "T"), ("T", "-G", "*")]
+    values = ["a", "A", "b", "{plover:deleted}"]
+
+    def filtered(key, value):
+        return value == "b"
+
+    dicts = [StenoDictionary() for __ in range(3)] + [CompactStenoDictionary()]
+    for n, d in enumerate(dicts):
+        d.path = "d%u" % n
+    reference = StenoDictionaryCollection(dicts)
+    merged = StenoDictionaryCollection(dicts, merged_index=True)
+    for n in range(2000):
+        d = rnd.choice(dicts)
+        key = rnd.choice(keys)
+        action = rnd.random()
+        if action < 0.1:
+            d.enabled = not d.enabled
+        elif action < 0.15:
+            order = rnd.sample(dicts, rnd.randint(1, len(dicts)))
+            reference.set_dicts(order)
+            merged.set_dicts(order)
+        elif action < 0.2:
+            for dc in (reference, merged):
+                if dc.filters:
+                    dc.remove_filter(filtered)
+                else:
+                    dc.add_filter(filtered)
+        elif key in d:
+            del d[key]
+        else:
+            d[key] = rnd.choice(values)
+        assert merged.longest_key == reference.longest_key
+        for key in keys:
+            assert merged.lookup(key) == reference.lookup(key)
+            assert merged.raw_lookup(key) == reference.raw_lookup(key)
+    assert merged._index is not None
+
+
+def test_merged_index_custom_storage():
+    class CustomDictionary(StenoDictionary):
+        longest_key = 1
+
+        def get(self, key, fallback=None):
+            return "custom" if key == ("KUS",) else fallback
+
+    d1 = CustomDictionary()
+    d2 = StenoDictionary()
+    d2[("KUS",)] = "standard"
+    dc = StenoDictionaryCollection([d1, d2], merged_index=True)
+    # Not all dictionaries can be indexed: use normal lookups.
+    assert dc.lookup(("KUS",)) == "custom"
+    assert dc._index is None
+    dc.set_dicts([d2])
+    assert dc.lookup(("KUS",)) == "standard"
+    assert dc._index is not None
+    dc.merged_index = False
+    d2[("KUS",)] = "changed"
+    assert dc.lookup(("KUS",)) == "changed"
+    assert dc._index is None
+
+
+def test_has_longer_outlines():
+    d1 = StenoDictionary()
+    d1[("TEFT", "-G", "-S")] = "testings"
+    d2 = StenoDictionary()
+    d2[("SKP",)] = "and"
+    dc = StenoDictionaryCollection([d1, d2])
+    assert dc.has_longer_outlines(("TEFT",))
+    assert dc.has_longer_outlines(("TEFT", "-G"))
+    assert not dc.has_longer_outlines(("TEFT", "-G", "-S"))
+    assert not dc.has_longer_outlines(("SKP",))
+    d2[("SKP", "-S")] = "ands"
+    assert dc.has_longer_outlines(("SKP",))
+    d1.enabled = False
+    assert not dc.has_longer_outlines(("TEFT",))
+    d1.enabled = True
+    assert dc.has_longer_outlines(("TEFT",))
+
+    # Dictionaries with a custom storage cannot be indexed.
+    class CustomDictionary(StenoDictionary):
+        def get(self, key, fallback=None):
+            return fallback
+
+    dc.set_dicts([d1, CustomDictionary()])
+    assert dc.has_longer_outlines(("SKP",))
+
+
+@pytest.mark.parametrize("dict_class", (StenoDictionary, CompactStenoDictionary))
+def test_prefix_lookup(dict_class):
+    d = dict_class()
+    d.update(
+        {
+            ("TEFT",): "test",
+            ("TEFTS",): "tests",
+            ("TEFT", "-G"): "testing",
+            ("TEF",): "tef",
+            ("TKPW",): "go",
+        }
+    )
+    assert d.prefix_lookup("TEFT") == [("TEFT",), ("TEFT", "-G"), ("TEFTS",)]
+    assert d.prefix_lookup("TEFT/") == [("TEFT", "-G")]
+    assert d.prefix_lookup("TK") == [("TKPW",)]
+    assert d.prefix_lookup("Z") == []
+    assert len(d.prefix_lookup("")) == 5
+    # The index is updated on changes.
+    d[("TEFT", "-D")] = "tested"
+    del d[("TEFTS",)]
+    d[("TEFT",)] = "Test"
+    assert d.prefix_lookup("TEFT") == [("TEFT",), ("TEFT", "-D"), ("TEFT", "-G")]
+    d.clear()
+    assert d.prefix_lookup("") == []
+    d[("TEFT",)] = "test"
+    assert d.prefix_lookup("T") == [("TEFT",)]
+    # Keys with the same steno are not mixed up.
+    d[()] = "empty"
+    d[("A",)] = "a"
+    assert d.prefix_lookup("") == [(), ("A",), ("TEFT",)]
+    assert [d[key] for key in d.prefix_lookup("")] == ["empty", "a", "test"]
+    del d[()]
+    assert d.prefix_lookup("") == [("A",), ("TEFT",)]
+
+
+def test_prefix_lookup_custom_storage():
+    class CustomDictionary(StenoDictionary):
+        def __iter__(self):
+            return iter([("TEFT", "-G"), ("TEFT",), ("TKPW",)])
+
+    d = CustomDictionary()
+    assert d.prefix_lookup("TEFT") == [("TEFT",), ("TEFT", "-G")]
+
+
 def test_dictionary_enabled():
     dc = StenoDictionaryCollection()
     d1 = StenoDictionary()
@@ -0,0 +1,92 @@
+"""Unit tests for suggestions.py."""
+
+import pytest
+
+from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
+from plover.suggestions import Suggestion, Suggestions, variant_bases
+
+
+@pytest.mark.parametrize(
+    "value, bases",
+    (
+        ("word", {"word"}),
+        ("{^ing}", {"{^ing}", "ing"}),
+        ("{^}ing", {"{^}ing", "ing"}),
+        ("{^-^}", {"{^-^}", "-", "^-", "-^"}),
+        ("{^}", {"{^}", ""}),
+        ("{&a}", {"{&a}", "a"}),
+        ("{#Return}", {"{#Return}", "Return"}),
+    ),
+)
+def test_variant_bases(value, bases):
+    assert variant_bases(value) == bases
+
+
+def _find(suggestions, translation):
+    return sorted(suggestions.find(translation))
+
+
+def test_suggestions():
+    d1 = StenoDictionary()
+    d1[("TEFT",)] = "test"
+    d1[("-G",)] = "{^ing}"
+    d2 = StenoDictionary()
+    d2[("TEFT",)] = "Test"
+    d2[("T*EFT",)] = "test"
+    d2[("TEFT", "-G")] = "test"
+    d2[("TEFTS",)] = "{^test}"
+    d2[("T-G",)] = "ing"
+    dc = StenoDictionaryCollection([d1, d2])
+    suggestions = Suggestions(dc)
+    expected = [
+        Suggestion("test", [("TEFT",), ("T*EFT",), ("TEFT", "-G")]),
+        Suggestion("{^test}", [("TEFTS",)]),
+    ]
+    assert _find(suggestions, "test") == expected
+    assert _find(suggestions, "test ") == expected
+    assert _find(suggestions, "TEST") == expected
+    # "Test" is shadowed by "test".
+    assert _find(suggestions, "Test ") == []
+    assert _find(suggestions, "ing") == [
+        Suggestion("ing", [("T-G",)]),
+        Suggestion("{^ing}", [("-G",)]),
+    ]
+    assert _find(suggestions, "foo") == []
+    # Changes are taken into account.
+    d1[("TEFTS",)] = "tests"
+    del d2[("T*EFT",)]
+    d2[("T-FT",)] = "{&test}"
+    assert _find(suggestions, "test") == [
+        Suggestion("test", [("TEFT",), ("TEFT", "-G")]),
+        Suggestion("{&test}", [("T-FT",)]),
+    ]
+    d1[("T-FT",)] = "{plover:deleted}"
+    d1.enabled = False
+    assert _find(suggestions, "test") == [
+        Suggestion("Test", [("TEFT",)]),
+        Suggestion("test", [("TEFT", "-G")]),
+        Suggestion("{&test}", [("T-FT",)]),
+        Suggestion("{^test}", [("TEFTS",)]),
+    ]
+    dc.set_dicts([d1])
+    # Dictionaries not tracked yet: normal lookups are used.
+    assert _find(suggestions, "test") == []
+    suggestions.update()
+    assert _find(suggestions, "test") == []
+    d1.enabled = True
+    assert _find(suggestions, "test") == [Suggestion("test", [("TEFT",)])]
+
+
+def test_suggestions_custom_storage():
+    class CustomDictionary(StenoDictionary):
+        def reverse_lookup(self, value):
+            return {("KUS",)} if value == "custom" else set()
+
+    d1 = CustomDictionary()
+    d2 = StenoDictionary()
+    d2[("STAPBD",)] = "custom"
+    dc = StenoDictionaryCollection([d1, d2])
+    # Not all dictionaries can be indexed: use normal lookups.
+    assert Suggestions(dc).find("custom") == [
+        Suggestion("custom", [("KUS",), ("STAPBD",)])
+    ]
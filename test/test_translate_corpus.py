@@ -0,0 +1,92 @@
+"""Unit tests for scripts/translate_corpus.py."""
+
+import io
+import random
+
+import pytest
+
+from plover.formatting import Formatter, translations_to_text
+from plover.scripts.translate_corpus import (
+    read_corpus,
+    split_shards,
+    translate_corpus,
+    translate_shard,
+)
+from plover.steno import Stroke, normalize_steno
+from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
+from plover.translation import translate_stream
+
+
+def test_read_corpus():
+    corpus = io.StringIO(
+        "2024-01-31 10:00:00,001 Stroke(TEFT : ['T-', '-E', '-F', '-T'])\n"
+        "2024-01-31 10:00:00,002 Translation(('TEFT',) : \"test\")\n"
+        "2024-01-31 10:00:00,003 *Stroke(* : ['*'])\n"
+        "\n"
+        "\n"
+        "TEFT/-G  -S\n"
+        "\n"
+        "KPA\n"
+    )
+    assert read_corpus(corpus) == (["TEFT", "*", "TEFT", "-G", "-S", "KPA"], [2, 5])
+
+
+@pytest.mark.parametrize(
+    "stroke_count, paragraphs, shard_size, expected",
+    (
+        (0, [], 10, [(0, 0)]),
+        (25, [], 10, [(0, 10), (10, 20), (20, 25)]),
+        (25, [12, 22], 10, [(0, 12), (12, 22), (22, 25)]),
+        (25, [16], 10, [(0, 10), (10, 20), (20, 25)]),
+        (20, [14], 10, [(0, 14), (14, 20)]),
+    ),
+)
+def test_split_shards(stroke_count, paragraphs, shard_size, expected):
+    assert split_shards(stroke_count, paragraphs, shard_size) == expected
+
+
+@pytest.mark.parametrize("overlap", (0, 5, 200))
+def test_translate_corpus(overlap):
+    d = StenoDictionary()
+    for steno, translation in (
+        ("*", "=undo"),
+        ("TEFT", "test"),
+        ("TEFT/-G", "testing"),
+        ("-G", "{^ing}"),
+        ("-S", "{^s}"),
+        ("KPA", "{-|}"),
+        ("P-P", "{.}"),
+        ("A*", "{a^}"),
+        ("TP-PL", "{a|an}"),
+        ("KPA*", "{*-|}"),
+    ):
+        d[normalize_steno(steno)] = translation
+    dictionaries = StenoDictionaryCollection([d])
+    steno_list = [k[0] for k in d if len(k) == 1] + ["S", "TEFTS"]
+    rnd = random.Random(0)
+    strokes = [rnd.choice(steno_list) for __ in range(3000)]
+    paragraphs = sorted(rnd.sample(range(1, len(strokes)), 10))
+    formatter = Formatter()
+    expected = "".join(
+        translations_to_text(
+            translate_stream(
+                map(Stroke, strokes),
+                dictionaries,
+                formatter,
+                undo_levels=10,
+            )
+        )
+    )
+    shards = []
+
+    def translate(strokes, start, last):
+        shards.append(len(strokes))
+        return translate_shard(strokes, start, last, dictionaries, formatter, 10)
+
+    text = translate_corpus(
+        strokes, translate, paragraphs, shard_size=400, overlap=overlap
+    )
+    assert text == expected
+    if overlap == 200:
+        # No shards merging.
+        assert len(shards) == len(split_shards(len(strokes), paragraphs, 400))
@@ -7,17 +7,23 @@ from collections import namedtuple
 import ast
 import copy
 import operator
+import random
 
 from plover.oslayer.config import PLATFORM
 from plover.steno import Stroke, normalize_steno
 
 import pytest
 
+from plover.formatting import Formatter, translations_to_text
 from plover.steno_dictionary import StenoDictionary, StenoDictionaryCollection
-from plover.translation import Translation, Translator, _State
+from plover.translation import Translation, Translator, _State, translate_stream
 from plover.translation import escape_translation, unescape_translation
 
-from plover_build_utils.testing import parametrize, steno_to_stroke as stroke
+from plover_build_utils.testing import (
+    CaptureOutput,
+    parametrize,
+    steno_to_stroke as stroke,
+)
 
 
 if PLATFORM == "mac":
@@ -425,6 +431,31 @@ class TestState:
         assert s.translations == [self.b, self.c]
         assert s.tail == self.a
 
+    def test_restrict_size_after_changes(self):
+        s = _State()
+        s.restrict_size(4)
+        translations = s.translations
+        translations.extend((self.a, self.b))
+        translations.append(self.c)
+        translations.pop(1)
+        translations.insert(0, self.b)
+        translations[1] = self.c
+        translations[2:] = [self.a, self.a]
+        del translations[0]
+        translations += [self.b]
+        assert translations.stroke_count == 7
+        assert translations == [self.c, self.a, self.a, self.b]
+        assert copy.deepcopy(s).translations.stroke_count == 7
+        s.restrict_size(4)
+        assert s.translations == [self.a, self.a, self.b]
+        assert s.tail == self.c
+        translations.remove(self.a)
+        assert translations.stroke_count == 3
+        s.restrict_size(3)
+        assert s.translations == [self.a, self.b]
+        translations.clear()
+        assert translations.stroke_count == 0
+
 
 class TestTranslateStroke:
     DICT_COLLECTION_CLASS = StenoDictionaryCollection
@@ -630,6 +661,56 @@ class TestTranslateStroke:
         self.translate("K-LG")
         self._check_translations(lt)
 
+    def test_replace_multi_stroke_translations(self):
+        self.define("TEFT/-G", "testing")
+        self.define("TEFT/-G/-S", "testings")
+        self.translate("TEFT")
+        self.translate("-G")
+        self._check_translations(self.lt("TEFT/-G"))
+        self.translate("-S")
+        self._check_translations(self.lt("TEFT/-G/-S"))
+
+    def test_prefix_stroke_multi_stroke(self):
+        self.define("TEFT/-G", "testing")
+        self.define("/TEFT/-G", "{^testing}")
+        self.translate("TEFT")
+        self.translate("-G")
+        assert [t.english for t in self.s.translations] == ["{^testing}"]
+        assert self.s.translations[0].rtfcre == ("TEFT", "-G")
+
+    def test_suffix_folding_replaced_translations(self):
+        self.define("TEFT/-G", "testing")
+        self.define("TEFT/-G/SOPL", "testing some")
+        self.define("-S", "{^s}")
+        self.translate("TEFT")
+        self.translate("-G")
+        self.translate("SOPLS")
+        assert [t.english for t in self.s.translations] == ["testing some {^s}"]
+        assert self.s.translations[0].rtfcre == ("TEFT", "-G", "SOPLS")
+
+    def test_lookup_with_known_steno(self):
+        self.define("TEFT/-G", "testing")
+        self.define("/TEFT/-G", "{^testing}")
+        self.define("TEFT/SOPL", "test some")
+        self.define("-S", "{^s}")
+        # Passing the strokes steno must not change the results.
+        for steno_list, suffixes in (
+            (("TEFT", "-G"), ()),
+            (("TEFT", "SOPLS"), [(stroke("-S"), "{^s}")]),
+            (("TEFT", "SOPLS"), ()),
+            (("SOPL", "-G"), ()),
+        ):
+            strokes = [stroke(s) for s in steno_list]
+            for last_translations in ([], self.lt("SOPL")):
+                for max_len in (2, 3):
+                    args = (max_len, last_translations, strokes, suffixes)
+                    assert self.tlor._lookup_with_prefix(
+                        *args, steno_list
+                    ) == self.tlor._lookup_with_prefix(*args)
+            assert self.tlor._lookup_with_suffix(
+                strokes, suffixes, steno_list
+            ) == self.tlor._lookup_with_suffix(strokes, suffixes)
+
     def test_retrospective_insert_space(self):
         self.define("T/E/S/T", "a longer key")
         self.define("PER", "perfect")
@@ -820,6 +901,72 @@ def test_escape_unescape_translation(raw, escaped):
     assert escape_translation(raw) == escaped
 
 
+@pytest.mark.parametrize("spaces_after", (False, True))
+def test_translate_stream(spaces_after):
+    d = StenoDictionary()
+    for steno, translation in (
+        ("*", "=undo"),
+        ("TEFT", "test"),
+        ("TEFT/-G", "testing"),
+        ("-G", "{^ing}"),
+        ("-S", "{^s}"),
+        ("PW", "{be^}"),
+        ("/S", "{prefix^}"),
+        ("KPA", "{-|}"),
+        ("P-P", "{.}"),
+        ("R-R", "{^}\n{^}"),
+        ("A*", "{a^}"),
+        ("TP-PL", "{a|an}"),
+        ("KPA*", "{*-|}"),
+        ("STPH", "{*}"),
+        ("SKWR", "{*+}"),
+        ("KWR-D", "{#Return}"),
+    ):
+        d[normalize_steno(steno)] = translation
+    steno_list = [k[0] for k in d if len(k) == 1] + ["S", "ST", "TEFTS", "SPH"]
+    rnd = random.Random(0)
+    strokes = [stroke(rnd.choice(steno_list)) for __ in range(2000)]
+    # Reference: the strokes are fed one at a time to a translator.
+    output = CaptureOutput()
+    formatter = Formatter()
+    formatter.set_output(output)
+    formatter.set_space_placement("After Output" if spaces_after else "")
+    formatter.last_output_spaces_after = spaces_after
+    translator = Translator()
+    translator.set_dictionary(StenoDictionaryCollection([d]))
+    translator.set_min_undo_length(10)
+    translator.add_listener(formatter.format)
+    for s in strokes:
+        translator.translate(s)
+    formatter = Formatter()
+    formatter.set_space_placement("After Output" if spaces_after else "")
+    translations = translate_stream(iter(strokes), [d], formatter, undo_levels=10)
+    text = "".join(translations_to_text(translations, spaces_after, context=16))
+    assert text == output.text
+
+
+def test_translate_stream_undo_levels():
+    d = StenoDictionary()
+    d[("*",)] = "=undo"
+    d[("TEFT",)] = "test"
+    strokes = [stroke("TEFT")] * 300 + [stroke("*")] * 150
+    # Reference: the strokes are fed one at a time to a translator.
+    output = CaptureOutput()
+    formatter = Formatter()
+    formatter.set_output(output)
+    translator = Translator()
+    translator.set_dictionary(StenoDictionaryCollection([d]))
+    translator.set_min_undo_length(100)
+    translator.add_listener(formatter.format)
+    for s in strokes:
+        translator.translate(s)
+    assert len(output.text.split()) == 300 - 100
+    # Only the last 100 strokes can be undone.
+    translations = translate_stream(iter(strokes), [d], undo_levels=100)
+    text = "".join(translations_to_text(translations))
+    assert text == output.text
+
+
 class TestNoUnnecessaryLookups(TestTranslateStroke):
     # Custom dictionary collection class for tracking lookups.
     class DictTracy(StenoDictionaryCollection):
@@ -877,15 +1024,12 @@ class TestNoUnnecessaryLookups(TestTranslateStroke):
         )
         self.translate("-G")
         self._check_lookup_history(
-            # Macros.
+            # Macros (no outline starts with the prefix stroke).
             """
-            /-G
             -G
             """
-            # Others.
+            # Others: no outline starts with `SPH/TEFT`, `TEFT`, ...
             """
-            SPH/TEFT/-G
-            /TEFT/-G TEFT/-G
             """
         )
 
@@ -928,6 +1072,40 @@ class TestNoUnnecessaryLookups(TestTranslateStroke):
             "HRETS TEFT SPH",
         )
         self.translate("SUFBGSZ")
+        self._check_lookup_history(
+            # Macros.
+            """
+            SUFBGSZ
+            """
+            # Without suffix: no outline starts with `TEFT/SPH`, `SPH`, ...
+            """
+            """
+            # Suffix lookups.
+            """
+            -Z -S -G
+            SUFBGS
+            """
+        )
+
+    def test_lookup_suffixes_once_with_longer_outlines(self):
+        self._prepare_state(
+            """
+            "HROPBG/EFT/KAOE": "longest key",
+            "TEFT/SPH/-T": "test some thing",
+            "SPH/-T": "some thing",
+            "/-T": "{^thing}",
+            "HRETS": "let's",
+            "TEFT": "test",
+            "SPH": "some",
+            "SUFBGS": "suffix",
+            "-G": "{^ing}",
+            "-S": "{^s}",
+            "-D": "{^ed}",
+            "-Z": "{^s}",
+            """,
+            "HRETS TEFT SPH",
+        )
+        self.translate("SUFBGSZ")
         self._check_lookup_history(
             # Macros.
             """
@@ -937,16 +1115,27 @@ class TestNoUnnecessaryLookups(TestTranslateStroke):
             # Without suffix.
             """
             TEFT/SPH/SUFBGSZ
-            /SPH/SUFBGSZ
             SPH/SUFBGSZ
             """
             # Suffix lookups.
             """
             -Z -S -G
             TEFT/SPH/SUFBGS TEFT/SPH/SUFBGZ TEFT/SPH/SUFBSZ
-            /SPH/SUFBGS /SPH/SUFBGZ /SPH/SUFBSZ
             SPH/SUFBGS SPH/SUFBGZ SPH/SUFBSZ
             /SUFBGS /SUFBGZ /SUFBSZ
             SUFBGS
             """
         )
+
+    def test_lookups_after_dictionary_changes(self):
+        self._prepare_state(
+            """
+            "TEFT": "test",
+            "-G": "{^ing}",
+            """,
+            "TEFT",
+        )
+        # New outlines are taken into account.
+        self.define("TEFT/-G", "testing")
+        self.translate("-G")
+        self._check_lookup_history("-G TEFT/-G")
@@ -0,0 +1,121 @@
+"""Unit tests for system/wordlist.py."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from plover.system import _load_wordlist, wordlist
+from plover.system.wordlist import WordList, cache_filename
+
+
+WORDS = {
+    "artistically": 12,
+    "cherries": 3,
+    "naïve": 42,
+    "the": 1,
+    "zebras": 100000,
+}
+
+
+def write_wordlist(path, words):
+    path.write_text(
+        "".join("%s %u\n" % (w, r) for w, r in words.items()), encoding="utf-8"
+    )
+
+
+@pytest.mark.parametrize("cached", (False, True))
+def test_wordlist(tmp_path, cached):
+    words_file = tmp_path / "words.txt"
+    write_wordlist(words_file, WORDS)
+    words = WordList(str(words_file), str(tmp_path / "cache") if cached else None)
+    assert dict(words.items()) == WORDS
+    assert len(words) == len(WORDS)
+    for w, r in WORDS.items():
+        assert w in words
+        assert words[w] == r
+    for w in ("", "cherry", "The", "naive", 42, None):
+        assert w not in words
+        with pytest.raises(KeyError):
+            words[w]
+    assert words.get("cherry", 0) == 0
+
+
+def test_wordlist_empty(tmp_path):
+    words_file = tmp_path / "words.txt"
+    words_file.write_text("")
+    words = WordList(str(words_file))
+    assert len(words) == 0
+    assert "the" not in words
+
+
+def test_wordlist_duplicates(tmp_path, caplog):
+    words_file = tmp_path / "words.txt"
+    words_file.write_text("the 1\nthe 2\n")
+    words = WordList(str(words_file))
+    # The error is reported, and the words list considered empty.
+    assert "the" not in words
+    assert len(words) == 0
+    assert [r.levelname for r in caplog.records] == ["ERROR"]
+    assert "contains duplicate words" in caplog.text
+
+
+def test_load_wordlist(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr("plover.system.WORDLISTS_CACHE_DIR", str(cache_dir))
+    words_file = tmp_path / "words.txt"
+    write_wordlist(words_file, WORDS)
+    words = _load_wordlist("words.txt", str(tmp_path))
+    # Nothing is loaded on setup.
+    assert not cache_dir.exists()
+    assert words["the"] == 1
+    assert os.path.exists(cache_filename(str(cache_dir), str(words_file)))
+
+
+def test_wordlist_concurrent_load(tmp_path, monkeypatch):
+    words_file = tmp_path / "words.txt"
+    write_wordlist(words_file, WORDS)
+    parse_wordlist = wordlist.parse_wordlist
+    calls = []
+
+    def slow_parse_wordlist(*args):
+        calls.append(args)
+        time.sleep(0.05)
+        return parse_wordlist(*args)
+
+    monkeypatch.setattr(wordlist, "parse_wordlist", slow_parse_wordlist)
+    words = WordList(str(words_file))
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(words["the"])) for __ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # The index is only built once.
+    assert results == [1] * 4
+    assert len(calls) == 1
+
+
+def test_wordlist_cache(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    words_file = tmp_path / "words.txt"
+    write_wordlist(words_file, WORDS)
+    cache_file = cache_filename(str(cache_dir), str(words_file))
+    # The index is only built on first use.
+    words = WordList(str(words_file), str(cache_dir))
+    assert not os.path.exists(cache_file)
+    assert words["cherries"] == 3
+    assert os.path.exists(cache_file)
+    # Cache hit: the words list is not parsed.
+    with monkeypatch.context() as m:
+        m.setattr(wordlist, "parse_wordlist", None)
+        words = WordList(str(words_file), str(cache_dir))
+        assert dict(words.items()) == WORDS
+    # The words list changed: the index must be rebuilt.
+    write_wordlist(words_file, {"cherries": 5})
+    os.utime(words_file, (0, 0))
+    words = WordList(str(words_file), str(cache_dir))
+    assert dict(words.items()) == {"cherries": 5}